@@ -0,0 +1,106 @@
+"""
+Benchmark de backends con modelos de verdad: segmentos por segundo y
+memoria residente máxima de cada uno traduciendo los segmentos del corpus.
+
+Uso:
+  python3 bench/bench_backends.py [--backends argos,ct2] [--pages grep,ls] [--limit N]
+                                  [--batch N] [--lang es]
+
+Cada backend se mide en un proceso aparte (python3 bench_backends.py
+--child ...), así el máximo de memoria residente (ru_maxrss) es solo suyo.
+Se cuenta aparte la carga del modelo (primer lote) y la traducción del
+resto en lotes de --batch, como hace mantr_consume.py. Para ct2 se puede
+elegir el modo con MANTR_CT2_MODE=fast|quality.
+"""
+import os, sys, gzip, json, time, argparse, resource, subprocess
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+BIN = HERE.parent / "mantr_1.0-1" / "usr" / "bin"
+CORPUS = HERE / "corpus"
+
+
+def segments(pages, limit):
+    """Párrafos y descripciones de opciones del corpus, como los planifica el consumidor."""
+    # importar el consumidor no abre caché, memoria ni traductor (eso es setup())
+    sys.path.insert(0, str(BIN))
+    import mantr_consume as C
+    out = []
+    for f in sorted(CORPUS.glob("*.txt.gz")):
+        if pages and f.name[:-len(".txt.gz")] not in pages:
+            continue
+        with gzip.open(f, "rt", encoding="utf-8") as fh:
+            texts, descs = C.plan_document(C.read_protocol(fh.read()))
+        out.extend(C.mask_segment(t)[0] for t in texts + descs if t)
+    return out[:limit] if limit else out
+
+
+def child(backend, lang, batch, texts):
+    sys.path.insert(0, str(BIN))
+    from mantr_translator import Translator
+    tr = Translator(backend)
+    t0 = time.perf_counter()
+    tr.translate_batch(texts[:1], src="en", dest=lang)   # carga el modelo
+    load = time.perf_counter() - t0
+    rest = texts[1:]
+    t0 = time.perf_counter()
+    changed = 0
+    for i in range(0, len(rest), batch):
+        lot = rest[i:i + batch]
+        changed += sum(1 for a, b in zip(lot, tr.translate_batch(lot, src="en", dest=lang)) if a != b)
+    spent = time.perf_counter() - t0
+    return {"load_s": round(load, 3), "segments": len(rest), "translated": changed,
+            "seg_per_s": round(len(rest) / spent, 2) if spent else 0.0,
+            "rss_mib": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)}
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", default="argos,ct2")
+    ap.add_argument("--pages", default="", help="páginas del corpus separadas por comas")
+    ap.add_argument("--limit", type=int, default=300, help="segmentos como mucho (0: todos)")
+    ap.add_argument("--batch", type=int, default=16)
+    ap.add_argument("--lang", default="es")
+    ap.add_argument("--child", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        texts = json.loads(sys.stdin.read())
+        print(json.dumps(child(args.child, args.lang, args.batch, texts)))
+        return 0
+
+    pages = [p for p in args.pages.split(",") if p]
+    texts = segments(pages, args.limit)
+    if len(texts) < 2:
+        ap.error("no hay segmentos en el corpus")
+    print(f"{len(texts)} segmentos, lotes de {args.batch}, en→{args.lang}\n")
+    print(f"{'backend':10} {'carga s':>8} {'segm./s':>9} {'traducidos':>11} {'RSS MiB':>8}")
+    results = {}
+    for backend in [b for b in args.backends.split(",") if b]:
+        p = subprocess.run(
+            [sys.executable, __file__, "--child", backend, "--lang", args.lang,
+             "--batch", str(args.batch)],
+            input=json.dumps(texts), capture_output=True, text=True,
+            env=dict(os.environ, MANTR_TRACE=""),
+        )
+        if p.returncode != 0:
+            print(f"{backend:10} error: {p.stderr.strip().splitlines()[-1:]}")
+            continue
+        r = results[backend] = json.loads(p.stdout)
+        print(f"{backend:10} {r['load_s']:8.2f} {r['seg_per_s']:9.1f} "
+              f"{r['translated']:5}/{r['segments']:<5} {r['rss_mib']:8.0f}")
+        if not r["translated"]:
+            print(f"{'':10} (no ha traducido nada: ¿está instalado el modelo en→{args.lang}?)")
+
+    if "argos" in results and len(results) > 1:
+        base = results["argos"]
+        print()
+        for name, r in results.items():
+            if name != "argos" and base["seg_per_s"]:
+                print(f"{name}: {r['seg_per_s'] / base['seg_per_s']:.1f}× el ritmo de argos, "
+                      f"{r['rss_mib'] - base['rss_mib']:+.0f} MiB de memoria")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,86 @@
+"""
+Benchmark del troceado de páginas: mantr_parse frente al pipeline anterior
+(mantr_regex.sh: col -bx | awk | protocolo --- tipo --- leído otra vez en
+Python).
+
+Uso:
+  python3 bench/bench_parse.py [--rounds R] <página renderizada>...
+  python3 bench/bench_parse.py [--rounds R] --man <comando>...
+
+Con ficheros se usa el texto tal cual (p. ej. `man ls > ls.txt`); con --man
+se pide a man. Para cada página se comprueba que parse_rendered da los mismos
+bloques que el awk y se mide cuánto tarda cada uno. Con --man se mide también
+parse_roff sobre el fuente de `man -w`, que ya no necesita groff.
+"""
+import os, sys, time, argparse, subprocess
+from pathlib import Path
+
+BIN = Path(__file__).resolve().parent.parent / "mantr_1.0-1" / "usr" / "bin"
+sys.path.insert(0, str(BIN))
+import mantr_parse  # noqa: E402
+
+
+def awk_blocks(text):
+    """El pipeline anterior, desde el texto ya renderizado."""
+    out = subprocess.run(["bash", str(BIN / "mantr_regex.sh"), "-"],
+                         input=text, capture_output=True, text=True).stdout
+    return mantr_parse.read_protocol(out)
+
+
+def comparable(blocks):
+    # el protocolo añade una línea en blanco al final de cada bloque
+    return [(b.kind, " ".join(b.text.split()), b.section) for b in blocks]
+
+
+def timeit(fn, arg, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        fn(arg)
+    return (time.perf_counter() - t0) / rounds * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pages", nargs="*", help="páginas ya renderizadas (ficheros)")
+    ap.add_argument("--man", nargs="+", default=[], help="comandos a pedir a man")
+    ap.add_argument("--rounds", type=int, default=20)
+    args = ap.parse_args()
+
+    inputs = [(p, Path(p).read_text(encoding="utf-8", errors="replace")) for p in args.pages]
+    inputs += [(c, mantr_parse.render_with_man(c)) for c in args.man]
+    if not inputs:
+        ap.error("indica páginas renderizadas o --man <comando>")
+
+    differ = 0
+    print(f"{'página':24} {'bloques':>7} {'iguales':>8} {'awk ms':>8} {'python ms':>10}")
+    for name, text in inputs:
+        old, new = comparable(awk_blocks(text)), comparable(mantr_parse.parse_rendered(text))
+        same = sum(1 for a, b in zip(old, new) if a == b)
+        if old != new:
+            differ += 1
+        t_old = timeit(awk_blocks, text, max(1, args.rounds // 4))
+        t_new = timeit(mantr_parse.parse_rendered, text, args.rounds)
+        print(f"{name:24} {len(new):7} {same:4}/{len(old):<3} {t_old:8.2f} {t_new:10.2f}")
+
+    if args.man:
+        print(f"\n{'fuente (man -w)':24} {'bloques':>7} {'roff ms':>8} {'man+awk ms':>11}")
+        for cmd in args.man:
+            path = mantr_parse.locate_source(cmd)
+            if path is None:
+                print(f"{cmd:24} sin fuente")
+                continue
+            try:
+                source = mantr_parse.read_source(path)
+                blocks = mantr_parse.parse_roff(source)
+            except mantr_parse.Unsupported as e:
+                print(f"{cmd:24} no es man(7) sencillo ({e}): se usaría man")
+                continue
+            t_roff = timeit(lambda p: mantr_parse.parse_roff(mantr_parse.read_source(p)),
+                            path, args.rounds)
+            t_man = timeit(lambda c: awk_blocks(mantr_parse.render_with_man(c)), cmd, 3)
+            print(f"{cmd:24} {len(blocks):7} {t_roff:8.2f} {t_man:11.2f}")
+    return 1 if differ else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
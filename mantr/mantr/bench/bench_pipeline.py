@@ -0,0 +1,315 @@
+"""
+Benchmark de mantr_consume.py de principio a fin, sin modelos ni red.
+
+Uso:
+  python3 bench/bench_pipeline.py [--rounds R] [--latency MS] [--per-segment MS] [página...]
+  python3 bench/bench_pipeline.py --save-baseline
+  python3 bench/bench_pipeline.py --record grep ls tar ...
+  python3 bench/bench_pipeline.py --from-source --record grep ls tar ...
+
+Las páginas son salidas grabadas de mantr_regex.sh (bench/corpus/<cmd>.txt.gz;
+--record las vuelve a grabar con el man de la máquina). Sin groff,
+--from-source maqueta el fuente de `man -w` con mantr_parse (párrafos
+rellenados a 80 columnas, flags a 7 y descripciones a 14) y lo pasa por
+mantr_regex.sh igual que una página renderizada. Se traducen con el
+backend "stub", registrado aquí con register_backend: devuelve el texto entre
+« » tras esperar --latency ms por llamada y --per-segment ms por segmento,
+así que el resultado es siempre el mismo.
+
+Para cada página se mide, por etapas (el mejor de R rondas, tras una de
+calentamiento):
+
+  parse      read_protocol
+  translate  translate_document, sin el backend ni las reglas
+  backend    esperando al backend stub
+  rules      glosario y arreglos (mantr_rules)
+  render     render_block, sin el ajuste de líneas
+  wrap       textwrap.fill
+  cache      guardar y leer el documento (mantr_render.dumps/loads) en mantr_cache
+
+y además segmentos, llamadas al modelo, memoria máxima (tracemalloc, en una
+ronda aparte para no falsear los tiempos) y un resumen de la salida.
+
+Se compara con bench/baseline.json: un cambio en los contadores o en la
+salida, o un tiempo o memoria más de un --tolerance por encima, es una
+regresión y el script sale con 1. Un tiempo solo cuenta si además sube más
+de 2 ms y más de un 5 % del total de la página: las etapas cortas varían
+mucho de una ejecución a otra sin que cambie nada. --save-baseline guarda los resultados
+actuales como nueva referencia (los tiempos dependen de la máquina).
+"""
+import os, sys, gzip, json, time, argparse, hashlib, tempfile, subprocess, tracemalloc
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+BIN = HERE.parent / "mantr_1.0-1" / "usr" / "bin"
+CORPUS = HERE / "corpus"
+BASELINE = HERE / "baseline.json"
+STAGES = ("parse", "translate", "backend", "rules", "render", "wrap", "cache")
+
+sys.path.insert(0, str(BIN))
+
+
+# ==================== CRONÓMETRO POR ETAPAS ====================
+class Stages:
+    """Acumula tiempo por etapa; las etapas anidadas se descuentan de la de fuera."""
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.total = dict.fromkeys(STAGES, 0.0)
+        self._stack = []
+
+    def wrap(self, stage, fn):
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            self._stack.append(0.0)
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                inner = self._stack.pop()
+                spent = time.perf_counter() - t0
+                self.total[stage] += spent - inner
+                if self._stack:
+                    self._stack[-1] += spent
+        return timed
+
+
+STAGE = Stages()
+
+
+def setup(latency, per_segment):
+    """Entorno aislado y backend stub; devuelve (mantr_consume, stub)."""
+    tmp = Path(tempfile.mkdtemp(prefix="mantr-bench-"))
+    os.environ.update({
+        "BACKEND": "stub", "MANTR_DAEMON": "0", "MANTR_JOBS": "1", "MANTR_TM": "0",
+        "MANTR_CACHE_DIR": str(tmp), "MANTR_SHARED_CACHE": "", "MANTR_CACHE_PATH": "",
+        "MANTR_NO_PAGER": "1", "MANTR_STATS": "0", "MANTR_PLUGINS": "",
+        "MANWIDTH": "80", "MANTR_FORMAT": "text",
+    })
+    import mantr_translator
+
+    @mantr_translator.register_backend("stub")
+    class StubBackend(mantr_translator.Backend):
+        calls = segments = 0
+
+        def translate_batch(self, texts, src, dest):
+            type(self).calls += 1
+            type(self).segments += len(texts)
+            time.sleep((latency + per_segment * len(texts)) / 1000)
+            return [f"«{t}»" for t in texts]
+
+    StubBackend.translate_batch = STAGE.wrap("backend", StubBackend.translate_batch)
+
+    import mantr_consume as C
+    C.setup(["es"])
+    import mantr_render
+    import mantr_rules
+
+    mantr_rules.RuleSet.apply = STAGE.wrap("rules", mantr_rules.RuleSet.apply)
+    C.read_protocol = STAGE.wrap("parse", C.read_protocol)
+    C.translate_document = STAGE.wrap("translate", C.translate_document)
+    C.render_block = STAGE.wrap("render", C.render_block)
+    mantr_render.textwrap.fill = STAGE.wrap("wrap", mantr_render.textwrap.fill)
+    C.cache.put = STAGE.wrap("cache", C.cache.put)
+    C.cache.get = STAGE.wrap("cache", C.cache.get)
+    return C, StubBackend
+
+
+def run_page(C, stub, raw):
+    """Una pasada completa por la página, como main() sin paginador."""
+    for k in C.STATS:
+        C.STATS[k] = 0
+    stub.calls = stub.segments = 0
+    blocks = C.read_protocol(raw)
+    translated, translated_opts = C.translate_document(blocks)
+    output = "".join(C.render_block(mode, chunk, section, translated, translated_opts)
+                     for mode, chunk, section in blocks)
+    key = C.compute_cache_key(C.TARGET, C.BACKEND, raw)
+    segments = C.document(blocks, translated, translated_opts)
+    C.cache.put(key, C.mantr_render.dumps(segments, C.TARGET), "bench", C.TARGET, C.BACKEND)
+    assert C.mantr_render.loads(C.cache.get(key)) == segments
+    return output
+
+
+def calibrate():
+    """ms de una carga fija de Python puro: cuánto corre la máquina ahora."""
+    import textwrap
+    text = "word " * 2000
+    t0 = time.perf_counter()
+    for _ in range(20):
+        textwrap.fill(text, 70)
+    return (time.perf_counter() - t0) * 1000
+
+
+def bench_pages(C, stub, pages, rounds):
+    """
+    Mide todas las páginas por rondas: en cada ronda pasan todas (y la
+    calibración), así un rato de máquina cargada no se come todas las
+    mediciones de una misma página.
+    """
+    samples = {name: {s: [] for s in STAGES} for name in pages}
+    cal, outputs = [], {}
+    for raw in pages.values():
+        run_page(C, stub, raw)  # calentamiento: regex compiladas, cachés de Python...
+    for _ in range(rounds):
+        cal.append(calibrate())
+        for name, raw in pages.items():
+            STAGE.reset()
+            outputs[name] = run_page(C, stub, raw)
+            for s in STAGES:
+                samples[name][s].append(STAGE.total[s] * 1000)
+
+    results = {}
+    for name, raw in pages.items():
+        run_page(C, stub, raw)
+        counts = dict(C.STATS, blocks=len(C.read_protocol(raw)),
+                      model_calls=stub.calls, model_segments=stub.segments)
+
+        tracemalloc.start()
+        run_page(C, stub, raw)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+        # el mínimo es lo más estable: el ruido de la máquina solo suma
+        ms = {s: round(min(v), 3) for s, v in samples[name].items()}
+        ms["total"] = round(sum(ms.values()), 3)
+        results[name] = {"ms": ms, "counts": counts, "peak_kib": round(peak / 1024, 1),
+                         "output": hashlib.sha256(outputs[name].encode("utf-8")).hexdigest()[:16]}
+    return results, round(min(cal), 3)
+
+
+def compare(cur, base, tolerance, timings=True, scale=1.0):
+    """
+    Lista de regresiones de `cur` frente a `base`. `scale` es cuánto más
+    lenta va hoy la máquina que al guardar la referencia (calibrate()).
+    """
+    problems = []
+    if cur["output"] != base["output"]:
+        problems.append("la salida ha cambiado")
+    for k, v in cur["counts"].items():
+        if base["counts"].get(k) != v:
+            problems.append(f"{k}: {base['counts'].get(k)} → {v}")
+    # por debajo de 2 ms o del 5 % de la página la variación es ruido
+    floor = max(2.0, 0.05 * base["ms"].get("total", 0.0))
+    for s, v in cur["ms"].items() if timings else ():
+        old = base["ms"].get(s, 0.0) * scale
+        if v > old * (1 + tolerance) and v - old > floor * scale:
+            problems.append(f"{s}: {old:.1f} → {v:.1f} ms (+{(v / old - 1) * 100 if old else 100:.0f} %)")
+    if cur["peak_kib"] > base["peak_kib"] * (1 + tolerance):
+        problems.append(f"memoria: {base['peak_kib']:.0f} → {cur['peak_kib']:.0f} KiB")
+    return problems
+
+
+def layout_source(cmd):
+    """
+    La página de `cmd` maquetada desde su fuente con mantr_parse, con la
+    forma de la salida de man (título de sección a la izquierda y bloques
+    separados por una línea en blanco). Vacía si no hay fuente man(7).
+    """
+    import mantr_parse
+    path = mantr_parse.locate_source(cmd)
+    if path is None:
+        return ""
+    try:
+        blocks = mantr_parse._RoffParser().feed(mantr_parse.read_source(path))
+    except mantr_parse.Unsupported:
+        return ""
+    return "".join(b.text if b.kind == "section" else b.text + "\n" for b in blocks)
+
+
+def record(cmds, from_source=False):
+    CORPUS.mkdir(exist_ok=True)
+    for cmd in cmds:
+        argv = ["bash", str(BIN / "mantr_regex.sh")]
+        if from_source:
+            out = subprocess.run(argv + ["-"], input=layout_source(cmd),
+                                 capture_output=True, text=True).stdout
+        else:
+            out = subprocess.run(argv + [cmd], capture_output=True, text=True).stdout
+        if not out.strip():
+            print(f"{cmd}: man no devuelve nada, no se graba", file=sys.stderr)
+            continue
+        with gzip.open(CORPUS / f"{cmd}.txt.gz", "wt", encoding="utf-8") as f:
+            f.write(out)
+        print(f"{cmd}: {len(out)} bytes")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("pages", nargs="*", help="páginas del corpus (por defecto, todas)")
+    ap.add_argument("--rounds", type=int, default=7)
+    ap.add_argument("--latency", type=float, default=0.0, help="ms por llamada al backend")
+    ap.add_argument("--per-segment", type=float, default=0.0, help="ms por segmento")
+    ap.add_argument("--tolerance", type=float, default=0.5,
+                    help="margen antes de dar un tiempo por regresión (0.5 = 50 %%)")
+    ap.add_argument("--baseline", type=Path, default=BASELINE)
+    ap.add_argument("--save-baseline", action="store_true")
+    ap.add_argument("--record", nargs="+", metavar="CMD", help="graba páginas con mantr_regex.sh")
+    ap.add_argument("--from-source", action="store_true",
+                    help="con --record, maqueta el fuente con mantr_parse en vez de usar man")
+    args = ap.parse_args()
+
+    if args.record:
+        record(args.record, args.from_source)
+        return 0
+
+    files = sorted(CORPUS.glob("*.txt.gz"))
+    if args.pages:
+        files = [f for f in files if f.name[:-len(".txt.gz")] in args.pages]
+    if not files:
+        ap.error("no hay páginas en el corpus (bench/corpus)")
+
+    C, stub = setup(args.latency, args.per_segment)
+    config = {"latency": args.latency, "per_segment": args.per_segment}
+    pages = {}
+    for f in files:
+        with gzip.open(f, "rt", encoding="utf-8") as fh:
+            pages[f.name[:-len(".txt.gz")]] = fh.read()
+    results, cal = bench_pages(C, stub, pages, max(1, args.rounds))
+    print(f"{'página':8} {'bloques':>7} {'segm.':>6} {'llamadas':>8} "
+          + " ".join(f"{s:>9}" for s in STAGES) + f" {'total ms':>9} {'pico KiB':>9}")
+    for name, r in results.items():
+        c = r["counts"]
+        print(f"{name:8} {c['blocks']:7} {c['segments']:6} {c['model_calls']:8} "
+              + " ".join(f"{r['ms'][s]:9.2f}" for s in STAGES)
+              + f" {r['ms']['total']:9.2f} {r['peak_kib']:9.0f}")
+
+    if args.save_baseline:
+        data = {"config": config, "calibration_ms": cal, "pages": results}
+        args.baseline.write_text(json.dumps(data, indent=1, ensure_ascii=False) + "\n",
+                                 encoding="utf-8")
+        print(f"\nReferencia guardada en {args.baseline}")
+        return 0
+
+    if not args.baseline.exists():
+        print("\nNo hay referencia; guárdala con --save-baseline.")
+        return 0
+    base = json.loads(args.baseline.read_text(encoding="utf-8"))
+    timings = base.get("config") == config
+    if not timings:
+        print(f"\nAVISO: la referencia se midió con {base.get('config')}, "
+              f"esta ejecución con {config}: solo se comparan contadores y salida.")
+    # tiempos relativos a la velocidad de la máquina al guardar la referencia
+    scale = cal / base["calibration_ms"] if base.get("calibration_ms") else 1.0
+    if timings and abs(scale - 1) > 0.1:
+        print(f"\nLa máquina va a x{scale:.2f} de cuando se guardó la referencia; "
+              "los tiempos se comparan con esa escala.")
+    failed = False
+    for name, cur in results.items():
+        if name not in base["pages"]:
+            print(f"{name}: sin referencia")
+            continue
+        problems = compare(cur, base["pages"][name], args.tolerance, timings, scale)
+        if problems:
+            failed = True
+            print(f"REGRESIÓN en {name}:\n  " + "\n  ".join(problems))
+    if failed:
+        print("\nHay regresiones. Si el cambio es intencionado, actualiza la "
+              "referencia con --save-baseline.")
+        return 1
+    print("\nSin regresiones frente a la referencia.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
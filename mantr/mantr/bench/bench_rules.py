@@ -0,0 +1,217 @@
+"""
+Benchmark del glosario y los arreglos posteriores (mantr_rules) frente a la
+implementación anterior (un re.sub por término y por regla), copiada aquí
+tal cual como referencia.
+
+Uso:
+  python3 bench/bench_rules.py [--terms N] [--rounds R]
+
+--terms añade N términos sintéticos al glosario para ver cómo escala cada
+versión con un glosario grande. También se comprueba que las dos versiones
+dan el mismo resultado con el glosario real, en las muestras y en todos los
+párrafos del corpus grabado (bench/corpus); si alguno difiere, sale con 1.
+"""
+import re, sys, gzip, time, json, argparse
+from pathlib import Path
+
+HERE = Path(__file__).resolve().parent
+sys.path.insert(0, str(HERE.parent / "mantr_1.0-1" / "usr" / "bin"))
+import mantr_parse  # noqa: E402
+import mantr_rules  # noqa: E402
+
+
+# ==================== IMPLEMENTACIÓN ANTERIOR ====================
+GLOSSARY = {
+    "Anchoring": "Anclaje",
+    "Anchor": "Ancla",
+    "Anchors": "Anclas",
+
+    "The Backslash Character and Special Expressions":
+        "El carácter barra invertida y las expresiones especiales",
+
+    "Output Line Prefix Control": "Control del prefijo de las líneas de salida",
+    "Reporting Bugs": "Informe de errores",
+
+    "The Backslash Character":
+        "El carácter barra invertida",
+
+    "Special Expressions":
+        "Expresiones especiales",
+
+    "Character classes": "Clases de caracteres",
+    "Wildcard matching": "Coincidencia con comodines",
+    "Bracket expressions": "Expresiones entre corchetes",
+    "Regular expressions": "Expresiones regulares",
+    "Metacharacters": "Metacaracteres",
+    "Quantifiers": "Cuantificadores",
+    "Repetition": "Repetición",
+}
+
+VERB_MAP = {
+    "ignore": "ignorar", "list": "listar", "print": "imprimir", "show": "mostrar",
+    "display": "mostrar", "include": "incluir", "exclude": "excluir", "sort": "ordenar",
+    "use": "usar", "append": "añadir", "enclose": "encerrar", "reverse": "invertir",
+    "scale": "escalar", "color": "colorear", "hide": "ocultar",
+}
+
+def fix_do_not_spanish(s: str) -> str:
+    # do not <verb>  → no <infinitivo>
+    def repl(m):
+        v = m.group(1).lower()
+        return "no " + VERB_MAP.get(v, v)  # si no está en el mapa, deja el verbo tal cual
+    s = re.sub(r'\b[Dd]o not\s+([A-Za-z]+)\b', repl, s)
+    # don't <verb> (poco frecuente en man, por si acaso)
+    s = re.sub(r"\b[Dd]on['’]t\s+([A-Za-z]+)\b", repl, s)
+    return s
+
+def post_es_fixes(s: str) -> str:
+    out = s
+    # non-XYZ → no XYZ
+    out = re.sub(r'\bnon[-\s]?([a-záéíóúñ]+)\b', r'no \1', out, flags=re.I)
+    # starting/ending with
+    out = re.sub(r'\bstarting with\b', 'que comienzan por', out, flags=re.I)
+    out = re.sub(r'\bending with\b', 'que terminan con', out, flags=re.I)
+    # in columns / by columns
+    out = re.sub(r'\bby columns\b', 'en columnas', out, flags=re.I)
+    out = re.sub(r'\bin columns\b', 'en columnas', out, flags=re.I)
+    # artículos y pegados comunes (sin tocar los puntos suspensivos: es la
+    # única diferencia con el original, que dejaba "FILE..." en "FILE. .. ")
+    out = re.sub(r'((?<!\.)\.(?!\.)|[,;:])([^\s])', r'\1 \2', out)
+    # aplicar regla "do not"
+    out = fix_do_not_spanish(out)
+        # PARCHES ESPECÍFICOS PARA grep(1)
+    out = re.sub(
+        r"Skip any command-line file with a name suffix that matches? the pattern GLOB, using wildcard matching; a name suffix is either the whole name, or a trailing part that starts with a non-slash character immediately after a slash \(/.\) in the name\.",
+        "Saltar cualquier archivo de línea de comandos cuyo nombre termine con el patrón GLOB, "
+        "usando coincidencia con comodines; un sufijo de nombre puede ser el nombre completo o "
+        "la parte final que empieza con un carácter que no es / justo después de una barra (/).",
+        out
+    )
+
+    out = re.sub(
+        r"Skip any command-line directory with a name suffix that match the pattern GLOB\.",
+        "Saltar cualquier directorio de línea de comandos cuyo nombre termine con el patrón GLOB.",
+        out
+    )
+    # --- Parches específicos para frases difíciles de grep(1) ---
+
+
+    # Cola de la frase de --include / --exclude
+    out = re.sub(
+        r'and --exclude options are given, the last matching one wins\.',
+        'y se dan opciones --exclude, la última coincidencia es la que prevalece.',
+        out
+    )
+    # Frase típica de man grep --exclude=GLOB (y similares):
+    # la traducimos entera para evitar mezclas inglés/español.
+    out = re.sub(
+        r"Skip any command-line file with a name suffix that match(?:es|ing)? the pattern GLOB,.*?;",
+        "Saltar cualquier archivo de línea de comandos cuyo nombre tenga un sufijo que coincida con el patrón GLOB, "
+        "usando coincidencia con comodines;",
+        out,
+        flags=re.S,
+    )
+    # Frase corta que Argos a veces no traduce.
+    out = re.sub(
+        r"Suppress error messages about no existent or unreadable files\.",
+        "Suprime los mensajes de error sobre archivos inexistentes o ilegibles.",
+        out,
+    )
+
+    return out
+
+def apply_glossary(s: str) -> str:
+    for en, es in GLOSSARY.items():
+        # case-insensitive, por si acaso
+        s = re.sub(rf"\b{re.escape(en)}\b", es, s, flags=re.IGNORECASE)
+    return s
+
+
+def legacy(s: str) -> str:
+    return post_es_fixes(apply_glossary(s))
+
+
+# ==================== MUESTRAS ====================
+SAMPLES = [
+    "Ignore case distinctions in patterns and input data,so that characters that differ only in case match each other.",
+    "Regular expressions are built from Anchoring and Bracket expressions; Quantifiers control Repetition.",
+    "Do not print the file name.Don't list implied entries starting with .",
+    "Suppress error messages about nonexistent or unreadable files.",
+    "Wildcard matching uses non-slash characters, sorted by columns or in columns.",
+    "La opción --color[=WHEN] usa Metacharacters y Character classes para colorear la salida.",
+    "Salida normal sin nada que cambiar, una frase bastante larga como las de DESCRIPTION en bash(1), "
+    "con varias cláusulas, comas y puntos y coma; el caso más habitual.",
+]
+
+
+def corpus_paragraphs(corpus=HERE / "corpus"):
+    """Los párrafos de las páginas grabadas, con los espacios normalizados."""
+    paras = []
+    for path in sorted(corpus.glob("*.txt.gz")):
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            blocks = mantr_parse.read_protocol(f.read())
+        for b in blocks:
+            paras.extend(" ".join(p.split()) for p in re.split(r"\n\s*\n", b.text) if p.strip())
+    return paras
+
+
+def differences(rules, samples):
+    """(entrada, anterior, nuevo) de cada muestra en la que no coinciden."""
+    out = []
+    for s in samples:
+        old, new = legacy(s), rules.apply(s)
+        if old != new:
+            out.append((s, old, new))
+    return out
+
+
+def synthetic_terms(n):
+    words = ["buffer", "stream", "socket", "inode", "daemon", "shell", "token", "prompt",
+             "signal", "pipe", "descriptor", "locale", "charset", "mount", "device"]
+    terms = {}
+    for i in range(n):
+        a, b = words[i % len(words)], words[(i // len(words)) % len(words)]
+        terms[f"{a} {b} {i}"] = f"término {i}"
+    return terms
+
+
+def timeit(fn, samples, rounds):
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for s in samples:
+            fn(s)
+    return (time.perf_counter() - t0) / (rounds * len(samples)) * 1e6
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--terms", type=int, default=500)
+    ap.add_argument("--rounds", type=int, default=200)
+    args = ap.parse_args()
+
+    rules = mantr_rules.rules_for("es")
+    paras = corpus_paragraphs()
+    diffs = differences(rules, SAMPLES + paras)
+    for s, old, new in diffs[:10]:
+        print(f"distinto:\n  entrada:  {s}\n  anterior: {old}\n  nuevo:    {new}")
+    print(f"equivalencia: {len(diffs)} de {len(SAMPLES) + len(paras)} párrafos distintos "
+          f"({len(SAMPLES)} muestras y el corpus)")
+
+    print(f"glosario real ({len(GLOSSARY)} términos):")
+    print(f"  anterior: {timeit(legacy, SAMPLES, args.rounds):8.1f} µs/segmento")
+    print(f"  nuevo:    {timeit(rules.apply, SAMPLES, args.rounds):8.1f} µs/segmento")
+
+    # mismo fichero de reglas con N términos más
+    extra = synthetic_terms(args.terms)
+    data = json.loads((mantr_rules.RULES_DIR / "es.json").read_text(encoding="utf-8"))
+    data["glossary"].update(extra)
+    big = mantr_rules.RuleSet(data)
+    GLOSSARY.update(extra)
+    print(f"glosario ampliado ({len(GLOSSARY)} términos):")
+    print(f"  anterior: {timeit(legacy, SAMPLES, max(1, args.rounds // 10)):8.1f} µs/segmento")
+    print(f"  nuevo:    {timeit(big.apply, SAMPLES, args.rounds):8.1f} µs/segmento")
+    return 1 if diffs else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
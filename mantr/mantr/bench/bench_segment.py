@@ -0,0 +1,144 @@
+"""
+Benchmark de la segmentación en frases (mantr_segment) con los párrafos
+del corpus.
+
+Uso:
+  python3 bench/bench_segment.py [--pages grep,bash] [--chars N]
+                                 [--backends argos,ct2] [--limit N] [--lang es]
+
+Mide tres cosas, cada una en su proceso (python3 bench_segment.py --child
+...), así el máximo de memoria residente (ru_maxrss) es solo suyo:
+
+  segmenter  mantr_segment.pieces sobre todos los párrafos: tiempo, memoria,
+             frases y longitud máxima antes y después
+  stanza     lo mismo con la pipeline de stanza que usa Argos para partir
+             frases (solo si stanza y su modelo en inglés están instalados)
+  backends   con --backends, cada backend traduce los párrafos enteros
+             (MANTR_SEGMENT_CHARS=0, como antes) y partidos (--chars):
+             segundos, memoria y cuántas traducciones parecen cortadas
+             (menos de la mitad de largas que el original)
+"""
+import os, sys, json, time, argparse, resource, subprocess, tracemalloc
+
+from bench_backends import BIN, segments
+
+TRUNCATED = 0.5  # una traducción más corta que esto × el original, sospechosa
+
+
+def rss_mib():
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def child_segmenter(texts, chars):
+    sys.path.insert(0, str(BIN))
+    import mantr_segment
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    out = [mantr_segment.pieces(t, chars) for t in texts]
+    spent = time.perf_counter() - t0
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {"s": round(spent, 4), "sentences": sum(map(len, out)),
+            "max_chars": max((len(p) for ps in out for p in ps), default=0),
+            "peak_kib": round(peak / 1024, 1), "rss_mib": rss_mib()}
+
+
+def child_stanza(texts):
+    import stanza
+    t0 = time.perf_counter()
+    nlp = stanza.Pipeline("en", processors="tokenize", verbose=False)
+    load = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    out = [[s.text for s in nlp(t).sentences] for t in texts]
+    spent = time.perf_counter() - t0
+    return {"load_s": round(load, 3), "s": round(spent, 4), "sentences": sum(map(len, out)),
+            "max_chars": max((len(p) for ps in out for p in ps), default=0),
+            "rss_mib": rss_mib()}
+
+
+def child_backend(backend, lang, texts):
+    sys.path.insert(0, str(BIN))
+    from mantr_translator import Translator
+    tr = Translator(backend)
+    tr.translate_batch(texts[:1], src="en", dest=lang)   # carga el modelo
+    rest = texts[1:]
+    t0 = time.perf_counter()
+    outs = []
+    for i in range(0, len(rest), 16):
+        outs.extend(tr.translate_batch(rest[i:i + 16], src="en", dest=lang))
+    spent = time.perf_counter() - t0
+    changed = [(a, b) for a, b in zip(rest, outs) if b and a != b]
+    return {"s": round(spent, 3), "translated": len(changed), "segments": len(rest),
+            "truncated": sum(1 for a, b in changed if len(b) < TRUNCATED * len(a)),
+            "rss_mib": rss_mib()}
+
+
+def run_child(args, texts, env=None):
+    p = subprocess.run([sys.executable, __file__, "--child", *args],
+                       input=json.dumps(texts), capture_output=True, text=True,
+                       env=dict(os.environ, MANTR_TRACE="", **(env or {})))
+    if p.returncode != 0:
+        return {"error": (p.stderr.strip().splitlines() or ["?"])[-1]}
+    return json.loads(p.stdout)
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--pages", default="", help="páginas del corpus separadas por comas")
+    ap.add_argument("--chars", type=int, default=400, help="longitud máxima de cada trozo")
+    ap.add_argument("--backends", default="", help="p. ej. argos,ct2 (hace falta el modelo)")
+    ap.add_argument("--limit", type=int, default=200,
+                    help="párrafos para los backends, los más largos (0: todos)")
+    ap.add_argument("--lang", default="es")
+    ap.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = ap.parse_args()
+
+    if args.child:
+        texts = json.loads(sys.stdin.read())
+        kind = args.child[0]
+        if kind == "segmenter":
+            res = child_segmenter(texts, args.chars)
+        elif kind == "stanza":
+            res = child_stanza(texts)
+        else:
+            res = child_backend(args.child[1], args.lang, texts)
+        print(json.dumps(res))
+        return 0
+
+    texts = segments([p for p in args.pages.split(",") if p], 0)
+    if not texts:
+        ap.error("no hay párrafos en el corpus")
+    longest = max(map(len, texts))
+    print(f"{len(texts)} párrafos, el más largo de {longest} caracteres\n")
+
+    print(f"{'segmentador':12} {'carga s':>8} {'total ms':>9} {'µs/párr.':>9} "
+          f"{'frases':>7} {'máx. car.':>9} {'RSS MiB':>8}")
+    for name, child in (("mantr", ["segmenter"]), ("stanza", ["stanza"])):
+        r = run_child(child + ["--chars", str(args.chars)] if name == "mantr" else child, texts)
+        if "error" in r:
+            print(f"{name:12} no disponible ({r['error']})")
+            continue
+        print(f"{name:12} {r.get('load_s', 0.0):8.2f} {r['s'] * 1000:9.1f} "
+              f"{r['s'] / len(texts) * 1e6:9.1f} {r['sentences']:7} {r['max_chars']:9} "
+              f"{r['rss_mib']:8.0f}")
+
+    backends = [b for b in args.backends.split(",") if b]
+    if not backends:
+        return 0
+    lot = sorted(texts, key=len, reverse=True)[:args.limit or None]
+    print(f"\nlos {len(lot)} párrafos más largos, en→{args.lang}:\n")
+    print(f"{'backend':10} {'trozos':>8} {'s':>8} {'traducidos':>11} {'cortados':>9} {'RSS MiB':>8}")
+    for backend in backends:
+        for label, chars in (("enteros", 0), (f"≤{args.chars}", args.chars)):
+            r = run_child(["backend", backend, "--lang", args.lang], lot,
+                          env={"MANTR_SEGMENT_CHARS": str(chars)})
+            if "error" in r:
+                print(f"{backend:10} {label:>8} error: {r['error']}")
+                continue
+            print(f"{backend:10} {label:>8} {r['s']:8.2f} {r['translated']:5}/{r['segments']:<5} "
+                  f"{r['truncated']:9} {r['rss_mib']:8.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
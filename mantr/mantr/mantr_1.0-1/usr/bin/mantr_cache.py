@@ -0,0 +1,668 @@
+"""
+Caché de páginas traducidas de mantr.
+
+Cada página traducida se guarda comprimida (gzip) en <caché>/pages/<clave>.gz
+y se apunta en un índice SQLite (<caché>/index.sqlite3) con su tamaño, lo que
+costó traducirla y cuándo se usó por última vez. Varias claves pueden llevar
+a la misma entrada (alias): la clave por fuente de `man -w` apunta a la clave
+por contenido.
+
+La caché tiene un tamaño máximo (MANTR_CACHE_MAX, por defecto 256M, tamaño
+comprimido); al pasarlo se borran las entradas usadas hace más tiempo.
+
+Se consultan varias capas, en este orden:
+
+  1. la caché del usuario (MANTR_CACHE_DIR, por defecto ~/.cache/mantr)
+  2. una caché compartida con permisos de grupo (MANTR_SHARED_CACHE, por
+     defecto /var/cache/mantr si existe y se puede escribir en ella)
+  3. cachés de solo lectura (MANTR_CACHE_PATH, rutas separadas por ":"; por
+     defecto /usr/share/mantr/cache si existe)
+  4. paquetes de traducciones (.mpack, ver mantr_pack.py), también de solo
+     lectura
+
+Las páginas nuevas se guardan en la compartida si la hay, así la misma
+página no se traduce una vez por usuario. Se escriben en un temporal que
+luego se renombra (nadie lee nunca un fichero a medias), y mientras un
+proceso traduce una página tiene un cerrojo (flock) sobre su clave: otro
+que pida la misma página espera y se la encuentra hecha.
+
+Cada entrada lleva su calidad: "final" o "draft" (un borrador rápido,
+MANTR_DRAFT, que un trabajo en segundo plano sustituye después por la
+traducción buena con la misma clave; ver mantr_consume.py).
+
+Cada capa lleva además un índice de texto completo (SQLite FTS5, tabla
+search) con la línea NAME, los títulos de sección y las opciones de cada
+página ya traducidos: se actualiza al guardar o borrar una entrada y es lo
+que consulta `mantr -k` (search()), sin abrir ninguna página.
+
+Como la memoria de traducción, cualquier fallo se ignora: la caché es una
+ayuda, nunca debe impedir traducir.
+
+Uso directo (lo llama `mantr --show-cache` / `mantr --cache-stats` / `mantr -k`):
+  python3 mantr_cache.py --show | --stats | --search <término> [idioma]
+"""
+import os, re, sys, gzip, time, fcntl, sqlite3, tempfile, unicodedata
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+
+import mantr_trace as trace
+
+CACHE_DIR = Path(os.environ.get("MANTR_CACHE_DIR", Path.home() / ".cache" / "mantr"))
+
+
+def parse_size(text, default):
+    """'256M', '1G', '500k' o bytes → bytes."""
+    m = re.fullmatch(r"\s*(\d+(?:\.\d+)?)\s*([kKmMgG]?)[bB]?\s*", text or "")
+    if not m:
+        return default
+    return int(float(m.group(1)) * {"": 1, "k": 1 << 10, "m": 1 << 20, "g": 1 << 30}[m.group(2).lower()])
+
+
+def fmt_size(n):
+    for unit in ("B", "KiB", "MiB"):
+        if n < 1024:
+            return f"{n:.0f} {unit}" if unit == "B" else f"{n:.1f} {unit}"
+        n /= 1024
+    return f"{n:.1f} GiB"
+
+
+MAX_BYTES = parse_size(os.environ.get("MANTR_CACHE_MAX"), 256 << 20)
+# segundos que se espera a otro proceso que está traduciendo la misma página
+LOCK_TIMEOUT = float(os.environ.get("MANTR_LOCK_TIMEOUT", "300"))
+
+
+class PageCache:
+    """
+    Una capa de la caché. readonly: no se escribe nada, ni siquiera el uso.
+    shared: directorio de varios usuarios; lo que se crea es de grupo (g+rw).
+    """
+    def __init__(self, root, max_bytes=MAX_BYTES, readonly=False, shared=False):
+        self.root = Path(root)
+        self.pages = self.root / "pages"
+        self.max_bytes = max_bytes
+        self.readonly = readonly
+        self.shared = shared
+        self._db = None
+        self._fts = False
+        try:
+            if readonly:
+                # immutable: ni cerrojos ni -wal, vale en un medio de solo lectura
+                uri = (self.root / "index.sqlite3").as_uri() + "?immutable=1"
+                self._db = sqlite3.connect(uri, uri=True, check_same_thread=False)
+                self._db.execute("SELECT 1 FROM entries LIMIT 1")
+                self._fts = self._has_search()
+                return
+            self._mkdir(self.root)
+            self._mkdir(self.pages)
+            # check_same_thread=False: en modo streaming la página se guarda
+            # desde el hilo que traduce
+            db = sqlite3.connect(str(self.root / "index.sqlite3"), timeout=30,
+                                 check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                " key TEXT PRIMARY KEY,"
+                " cmd TEXT NOT NULL,"
+                " lang TEXT NOT NULL,"
+                " backend TEXT NOT NULL,"
+                " size INTEGER NOT NULL,"      # bytes comprimidos en disco
+                " raw_size INTEGER NOT NULL,"  # bytes de texto
+                " cost REAL NOT NULL,"         # segundos que costó traducirla
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " created REAL NOT NULL,"
+                " used REAL NOT NULL,"
+                " quality TEXT NOT NULL DEFAULT 'final')"  # final | draft
+            )
+            if "quality" not in {row[1] for row in db.execute("PRAGMA table_info(entries)")}:
+                # índice de una versión anterior: todo lo que hay es definitivo
+                db.execute("ALTER TABLE entries ADD COLUMN quality TEXT NOT NULL DEFAULT 'final'")
+            db.execute("CREATE INDEX IF NOT EXISTS entries_used ON entries (used)")
+            db.execute("CREATE TABLE IF NOT EXISTS aliases (alias TEXT PRIMARY KEY, key TEXT NOT NULL)")
+            db.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+            try:
+                # rowid = el de la entrada en entries; sin acentos al comparar
+                db.execute(
+                    "CREATE VIRTUAL TABLE IF NOT EXISTS search USING fts5("
+                    " cmd, lang UNINDEXED, name, headings, options,"
+                    " tokenize = 'unicode61 remove_diacritics 2')"
+                )
+                self._fts = True
+            except sqlite3.OperationalError:
+                pass  # SQLite sin FTS5: la caché funciona igual, sin `mantr -k`
+            db.commit()
+            self._db = db
+            if shared:
+                for name in ("index.sqlite3", "index.sqlite3-wal", "index.sqlite3-shm"):
+                    self._share(self.root / name)
+        except Exception:
+            self._db = None
+
+    @property
+    def available(self):
+        return self._db is not None
+
+    def _mkdir(self, path):
+        path.mkdir(parents=True, exist_ok=True)
+        if self.shared:
+            # setgid: lo que se cree dentro hereda el grupo del directorio
+            self._share(path, 0o2775)
+
+    def _share(self, path, mode=0o664):
+        if self.shared:
+            try:
+                os.chmod(path, mode)
+            except OSError:
+                pass  # no es nuestro: ya lo dejó bien quien lo creó
+
+    def _has_search(self):
+        try:
+            self._db.execute("SELECT 1 FROM search LIMIT 1")
+            return True
+        except sqlite3.OperationalError:
+            return False
+
+    def _path(self, key):
+        return self.pages / f"{key}.gz"
+
+    def _count(self, name, n=1):
+        self._db.execute(
+            "INSERT INTO counters (name, value) VALUES (?, ?)"
+            " ON CONFLICT(name) DO UPDATE SET value = value + excluded.value", (name, n))
+
+    def _resolve(self, key):
+        row = self._db.execute("SELECT key FROM aliases WHERE alias = ?", (key,)).fetchone()
+        return row[0] if row else key
+
+    @trace.traced("cache.get")
+    def get(self, key):
+        """Devuelve la página guardada o None."""
+        if self._db is None:
+            return None
+        try:
+            real = self._resolve(key)
+            text = None
+            if self._db.execute("SELECT 1 FROM entries WHERE key = ?", (real,)).fetchone():
+                try:
+                    with gzip.open(self._path(real), "rt", encoding="utf-8") as f:
+                        text = f.read()
+                except (OSError, EOFError):
+                    # fichero perdido o dañado: la entrada ya no vale
+                    if not self.readonly:
+                        self._drop(real)
+            if self.readonly:
+                return text
+            if text is None:
+                text = self._import_legacy(key)
+            if text is not None:
+                self._db.execute("UPDATE entries SET hits = hits + 1, used = ? WHERE key = ?",
+                                 (time.time(), real))
+            self._db.commit()
+            return text
+        except Exception:
+            return None
+
+    def quality(self, key):
+        """"final", "draft" o None si la clave no está en esta capa."""
+        if self._db is None:
+            return None
+        try:
+            row = self._db.execute("SELECT quality FROM entries WHERE key = ?",
+                                   (self._resolve(key),)).fetchone()
+        except sqlite3.OperationalError:
+            # capa de solo lectura con un índice anterior a la columna
+            row = self._db.execute("SELECT 'final' FROM entries WHERE key = ?",
+                                   (self._resolve(key),)).fetchone()
+        except Exception:
+            return None
+        return row[0] if row else None
+
+    def record(self, hit):
+        """Apunta una consulta (una por página mostrada) para la tasa de aciertos."""
+        if self._db is None or self.readonly:
+            return
+        try:
+            self._count("lookups")
+            if hit:
+                self._count("hits")
+            self._db.commit()
+        except Exception:
+            pass
+
+    def _import_legacy(self, key):
+        """Las versiones anteriores guardaban <clave>.txt sin comprimir: se pasan al almacén."""
+        old = self.root / f"{key}.txt"
+        if not old.is_file():
+            return None
+        text = old.read_text(encoding="utf-8", errors="ignore")
+        cmd, lang, backend = (key.rsplit("_", 3) + ["", "", ""])[:3]
+        self.put(key, text, cmd, lang, backend)
+        try:
+            old.unlink()
+        except OSError:
+            pass
+        return text
+
+    @trace.traced("cache.put")
+    def put(self, key, text, cmd="", lang="", backend="", cost=0.0, aliases=(), quality="final",
+            index=None):
+        """
+        Guarda la página (comprimida) y, si hace falta, libera sitio. Una
+        entrada con la misma clave (p. ej. el borrador) se sustituye.
+        index: {"name", "headings", "options"} para el índice de búsqueda.
+        Devuelve True si ha quedado guardada.
+        """
+        if self._db is None or self.readonly or not text:
+            return False
+        tmp = None
+        try:
+            path = self._path(key)
+            # temporal único en el mismo directorio y rename atómico: quien lea
+            # a la vez ve la página anterior o la nueva, nunca media
+            fd, tmp = tempfile.mkstemp(dir=self.pages, prefix=f".{key}.")
+            with os.fdopen(fd, "wb") as raw, \
+                 gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=6) as f:
+                f.write(text.encode("utf-8"))
+            self._share(tmp)
+            os.replace(tmp, path)
+            tmp = None
+            now = time.time()
+            self._unindex(key)
+            cur = self._db.execute(
+                "INSERT OR REPLACE INTO entries"
+                " (key, cmd, lang, backend, size, raw_size, cost, hits, created, used, quality)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?, 0, ?, ?, ?)",
+                (key, cmd, lang, backend, path.stat().st_size,
+                 len(text.encode("utf-8")), cost, now, now, quality),
+            )
+            if index and self._fts:
+                self._db.execute(
+                    "INSERT INTO search (rowid, cmd, lang, name, headings, options)"
+                    " VALUES (?, ?, ?, ?, ?, ?)",
+                    (cur.lastrowid, cmd, lang, index.get("name", ""),
+                     index.get("headings", ""), index.get("options", "")),
+                )
+            for alias in aliases:
+                self._db.execute("INSERT OR REPLACE INTO aliases (alias, key) VALUES (?, ?)",
+                                 (alias, key))
+            self._db.commit()
+            self.evict()
+            return True
+        except Exception:
+            if tmp is not None:
+                try:
+                    os.unlink(tmp)
+                except OSError:
+                    pass
+            return False
+
+    def discard(self, keys):
+        """Borra las entradas de `keys` que haya (p. ej. piezas de una página ya entera)."""
+        if self._db is None or self.readonly:
+            return
+        try:
+            for key in keys:
+                self._drop(key)
+            self._db.commit()
+        except Exception:
+            pass
+
+    def alias(self, alias, key):
+        """`alias` pasa a llevar a la entrada `key`."""
+        if self._db is None or self.readonly:
+            return
+        try:
+            self._db.execute("INSERT OR REPLACE INTO aliases (alias, key) VALUES (?, ?)",
+                             (alias, self._resolve(key)))
+            self._db.commit()
+        except Exception:
+            pass
+
+    def _unindex(self, key):
+        if self._fts:
+            self._db.execute("DELETE FROM search WHERE rowid ="
+                             " (SELECT rowid FROM entries WHERE key = ?)", (key,))
+
+    def _drop(self, key):
+        self._unindex(key)
+        self._db.execute("DELETE FROM entries WHERE key = ?", (key,))
+        self._db.execute("DELETE FROM aliases WHERE key = ?", (key,))
+        try:
+            self._path(key).unlink()
+        except OSError:
+            pass
+
+    def evict(self):
+        """Si se pasa de max_bytes, borra las entradas menos usadas hasta quedar al 90 %."""
+        if self._db is None or self.readonly:
+            return 0
+        total = self._db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return 0
+        target, dropped = self.max_bytes * 9 // 10, 0
+        for key, size in self._db.execute(
+                "SELECT key, size FROM entries ORDER BY used").fetchall():
+            if total <= target:
+                break
+            self._drop(key)
+            total -= size
+            dropped += 1
+        self._count("evictions", dropped)
+        self._db.commit()
+        return dropped
+
+    @contextmanager
+    def lock(self, key, on_wait=None, timeout=LOCK_TIMEOUT):
+        """
+        Cerrojo exclusivo sobre `key` mientras se traduce la página. Si otro
+        proceso lo tiene, llama a on_wait() y espera (como mucho `timeout`
+        segundos; después se sigue sin cerrojo: peor traducir dos veces
+        que quedarse colgado).
+        """
+        fd = None
+        try:
+            locks = self.root / "locks"
+            self._mkdir(locks)
+            path = locks / f"{key}.lock"
+            try:
+                fd = os.open(path, os.O_CREAT | os.O_RDWR, 0o664)
+                self._share(path)
+            except PermissionError:
+                # fichero de otro usuario sin permiso de escritura: flock
+                # no la necesita, basta con poder abrirlo
+                fd = os.open(path, os.O_RDONLY)
+        except OSError:
+            # sin cerrojo se traduce igual, pero que se vea en la traza
+            trace.count("cache.lock_unavailable")
+        try:
+            if fd is not None:
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    trace.count("cache.lock_wait")
+                    if on_wait is not None:
+                        on_wait()
+                    waited = time.monotonic()
+                    deadline = time.monotonic() + timeout
+                    while True:
+                        try:
+                            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                            break
+                        except OSError:
+                            if time.monotonic() > deadline:
+                                trace.count("cache.lock_timeout")
+                                break
+                            time.sleep(0.2)
+                    trace.observe("cache.lock_wait", time.monotonic() - waited)
+            yield
+        finally:
+            if fd is not None:
+                os.close(fd)  # cerrar libera el flock
+
+    def stats(self, top=10):
+        if self._db is None:
+            return None
+        db = self._db
+        counters = dict(db.execute("SELECT name, value FROM counters").fetchall())
+        entries, size, raw = db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0), COALESCE(SUM(raw_size), 0) FROM entries"
+        ).fetchone()
+        costly = db.execute(
+            "SELECT key, cost, hits, size FROM entries ORDER BY cost DESC LIMIT ?", (top,)
+        ).fetchall()
+        try:
+            drafts = db.execute("SELECT COUNT(*) FROM entries WHERE quality = 'draft'").fetchone()[0]
+        except sqlite3.OperationalError:
+            drafts = 0
+        return {"entries": entries, "drafts": drafts, "size": size, "raw_size": raw,
+                "max": self.max_bytes,
+                "lookups": counters.get("lookups", 0), "hits": counters.get("hits", 0),
+                "evictions": counters.get("evictions", 0), "costly": costly}
+
+    @trace.traced("cache.search")
+    def search(self, query, lang=None, limit=50):
+        """
+        Páginas de esta capa que casan con `query` (consulta FTS5, ver
+        fts_query): [(rango, cmd, lang, name, fragmento)], las mejores primero.
+        """
+        if self._db is None or not self._fts:
+            return []
+        sql = ("SELECT bm25(search, 10.0, 0.0, 5.0, 2.0, 1.0), e.cmd, e.lang, s.name,"
+               " snippet(search, 4, ?, ?, '…', 10)"
+               " FROM search s JOIN entries e ON e.rowid = s.rowid"
+               " WHERE search MATCH ?")
+        args = [*HIGHLIGHT, query]
+        if lang:
+            # es también encuentra es_ES, pt encuentra pt_BR...
+            sql += " AND (e.lang = ? OR e.lang LIKE ? ESCAPE '\\')"
+            args += [lang, lang.replace("_", "\\_") + "\\_%"]
+        sql += " ORDER BY 1 LIMIT ?"
+        args.append(limit)
+        try:
+            return self._db.execute(sql, args).fetchall()
+        except sqlite3.Error:
+            return []
+
+    def entries(self):
+        if self._db is None:
+            return []
+        return self._db.execute(
+            "SELECT key, lang, backend, size, raw_size, hits, used FROM entries ORDER BY used DESC"
+        ).fetchall()
+
+    def close(self):
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+            self._db = None
+
+
+class LayeredCache:
+    """
+    Capas de caché consultadas en orden (ver el principio del módulo). Se
+    escribe en la compartida si la hay y si no en la del usuario; las
+    estadísticas de aciertos van a la del usuario.
+    """
+    def __init__(self, layers):
+        self.layers = [c for c in layers if c.available]
+        writable = [c for c in self.layers if not c.readonly]
+        self.user = writable[0] if writable else None
+        self.writer = next((c for c in writable if c.shared), self.user)
+
+    def _find(self, key):
+        for layer in self.layers:
+            text = layer.get(key)
+            if text is not None:
+                return layer, text
+        return None, None
+
+    def get(self, key):
+        return self._find(key)[1]
+
+    def quality(self, key):
+        for layer in self.layers:
+            q = layer.quality(key)
+            if q is not None:
+                return q
+        return None
+
+    def record(self, hit):
+        if self.user is not None:
+            self.user.record(hit)
+
+    def put(self, key, text, cmd="", lang="", backend="", cost=0.0, aliases=(), quality="final",
+            index=None):
+        if self.writer is None:
+            return False
+        return self.writer.put(key, text, cmd, lang, backend, cost, aliases, quality, index)
+
+    def discard(self, keys):
+        keys = list(keys)
+        for layer in self.layers:
+            if not layer.readonly:
+                layer.discard(keys)
+
+    def search(self, term, lang=None, limit=50):
+        """
+        Como PageCache.search en todas las capas, una vez por comando e
+        idioma (la misma página puede estar con varios backends o capas).
+        """
+        query = fts_query(term)
+        if not query:
+            return []
+        best = {}
+        for layer in self.layers:
+            for row in layer.search(query, lang, limit):
+                key = (row[1], row[2])
+                if key not in best or row[0] < best[key][0]:
+                    best[key] = row
+        return sorted(best.values())[:limit]
+
+    def alias(self, alias, key):
+        # el alias va en la misma capa que la entrada, o en la del usuario
+        # si la entrada está en una de solo lectura
+        layer, _ = self._find(key)
+        if layer is not None and layer.readonly:
+            layer = self.user
+        if layer is not None:
+            layer.alias(alias, key)
+
+    def lock(self, key, on_wait=None):
+        if self.writer is None:
+            return nullcontext()
+        return self.writer.lock(key, on_wait)
+
+
+# marcas del término en los fragmentos: negrita en un terminal
+HIGHLIGHT = ("\033[1m", "\033[0m") if sys.stdout.isatty() else ("", "")
+
+
+def fts_query(term):
+    """
+    Texto del usuario → consulta FTS5: todas las palabras, cada una como
+    prefijo ("direc" encuentra "directorio"). Sin operadores ni comillas
+    del usuario, que darían errores de sintaxis.
+    """
+    words = re.findall(r"\w+", term or "")
+    return " ".join(f'"{w}"*' for w in words)
+
+
+def _writable_dir(path):
+    return path.is_dir() and os.access(path, os.W_OK | os.X_OK)
+
+
+def open_cache(cache_dir=CACHE_DIR):
+    layers = [PageCache(cache_dir)]
+    shared = os.environ.get("MANTR_SHARED_CACHE")
+    if shared is None:
+        shared = "/var/cache/mantr" if _writable_dir(Path("/var/cache/mantr")) else ""
+    if shared and Path(shared).resolve() != Path(cache_dir).resolve():
+        layers.append(PageCache(shared, shared=True))
+    ro = os.environ.get("MANTR_CACHE_PATH", "/usr/share/mantr/cache")
+    for path in filter(None, ro.split(":")):
+        if (Path(path) / "index.sqlite3").is_file():
+            layers.append(PageCache(path, readonly=True))
+    # importado aquí: mantr_pack usa este módulo
+    from mantr_pack import PackCache, open_packs
+    layers.extend(PackCache(pack) for pack in open_packs(cache_dir))
+    return LayeredCache(layers)
+
+
+# === mantr --show-cache / --cache-stats ===
+
+def layer_name(layer):
+    if hasattr(layer, "pack"):
+        return "paquete"
+    if layer.readonly:
+        return "solo lectura"
+    return "compartida" if layer.shared else "usuario"
+
+
+def show(cache):
+    print(f"Caché (MANTR_CACHE_DIR): {os.environ.get('MANTR_CACHE_DIR') or '(no definida)'}")
+    for layer in cache.layers:
+        print(f"Capa {layer_name(layer)}: {layer.root}")
+    rows = [(layer, row) for layer in cache.layers for row in layer.entries()]
+    if not rows:
+        print("\nLa caché está vacía (aún no se ha traducido nada o ya se ha borrado).")
+        return
+    print(f"\n{'entrada':48} {'capa':>12} {'tamaño':>10} {'usos':>5}  último uso")
+    for layer, (key, lang, backend, size, raw, hits, used) in rows:
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(used))
+        print(f"{key:48} {layer_name(layer):>12} {fmt_size(size):>10} {hits:5}  {when}")
+
+
+def show_search(cache, args):
+    """mantr -k <término> [idioma]"""
+    if not args or not fts_query(args[0]):
+        print("Uso: mantr -k <término> [idioma]", file=sys.stderr)
+        return 2
+    term, lang = args[0], (args[1] if len(args) > 1 else None)
+    if not any(layer._fts for layer in cache.layers):
+        print("mantr: este SQLite no tiene FTS5, no se puede buscar.", file=sys.stderr)
+        return 1
+    rows = cache.search(term, lang)
+    if not rows:
+        # como apropos: nada en la salida estándar y estado 1
+        print(f"{term}: nada apropiado.", file=sys.stderr)
+        return 1
+    for _, cmd, lng, name, snippet in rows:
+        # "grep, egrep - imprime..." → "imprime..."; si la página no trae NAME, el comando
+        desc = name.split(" - ", 1)[-1].strip() if name else ""
+        print(f"{cmd + ' (' + lng + ')':20} - {desc}")
+        if snippet and fts_hit(term, snippet):
+            print(f"{'':23}{' '.join(snippet.split())}")
+    return 0
+
+
+def fts_hit(term, text):
+    """¿Sale alguna palabra de `term` en `text`? (para no repetir el fragmento si no aporta)"""
+    low = fold(text)
+    return any(fold(w) in low for w in re.findall(r"\w+", term))
+
+
+def fold(text):
+    """Minúsculas y sin acentos, como compara el índice (remove_diacritics)."""
+    return "".join(c for c in unicodedata.normalize("NFD", text.lower())
+                   if not unicodedata.combining(c))
+
+
+def show_stats(cache):
+    if not cache.layers:
+        print("No se puede abrir el índice de la caché.", file=sys.stderr)
+        return 1
+    for layer in cache.layers:
+        st = layer.stats()
+        print(f"Caché ({layer_name(layer)}): {layer.root}")
+        print(f"  entradas:      {st['entries']}"
+              + (f" ({st['drafts']} borradores por refinar)" if st["drafts"] else ""))
+        print(f"  tamaño:        {fmt_size(st['size'])} comprimido ({fmt_size(st['raw_size'])} de texto)"
+              + ("" if layer.readonly else f", máximo {fmt_size(st['max'])}"))
+        if "segments" in st:
+            print(f"  segmentos:     {st['segments']} de memoria de traducción")
+        if layer is cache.user:
+            rate = st["hits"] / st["lookups"] * 100 if st["lookups"] else 0.0
+            print(f"  aciertos:      {st['hits']} de {st['lookups']} consultas ({rate:.1f} %)")
+        if not layer.readonly:
+            print(f"  desalojadas:   {st['evictions']}")
+        if st["costly"]:
+            print("\n  Las que más costaría volver a traducir:")
+            for key, cost, hits, size in st["costly"]:
+                print(f"    {key:48} {cost:8.1f} s  {hits:4} usos  {fmt_size(size):>10}")
+        print()
+    return 0
+
+
+if __name__ == "__main__":
+    cache = open_cache()
+    if sys.argv[1:] == ["--stats"]:
+        sys.exit(show_stats(cache))
+    elif sys.argv[1:] == ["--show"]:
+        show(cache)
+    elif sys.argv[1:2] == ["--search"]:
+        sys.exit(show_search(cache, sys.argv[2:]))
+    else:
+        print("Uso: mantr_cache.py --show | --stats | --search <término> [idioma]", file=sys.stderr)
+        sys.exit(2)
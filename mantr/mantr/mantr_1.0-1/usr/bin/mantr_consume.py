@@ -1,166 +1,110 @@
-import sys, os, re, subprocess, time, hashlib, textwrap
+import sys, os, re, queue, shutil, argparse, tempfile, threading, subprocess, time, hashlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import ExitStack
 from pathlib import Path
 
-WRAP_WIDTH = 80  # ancho típico de man
-TARGET = sys.argv[1] if len(sys.argv) > 1 else "es"
-BACKEND = os.environ.get("BACKEND", "argos")
-
-GLOSSARY = {
-    "Anchoring": "Anclaje",
-    "Anchor": "Ancla",
-    "Anchors": "Anclas",
-
-    "The Backslash Character and Special Expressions":
-        "El carácter barra invertida y las expresiones especiales",
-
-    "Output Line Prefix Control": "Control del prefijo de las líneas de salida",
-    "Reporting Bugs": "Informe de errores",
-
-    "The Backslash Character":
-        "El carácter barra invertida",
-
-    "Special Expressions":
-        "Expresiones especiales",
-
-    "Character classes": "Clases de caracteres",
-    "Wildcard matching": "Coincidencia con comodines",
-    "Bracket expressions": "Expresiones entre corchetes",
-    "Regular expressions": "Expresiones regulares",
-    "Metacharacters": "Metacaracteres",
-    "Quantifiers": "Cuantificadores",
-    "Repetition": "Repetición",
-}
-
-CUSTOM_TITLES = {
-    "Anchoring": "ANCLAJE",
-    "The Backslash Character and Special Expressions": "CARÁCTER BARRA INVERTIDA Y EXPRESIONES ESPECIALES",
-    "Repetition": "REPETICIÓN",
-}
-
-
-# Patrones reutilizables para flags cortas / largas.
-# Soportan ejemplos como:
-#   -q
-#   -q, --quiet
-#   -q, --quiet, --silent
-#   --color[=WHEN]
-#   --color[=WHEN], --colour[=WHEN]
-FLAG_SHORT = r'-[A-Za-z0-9]+'
-FLAG_LONG  = r'--[A-Za-z0-9][A-Za-z0-9-]*(?:\[=[^]]+\]|=[^\s]+)?'
-FLAG       = rf'(?:{FLAG_SHORT}|{FLAG_LONG})'
-
-OPTION_HEAD_RE = re.compile(
-    rf'^\s*(?:{FLAG})(?:\s*,\s*{FLAG})*\s*$',
-    re.M,
-)
-
-
-VERB_MAP = {
-    "ignore": "ignorar", "list": "listar", "print": "imprimir", "show": "mostrar",
-    "display": "mostrar", "include": "incluir", "exclude": "excluir", "sort": "ordenar",
-    "use": "usar", "append": "añadir", "enclose": "encerrar", "reverse": "invertir",
-    "scale": "escalar", "color": "colorear", "hide": "ocultar",
-}
-
-def fix_do_not_spanish(s: str) -> str:
-    # do not <verb>  → no <infinitivo>
-    def repl(m):
-        v = m.group(1).lower()
-        return "no " + VERB_MAP.get(v, v)  # si no está en el mapa, deja el verbo tal cual
-    s = re.sub(r'\b[Dd]o not\s+([A-Za-z]+)\b', repl, s)
-    # don't <verb> (poco frecuente en man, por si acaso)
-    s = re.sub(r"\b[Dd]on['’]t\s+([A-Za-z]+)\b", repl, s)
-    return s
+from mantr_parse import (FLAG, FLAG_LONG, FLAG_SHORT, PARSER, PARSER_VERSION, load_page,
+                         locate_source, read_protocol, source_identity)
+import mantr_render
+import mantr_trace as trace
+from mantr_cache import open_cache
+from mantr_rules import rules_for
+from mantr_tm import open_memory
+from mantr_translator import make_translator
 
-def post_es_fixes(s: str) -> str:
-    out = s
-    # non-XYZ → no XYZ
-    out = re.sub(r'\bnon[-\s]?([a-záéíóúñ]+)\b', r'no \1', out, flags=re.I)
-    # starting/ending with
-    out = re.sub(r'\bstarting with\b', 'que comienzan por', out, flags=re.I)
-    out = re.sub(r'\bending with\b', 'que terminan con', out, flags=re.I)
-    # in columns / by columns
-    out = re.sub(r'\bby columns\b', 'en columnas', out, flags=re.I)
-    out = re.sub(r'\bin columns\b', 'en columnas', out, flags=re.I)
-    # artículos y pegados comunes
-    out = re.sub(r'([.,;:])([^\s])', r'\1 \2', out)
-    # aplicar regla "do not"
-    out = fix_do_not_spanish(out)
-        # PARCHES ESPECÍFICOS PARA grep(1)
-    out = re.sub(
-        r"Skip any command-line file with a name suffix that matches? the pattern GLOB, using wildcard matching; a name suffix is either the whole name, or a trailing part that starts with a non-slash character immediately after a slash \(/.\) in the name\.",
-        "Saltar cualquier archivo de línea de comandos cuyo nombre termine con el patrón GLOB, "
-        "usando coincidencia con comodines; un sufijo de nombre puede ser el nombre completo o "
-        "la parte final que empieza con un carácter que no es / justo después de una barra (/).",
-        out
-    )
-
-    out = re.sub(
-        r"Skip any command-line directory with a name suffix that match the pattern GLOB\.",
-        "Saltar cualquier directorio de línea de comandos cuyo nombre termine con el patrón GLOB.",
-        out
-    )
-    # --- Parches específicos para frases difíciles de grep(1) ---
-
-
-    # Cola de la frase de --include / --exclude
-    out = re.sub(
-        r'and --exclude options are given, the last matching one wins\.',
-        'y se dan opciones --exclude, la última coincidencia es la que prevalece.',
-        out
-    )
-    # Frase típica de man grep --exclude=GLOB (y similares):
-    # la traducimos entera para evitar mezclas inglés/español.
-    out = re.sub(
-        r"Skip any command-line file with a name suffix that match(?:es|ing)? the pattern GLOB,.*?;",
-        "Saltar cualquier archivo de línea de comandos cuyo nombre tenga un sufijo que coincida con el patrón GLOB, "
-        "usando coincidencia con comodines;",
-        out,
-        flags=re.S,
-    )
-    # Frase corta que Argos a veces no traduce.
-    out = re.sub(
-        r"Suppress error messages about no existent or unreadable files\.",
-        "Suprime los mensajes de error sobre archivos inexistentes o ilegibles.",
-        out,
-    )
+WRAP_WIDTH = mantr_render.DEFAULT_WIDTH  # ancho típico de man
 
 
+def parse_args(argv):
+    """
+    mantr_consume.py [--page CMD [--section N]] [--output DIR] [--format F]
+                     [-o SECCIÓN] [--option=FLAG] [idioma[,idioma...]]
+    Con --page lee la página directamente (mantr_parse); sin ella, la salida
+    de mantr_regex.sh por la entrada estándar, como antes. Con varios
+    idiomas o --output se traducen todos a la vez (ver fan_out). --format
+    elige cómo se maqueta (mantr_render: text, ansi o html). -o y --option
+    muestran solo una parte de la página (ver translate_selection).
+    """
+    ap = argparse.ArgumentParser(prog="mantr_consume.py")
+    ap.add_argument("lang", nargs="?", default="es",
+                    help="idioma destino, o varios separados por comas (por defecto: es)")
+    ap.add_argument("--page", help="comando cuya página man se traduce")
+    ap.add_argument("--section", help="sección de man (p. ej. 3 para printf(3))")
+    ap.add_argument("--output", metavar="DIR",
+                    help="escribe DIR/<idioma>/<comando>.txt en vez de abrir less")
+    ap.add_argument("--format", choices=mantr_render.FORMATS,
+                    default=os.environ.get("MANTR_FORMAT") or "text",
+                    help="text (como man), ansi (con negritas) o html (por defecto: text)")
+    ap.add_argument("-o", "--only", action="append", default=[], metavar="SECCIÓN",
+                    help="solo esa sección (OPTIONS, EXAMPLES...; en inglés o traducida)")
+    ap.add_argument("--option", action="append", default=[], metavar="FLAG",
+                    help="solo la descripción de esa opción (--option=-r)")
+    # interno: lo lanza run_later para sustituir un borrador (MANTR_DRAFT) o
+    # para traducir el resto de una página vista con -o/--option
+    ap.add_argument("--refine", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--complete", action="store_true", help=argparse.SUPPRESS)
+    return ap.parse_known_args(argv)[0]
+
+
+# Importar este módulo no lee sys.argv ni abre nada: los procesos de
+# MANTR_JOBS (spawn) lo vuelven a importar. Los argumentos, la caché, el
+# traductor y la memoria los prepara setup(), que llama main(); hasta
+# entonces valen los valores por defecto.
+ARGS = parse_args([])
+TARGETS = ["es"]
+TARGET = TARGETS[0]
+
+# La caché guarda el documento traducido, no la página maquetada: se compone
+# al ancho de este terminal (o MANWIDTH) y en el formato pedido (mantr_render).
+# Los ficheros de --output no dependen del terminal.
+WIDTH = mantr_render.DEFAULT_WIDTH
+FORMAT = ARGS.format
+
+# --- Enmascarado de lo que no se traduce ---
+# Flags, rutas, variables de entorno, GLOBs, identificadores, METAVARIABLES y
+# números se sustituyen por {0}, {1}... antes de ir al modelo y se reponen
+# después. El modelo no los estropea, y un segmento que solo tiene eso
+# (una lista de flags, una ruta...) ni siquiera se le envía.
+MASK_RE = re.compile("|".join([
+    rf"(?<![\w-]){FLAG_LONG}",               # --color[=WHEN]
+    rf"(?<![\w-]){FLAG_SHORT}\b",            # -q, -1
+    r"\$\{?[A-Za-z_][A-Za-z0-9_]*\}?(?:/[\w.@%+:/-]*)?",  # $HOME, ${VAR}/bin
+    r"(?<![\w/])(?:~|\.{1,2})?/[\w.@%+:/-]*",  # /etc/passwd, ~/.bashrc, ./configure
+    r"[\w.-]*\*[\w.*?-]*",                    # *.txt, foo*
+    r"\b[\w.-]+\(\d\w*\)",                   # grep(1)
+    r"\b[A-Za-z][A-Za-z0-9]*_\w*",            # GREP_COLORS, LC_ALL, st_mode
+    r"\b[A-Z][A-Z0-9]+\b",                    # PATTERNS, FILE, GLOB
+    r"\b\d+(?:[.,:]\d+)*\b",                  # 3, 1.5, 10:30
+]))
+PLACEHOLDER_RE = re.compile(r"\{\s*(\d+)\s*\}")
+WORD_RE = re.compile(r"[^\W\d_]{2,}")
+
+MASK = os.environ.get("MANTR_MASK", "1") != "0"
+
+def mask_segment(text: str):
+    """Devuelve (texto con {n}, [tokens originales])."""
+    tokens = []
+    def repl(m):
+        tokens.append(m.group(0))
+        return "{%d}" % (len(tokens) - 1)
+    return MASK_RE.sub(repl, text), tokens
 
-    return out
-
-    return out
+def unmask_segment(text: str, tokens):
+    """Repone los tokens; None si el modelo ha perdido o inventado alguno."""
+    seen = set()
+    def repl(m):
+        i = int(m.group(1))
+        if i >= len(tokens):
+            return m.group(0)
+        seen.add(i)
+        return tokens[i]
+    out = PLACEHOLDER_RE.sub(repl, text)
+    return out if len(seen) == len(tokens) else None
 
+def has_words(masked: str) -> bool:
+    """¿Queda algo que traducir además de los {n}?"""
+    return WORD_RE.search(PLACEHOLDER_RE.sub(" ", masked)) is not None
 
-def looks_like_options_block(chunk: str) -> bool:
-    """
-    Devuelve True si el 'chunk' parece listado de opciones:
-    - Una o más líneas que son solo flags (-x, --xxx, -x, --xxx, --xxx=WORD)
-    - Y al menos una línea de descripción indentada a continuación.
-    """
-    lines = chunk.splitlines()
-    i = 0
-    saw_pair = False
-    while i < len(lines):
-        ln = lines[i]
-        if not ln.strip():
-            i += 1
-            continue
-        # ¿línea de cabecera de opción?
-        if OPTION_HEAD_RE.match(ln):
-            j = i + 1
-            # buscar una continuación indentada (descripción)
-            if j < len(lines) and (lines[j].startswith(" ") or lines[j].startswith("\t")):
-                saw_pair = True
-            # saltar hasta el siguiente “bloque” (sigue leyendo continuaciones indentadas)
-            i = j
-            while i < len(lines) and (not lines[i].strip() or lines[i].startswith(" ") or lines[i].startswith("\t")):
-                i += 1
-            continue
-        else:
-            # no es opción ⇒ no cumple
-            return False
-    return saw_pair
 
 def unhyphenate_chunk(s: str) -> str:
     """Une palabras partidas por guion al final de línea: 'speci-\nfied' -> 'specified'
@@ -179,205 +123,233 @@ def normalize_for_translation(s: str) -> str:
     s = re.sub(r"\s+\n", "\n", s)
     return s.strip()
 
-SPANISH_CHARS = "áéíóúÁÉÍÓÚñÑ"
-
-def translate_with_retry(desc: str) -> str:
-    base = normalize_for_translation(desc)
-    t = translate_safe(base)
-    if t and t.strip() != base.strip():
-        # primera pasada buena
-        if TARGET.startswith("es"):
-            # solo en español aplicamos glosario + arreglos específicos
-            return post_es_fixes(apply_glossary(t))
-        # en otros idiomas devolvemos la traducción tal cual
-        return t
-
-    # Reintento por trozos más pequeños (. ; : ,)
+def split_fragments(base: str):
+    """Trozos más pequeños (. ; : ,) para reintentar: [(fragmento, separador)]."""
     parts = re.split(r"([.;:,])", base)
-    out, buf = [], ""
-    for i, tok in enumerate(parts):
-        if i % 2 == 0:
-            buf = tok.strip()
+    frags = []
+    for i in range(0, len(parts), 2):
+        sep = parts[i + 1] if i + 1 < len(parts) else ""
+        frags.append((parts[i].strip(), sep))
+    return frags
+
+def translate_with_retry_batch(descs, dest=None):
+    bases = [normalize_for_translation(d) for d in descs]
+    firsts = translate_safe_batch(bases, dest=dest)
+
+    results = [None] * len(bases)
+    retry = []
+    for i, (base, t) in enumerate(zip(bases, firsts)):
+        if t and t.strip() != base.strip():
+            # primera pasada buena (translate_safe_batch ya aplicó las reglas)
+            results[i] = t
         else:
-            if buf:
-                frag = translate_safe(buf)
-                if TARGET.startswith("es"):
-                    frag = post_es_fixes(apply_glossary(frag))
-                out.append(frag)
-            out.append(tok)  # el separador
-            buf = ""
-    if buf:
-        frag = translate_safe(buf)
-        if TARGET.startswith("es"):
-            frag = post_es_fixes(apply_glossary(frag))
-        out.append(frag)
-
-    res = "".join(out).strip()
-    return res if res else base
-
-
-
-# --- Mapeo de secciones ---
-SECTION_MAP = {
-    "NAME": "NOMBRE", "SYNOPSIS": "SINOPSIS", "DESCRIPTION": "DESCRIPCIÓN",
-    "OPTIONS": "OPCIONES", "EXIT STATUS": "ESTADO DE SALIDA",
-    "RETURN VALUE": "VALOR DE RETORNO", "ENVIRONMENT": "ENTORNO",
-    "FILES": "ARCHIVOS", "AUTHOR": "AUTOR", "REPORTING BUGS": "INFORME DE ERRORES",
-    "COPYRIGHT": "DERECHOS DE AUTOR", "SEE ALSO": "VÉASE TAMBIÉN",
-}
+            retry.append(i)
+
+    # Reintento por trozos más pequeños (. ; : ,), todos en un mismo lote
+    frags = {i: split_fragments(bases[i]) for i in retry}
+    todo = [f for i in retry for f, _ in frags[i] if f]
+    if retry:
+        trace.count("retry.fallback", len(retry))
+        trace.count("retry.fragments", len(todo))
+    translated = dict(zip(todo, translate_safe_batch(todo, dest=dest)))
+
+    for i in retry:
+        out = []
+        for frag, sep in frags[i]:
+            if frag:
+                out.append(translated[frag])
+            out.append(sep)
+        res = "".join(out).strip()
+        results[i] = res if res else bases[i]
+
+    return results
+
+def translate_with_retry(desc: str) -> str:
+    return translate_with_retry_batch([desc])[0]
+
 
 # === Caché de resultados ya traducidos ===
 CACHE_DIR = Path(os.environ.get("MANTR_CACHE_DIR", Path.home() / ".cache" / "mantr"))
-CACHE_DIR.mkdir(parents=True, exist_ok=True)
+cache = None  # open_cache(CACHE_DIR), en setup()
 
-def compute_cache_key(target_lang: str, backend: str, raw_text: str) -> Path:
+def cache_cmd() -> str:
+    return os.environ.get("MANTR_CMD", "unknown").replace("/", "_")
+
+def compute_cache_key(target_lang: str, backend: str, raw_text: str) -> str:
     """
     Genera una clave de caché a partir de idioma + backend + hash del texto de entrada.
-    Devuelve la ruta del fichero de caché.
     """
     h = hashlib.sha256(raw_text.encode("utf-8", errors="ignore")).hexdigest()
-    safe_cmd = os.environ.get("MANTR_CMD", "unknown").replace("/", "_")
     short_hash = h[:12]  # suficiente, 12 caracteres
+    return f"{cache_cmd()}_{target_lang}_{backend}_{short_hash}"
+
 
-    fname = f"{safe_cmd}_{target_lang}_{backend}_{short_hash}.txt"
+# Versión de lo que se guarda (el documento en segmentos de mantr_render):
+# entra en la clave por fuente para que un cambio no sirva entradas viejas.
+# El ancho ya no entra: la misma entrada vale para cualquier terminal
+FORMAT_VERSION = "2"
 
-    return CACHE_DIR / fname
+def source_cache_key(target_lang: str, backend: str, source: Path) -> str:
+    """
+    Clave de caché a partir de la identidad del fuente de `man -w` (ruta,
+    tamaño, mtime) + idioma + backend + versiones del parser y del formato.
+    Se calcula sin leer ni renderizar la página.
+    """
+    ident = "\0".join([source_identity(source), target_lang, backend,
+                       PARSER_VERSION, FORMAT_VERSION])
+    h = hashlib.sha256(ident.encode("utf-8", errors="ignore")).hexdigest()
+    return f"{cache_cmd()}_{target_lang}_{backend}_src{h[:12]}"
 
 
-TARGET  = sys.argv[1] if len(sys.argv) > 1 else "es"
 BACKEND = os.environ.get("BACKEND", "auto")  # auto | argos | libre | hf
 
-# ==================== TRADUCTOR (solo gratis) ====================
-class Translator:
-    """
-    Backends:
-      - argos : Argos Translate (offline puro, requiere paquete en→es instalado)
-      - libre : LibreTranslate local (http://localhost:5000/translate por defecto)
-      - hf    : HuggingFace (Helsinki-NLP/opus-mt-en-es); descarga 1ª vez y luego offline
-      - auto  : intenta Argos → Libre → HF
-    """
-    def __init__(self, backend="auto"):
-        self.backend = backend
-        self._init_clients()
-
-    def _init_clients(self):
-        self._argos = None
-        self._requests = None
-        self._libre_url = os.environ.get("LIBRE_URL", "http://localhost:5000/translate")
-        self._hf_pipe = None
-
-        if self.backend in ("argos", "auto"):
-            try:
-                from argostranslate import translate as _atr
-                self._argos = _atr
-            except Exception:
-                self._argos = None
-
-        if self.backend in ("libre", "auto"):
-            try:
-                import requests  # noqa
-                self._requests = __import__("requests")
-            except Exception:
-                self._requests = None
-
-        if self.backend in ("hf", "auto"):
-            try:
-                from transformers import pipeline
-                self._hf_pipe = pipeline(
-                    "translation_en_to_es",
-                    model="Helsinki-NLP/opus-mt-en-es"
-                )
-            except Exception:
-                self._hf_pipe = None
-
-    def _argos_translate(self, text, src, dest):
-        if not self._argos:
-            return None
-        try:
-            return self._argos.translate(text, src, dest)
-        except Exception:
-            return None
+# Borradores (MANTR_DRAFT=<backend>, p. ej. ct2-fast): en uso interactivo la
+# página se traduce con ese backend, más rápido, y se guarda en caché como
+# borrador con la clave de BACKEND. Al cerrar less, run_later la vuelve a
+# traducir en segundo plano con BACKEND y la sustituye en la caché.
+DRAFT = os.environ.get("MANTR_DRAFT", "").strip()
+DRAFTING = False  # ver setup()
+ENGINE = BACKEND  # el backend que traduce en este proceso
 
-    def _libre_translate(self, text, src, dest):
-        if not self._requests:
-            return None
-        try:
-            r = self._requests.post(
-                self._libre_url,
-                data={"q": text, "source": src, "target": dest, "format": "text"},
-                timeout=15,
-            )
-            if r.ok:
-                return r.json().get("translatedText") or None
-        except Exception:
-            pass
-        return None
+# ==================== TRADUCTOR (solo gratis) ====================
+# Con mantrd arrancado se usan sus modelos ya cargados; si no, MANTR_JOBS=N
+# reparte los segmentos entre N procesos con su propio modelo (setup())
+tr = None
 
-    def _hf_translate(self, text, src, dest):
-        # Modelo EN->ES; si pides otro par, devolvemos None
-        if not self._hf_pipe or not (src == "en" and dest == "es"):
-            return None
-        try:
-            return self._hf_pipe(text)[0]["translation_text"]
-        except Exception:
-            return None
+# Memoria de traducción por segmento, compartida entre comandos (setup())
+tm = None
 
-    def translate(self, text, src="en", dest="es"):
-        text = (text or "").strip()
-        if not text:
-            return text
+# Tamaño de lote para el backend (párrafos/descripciones por llamada)
+BATCH_SIZE = max(1, int(os.environ.get("MANTR_BATCH", "16") or 16))
 
-        if self.backend == "argos":
-            return self._argos_translate(text, src, dest) or text
-        if self.backend == "libre":
-            return self._libre_translate(text, src, dest) or text
-        if self.backend == "hf":
-            return self._hf_translate(text, src, dest) or text
+# Contadores para MANTR_STATS=1
+STATS = {"segments": 0, "skipped": 0, "memory": 0, "model": 0, "masked": 0, "unmask_retry": 0}
 
-        # auto: Argos → Libre → HF → original
-        out = self._argos_translate(text, src, dest)
-        if out: return out
-        out = self._libre_translate(text, src, dest)
-        if out: return out
-        out = self._hf_translate(text, src, dest)
-        return out or text
+# Un borrador aprovecha lo que ya tradujo BACKEND antes que lo suyo
+MEMORY_BACKENDS = (BACKEND,)
 
+def memory_lookup(memory, masked, dest):
+    for backend in MEMORY_BACKENDS:
+        # la de ENGINE puede consultarla mantrd (memory es None); las demás, aquí
+        source = memory if backend == ENGINE else tm
+        hit = source.get(masked, dest, backend) if source is not None else None
+        if hit is not None:
+            return hit
+    return None
 
-tr = Translator(BACKEND)
+def model_translate_batch(texts, src="en", dest=None):
+    """
+    Pasa una lista de segmentos por el backend. Antes de nada se enmascaran
+    (mask_segment) y se descartan los que no tienen nada que traducir;
+    después se consulta la memoria de traducción, que se indexa por el
+    texto enmascarado. Los repetidos solo se envían una vez y el resto va
+    en lotes de BATCH_SIZE. Solo se memoriza cuando el backend devuelve
+    algo distinto del original, para no guardar fallos (modelo ausente,
+    servidor caído...).
+    """
+    dest = dest or TARGET
+    # con mantrd la memoria la consulta el propio demonio
+    memory = tm if not getattr(tr, "memoizes", False) else None
+    done = {}
+    masked_of = {}  # original → (enmascarado, tokens)
+    pending = {}    # enmascarados, dict como conjunto ordenado
+    for text in texts:
+        if not text or text in done or text in masked_of:
+            continue
+        STATS["segments"] += 1
+        masked, tokens = mask_segment(text) if MASK else (text, [])
+        if not has_words(masked):
+            # solo flags, rutas, números...: llamada al modelo evitada
+            STATS["skipped"] += 1
+            done[text] = text
+            continue
+        STATS["masked"] += len(tokens)
+        hit = memory_lookup(memory, masked, dest)
+        if hit is not None:
+            restored = unmask_segment(hit, tokens)
+            if restored is not None:
+                STATS["memory"] += 1
+                done[text] = restored
+                continue
+        masked_of[text] = (masked, tokens)
+        pending[masked] = None
+    pending = list(pending)
+
+    # con varios procesos cada uno recibe su propio lote de BATCH_SIZE
+    step = BATCH_SIZE * getattr(tr, "jobs", 1)
+    outs = {}
+    for i in range(0, len(pending), step):
+        lot = pending[i:i + step]
+        STATS["model"] += len(lot)
+        # con mantrd o MANTR_JOBS el detalle por backend queda en el otro
+        # proceso; aquí se ve lo que tarda cada lote desde el consumidor
+        t0 = time.perf_counter()
+        res = tr.translate_batch(lot, src=src, dest=dest)
+        spent = time.perf_counter() - t0
+        trace.observe("model.batch", spent)
+        trace.add_span("model", spent)
+        outs.update((m, o or m) for m, o in zip(lot, res))
+
+    # si mantrd ha desaparecido a mitad, ahora guardamos nosotros
+    memory = tm if not getattr(tr, "memoizes", False) else None
+    stored, retry = set(), []
+    for text, (masked, tokens) in masked_of.items():
+        out = outs[masked]
+        restored = unmask_segment(out, tokens)
+        if restored is None:
+            retry.append(text)
+            continue
+        done[text] = restored
+        if memory is not None and masked not in stored and out.strip() != masked.strip():
+            memory.put(masked, dest, ENGINE, out)
+            stored.add(masked)
+
+    if retry:
+        # el modelo ha perdido algún {n}: esos van sin máscara
+        STATS["unmask_retry"] += len(retry)
+        with trace.span("model"):
+            res = tr.translate_batch(retry, src=src, dest=dest)
+        done.update((t, o or t) for t, o in zip(retry, res))
+
+    if tm is not None:
+        # los aciertos de todo el lote, en una sola escritura
+        tm.flush()
+    return [done.get(t, t) for t in texts]
+
+def report_stats():
+    if os.environ.get("MANTR_STATS", "0") != "1":
+        return
+    s = STATS
+    print(f"mantr: {s['segments']} segmentos: {s['memory']} de la memoria, "
+          f"{s['model']} al modelo, {s['skipped']} sin nada que traducir "
+          f"(llamadas evitadas), {s['unmask_retry']} repetidos sin máscara; "
+          f"{s['masked']} tokens protegidos", file=sys.stderr)
 
-def apply_glossary(s: str) -> str:
-    for en, es in GLOSSARY.items():
-        # case-insensitive, por si acaso
-        s = re.sub(rf"\b{re.escape(en)}\b", es, s, flags=re.IGNORECASE)
-    return s
+def model_translate(text, src="en", dest=None):
+    return model_translate_batch([text], src=src, dest=dest)[0]
 
-def translate_safe(text, src="en", dest=TARGET, sleep=0.0):
+def translate_safe_batch(texts, src="en", dest=None):
     """
-    Traduce con tolerancia a fallos y aplica glosario/arreglos
-    cuando el destino es español.
+    Traduce una lista de textos con tolerancia a fallos y aplica el
+    glosario/arreglos del idioma destino.
     """
-    text = (text or "").strip()
-    if not text:
-        return text
+    dest = dest or TARGET
+    texts = [(t or "").strip() for t in texts]
+    outs = model_translate_batch(texts, src=src, dest=dest)
 
-    out = tr.translate(text, src=src, dest=dest) or text
+    # glosario técnico (grep, anchoring, etc.) y arreglillos de "do not",
+    # non-X, espacios, etc., si hay reglas para el idioma (ver mantr_rules)
+    with trace.span("rules"):
+        rules = rules_for(dest)
+        if rules:
+            outs = [rules.apply(o) if o else o for o in outs]
 
-    if dest.startswith("es"):
-        # glosario técnico (grep, anchoring, etc.)
-        out = apply_glossary(out)
-        # arreglillos de "do not", non-X, espacios, etc.
-        out = post_es_fixes(out)
+    return outs
 
+def translate_safe(text, src="en", dest=None, sleep=0.0):
+    out = translate_safe_batch([text], src=src, dest=dest)[0]
     if sleep:
         time.sleep(sleep)
-
-    return out
-
-    # 1) parches específicos + fixes generales en español
-    out = post_es_fixes(out)
-    # 2) glosario otra vez, por si Argos ha dejado palabras raras
-    out = apply_glossary(out)
-
     return out
 
 
@@ -452,66 +424,68 @@ def format_option(flags: str, desc: str, width: int = 80) -> str:
     return header + "\n".join(lines) + "\n"
 
 
-def translate_options_block(block_text: str) -> str:
+def parse_options_block(block_text: str):
+    """
+    Separa un bloque de opciones en elementos:
+      ("option", flags, desc)  → opción con su descripción (aún en inglés)
+      ("line", texto)          → línea que se copia tal cual
+    """
     block_text = unhyphenate_chunk(block_text)
 
-    lines = block_text.splitlines()
-    out_lines = []
+    items = []
     carry = None
+    head = 0   # sangría de la línea de flags de la opción abierta
 
-    def emit_option(flags: str, desc: str) -> None:
-        indent_flags = " " * 7     # columna 8
-        indent_desc = " " * 14     # columna 15 (estilo GNU)
-
-        desc = normalize_for_translation(desc)
-        translated = translate_with_retry(desc)
-        translated = fix_punctuation_spacing(translated)
-
-        wrapped = textwrap.fill(
-            translated,
-            width=WRAP_WIDTH,
-            initial_indent=indent_desc,
-            subsequent_indent=indent_desc
-        )
-
-        out_lines.append(indent_flags + flags)
-        out_lines.append(wrapped)
-
-    for ln in lines:
+    for ln in block_text.splitlines():
         if not ln.strip():
             if carry:
-                flags, desc = carry
-                emit_option(flags, desc)
+                items.append(("option",) + carry)
                 carry = None
-            out_lines.append(ln)
+            items.append(("line", ln))
+            continue
+
+        indent = len(ln) - len(ln.lstrip())
+        # más sangrada que las flags es descripción, aunque empiece por
+        # "-v, --invert-match" o "--count" al cortarse la línea
+        if carry and indent > head:
+            carry = (carry[0], (carry[1] + " " + ln.strip()).strip())
             continue
 
         flags, desc = split_option_line(ln)
         if flags is not None:
             if carry:
-                f2, d2 = carry
-                emit_option(f2, d2)
-            carry = (flags, (desc or "").strip())
+                items.append(("option",) + carry)
+            carry, head = (flags, (desc or "").strip()), indent
             continue
 
         only = match_flag_only(ln)
         if only:
             if carry:
-                f2, d2 = carry
-                emit_option(f2, d2)
-            carry = (only, "")
+                items.append(("option",) + carry)
+            carry, head = (only, ""), indent
             continue
 
         if carry and (ln.startswith(" ") or ln.startswith("\t")):
             carry = (carry[0], (carry[1] + " " + ln.strip()).strip())
         else:
-            out_lines.append(ln)
+            items.append(("line", ln))
 
     if carry:
-        flags, desc = carry
-        emit_option(flags, desc)
+        items.append(("option",) + carry)
 
-    return "\n".join(out_lines) + "\n"
+    return items
+
+def options_segment(items, translated) -> list:
+    """Segmento "options" con las descripciones ya traducidas (dict desc → traducción)."""
+    out = []
+    for item in items:
+        if item[0] == "line":
+            out.append(item[1])
+            continue
+        _, flags, desc = item
+        desc = normalize_for_translation(desc)
+        out.append([flags, fix_punctuation_spacing(translated.get(desc, desc))])
+    return ["options", out]
 
 def fix_punctuation_spacing(s: str) -> str:
     s = re.sub(r'([.,;:!?])([^\s])', r"\1 \2", s)
@@ -519,102 +493,687 @@ def fix_punctuation_spacing(s: str) -> str:
     return s
 
 # --- Consumo de bloques ---
-buf, mode, out_chunks = [], None, []
-current_section = None  # si no lo tienes ya declarado por arriba
-
-def flush():
-    global buf, mode, current_section
-    if mode is None:
-        return
-    chunk = "".join(buf)
-
+def flatten_text(chunk: str) -> str:
+    # primero, desguionar con el chunk tal cual (con \n)
+    chunk2 = unhyphenate_chunk(chunk)
+    # ahora sí, aplanar
+    joined = " ".join([ln.strip() for ln in chunk2.splitlines() if ln.strip()])
+    return normalize_for_translation(joined)
+
+def plan_document(blocks):
+    """
+    Pasada de planificación: recoge todos los segmentos traducibles de la
+    página, sin repetir, en orden de aparición.
+    Devuelve (párrafos, descripciones de opciones).
+    """
+    texts, descs = {}, {}
+    for mode, chunk, section in blocks:
+        if mode == "text" and section != "SYNOPSIS":
+            texts.setdefault(flatten_text(chunk), None)
+        elif mode == "options":
+            for it in parse_options_block(chunk):
+                if it[0] == "option":
+                    descs.setdefault(normalize_for_translation(it[2]), None)
+    return list(texts), list(descs)
+
+def translate_document(blocks, translated=None, translated_opts=None, dest=None):
+    """
+    Traduce por lotes todos los segmentos de los bloques: dict texto → traducción.
+    Si se pasan los dicts de una llamada anterior, solo se traduce lo que falte.
+    """
+    translated = {} if translated is None else translated
+    translated_opts = {} if translated_opts is None else translated_opts
+    texts, descs = plan_document(blocks)
+    texts = [t for t in texts if t not in translated]
+    descs = [d for d in descs if d not in translated_opts]
+    translated.update(zip(texts, translate_safe_batch(texts, dest=dest)))
+    translated_opts.update(zip(descs, translate_with_retry_batch(descs, dest=dest)))
+    return translated, translated_opts
+
+def stream_groups(blocks, size):
+    """
+    Trocea la página para el modo streaming: cada grupo termina en un cambio
+    de sección o al juntar `size` bloques traducibles, lo que antes ocurra.
+    Así NAME/SYNOPSIS/DESCRIPTION llegan al paginador sin esperar al resto.
+    """
+    group, pending = [], 0
+    for block in blocks:
+        if block[0] == "section" and group:
+            yield group
+            group, pending = [], 0
+        group.append(block)
+        if block[0] in ("text", "options"):
+            pending += 1
+            if pending >= size:
+                yield group
+                group, pending = [], 0
+    if group:
+        yield group
+
+def segment(mode, chunk, section, translated, translated_opts, dest=None) -> list:
+    """Un bloque con su traducción, como segmento de mantr_render."""
+    dest = dest or TARGET
     if mode == "text":
-        # ¿En realidad es un bloque de opciones mal clasificado?
-        if looks_like_options_block(chunk):
-            out_chunks.append(translate_options_block(chunk))
-        else:
-            # primero, desguionar con el chunk tal cual (con \n)
-            chunk2 = unhyphenate_chunk(chunk)
-            # ahora sí, aplanar
-            joined = " ".join([ln.strip() for ln in chunk2.splitlines() if ln.strip()])
-            joined = normalize_for_translation(joined)
-
-            if current_section == "SYNOPSIS":
-                # En SYNOPSIS preservamos la sintaxis del comando, no la traducimos
-                wrapped = textwrap.fill(joined, width=WRAP_WIDTH)
-                out_chunks.append(wrapped + "\n\n")
-            else:
-                translated = translate_safe(joined, dest=TARGET)
-                translated = fix_punctuation_spacing(translated)
-                # aquí envolvemos el párrafo a 80 columnas
-                wrapped = textwrap.fill(translated, width=WRAP_WIDTH)
-                out_chunks.append(wrapped + "\n\n")
+        joined = flatten_text(chunk)
+        if section == "SYNOPSIS":
+            # En SYNOPSIS preservamos la sintaxis del comando, no la traducimos
+            return ["text", joined]
+        return ["text", fix_punctuation_spacing(translated.get(joined, joined))]
 
-    elif mode == "options":
-        out_chunks.append(translate_options_block(chunk))
+    if mode == "options":
+        return options_segment(parse_options_block(chunk), translated_opts)
 
-    elif mode == "section":
+    if mode == "section":
         title = (chunk or "").strip()
-        current_section = title
-        if TARGET.startswith("es"):
-            # en español mapeamos NAME→NOMBRE, DESCRIPTION→DESCRIPCIÓN, etc.
-            out_chunks.append(SECTION_MAP.get(title, title) + "\n\n")
-        else:
-            # en otros idiomas dejamos el título original (en inglés)
-            out_chunks.append(title + "\n\n")
+        # NAME→NOMBRE, DESCRIPTION→DESCRIPCIÓN, etc. según las reglas del idioma;
+        # si el idioma no tiene tabla dejamos el título original (en inglés)
+        return ["section", rules_for(dest).sections.get(title, title)]
 
-    else:  # code / others
-        out_chunks.append(chunk + ("\n" if not chunk.endswith("\n") else ""))
+    # code / others
+    return ["code", chunk]
 
-    buf, mode = [], None
+def document(blocks, translated, translated_opts, dest=None) -> list:
+    """La página traducida en segmentos: lo que se guarda en caché."""
+    return [segment(mode, chunk, section, translated, translated_opts, dest)
+            for mode, chunk, section in blocks]
 
-# === LECTURA + CACHÉ ===
+@trace.traced("render")
+def render_block(mode, chunk, section, translated, translated_opts, dest=None) -> str:
+    return mantr_render.render_segment(
+        segment(mode, chunk, section, translated, translated_opts, dest), WIDTH, FORMAT)
 
-# 1) leer toda la entrada de una vez
-raw = sys.stdin.read()
-if not raw:
-    sys.exit(0)
+def render_document(blocks, translated, translated_opts, dest=None) -> str:
+    return "".join(render_block(mode, chunk, section, translated, translated_opts, dest)
+                   for mode, chunk, section in blocks)
 
-# 2) clave de caché
-cache_file = compute_cache_key(TARGET, BACKEND, raw)
+def render_page(segments, dest=None) -> str:
+    """La página entera a partir de los segmentos (de la caché o recién traducidos)."""
+    dest = dest or TARGET
+    return mantr_render.render(segments, WIDTH, FORMAT, title=cache_cmd(), lang=dest)
 
-# 3) si existe en caché, mostrar y salir
-if cache_file.exists():
-    cached = cache_file.read_text(encoding="utf-8", errors="ignore")
+def search_fields(blocks, translated, translated_opts, dest=None) -> dict:
+    """
+    Lo que entra en el índice de búsqueda de la caché (`mantr -k`): la
+    línea NAME, los títulos de sección y cada opción con su descripción,
+    ya traducidos.
+    """
+    dest = dest or TARGET
+    name, headings, options = "", [], []
+    for mode, chunk, section in blocks:
+        if mode == "section":
+            title = (chunk or "").strip()
+            headings.append(rules_for(dest).sections.get(title, title))
+        elif mode == "text" and section == "NAME" and not name:
+            joined = flatten_text(chunk)
+            name = fix_punctuation_spacing(translated.get(joined, joined))
+        elif mode == "options":
+            for it in parse_options_block(chunk):
+                if it[0] == "option":
+                    desc = normalize_for_translation(it[2])
+                    options.append(f"{it[1]} {fix_punctuation_spacing(translated_opts.get(desc, desc))}")
+    return {"name": name, "headings": "\n".join(headings), "options": "\n".join(options)}
+
+def open_pager():
+    """less -R leyendo de una tubería; None si no se puede lanzar."""
     try:
-        p = subprocess.Popen(["less", "-R"], stdin=subprocess.PIPE, text=True)
-        p.communicate(cached)
+        return subprocess.Popen(["less", "-R"], stdin=subprocess.PIPE, text=True)
     except Exception:
-        print(cached, end="")
-    sys.exit(0)
-
-# 4) si no hay caché, procesar como siempre pero usando 'raw'
-for line in raw.splitlines(keepends=True):
-    if line.startswith("--- ") and line.strip().endswith("---"):
-        tag = line.strip().strip("- ").strip("/")
-        if tag in ("text", "code", "options", "section") and line.strip().startswith("--- /"):
-            flush()
+        return None
+
+def show(text: str) -> None:
+    p = open_pager()
+    if p is None:
+        print(text, end="")
+        return
+    try:
+        p.communicate(text)
+    except BrokenPipeError:
+        pass
+
+def stream_document(blocks, on_complete=None, dest=None):
+    """
+    Traduce grupo a grupo (ver stream_groups) en un hilo y lo va enviando al
+    paginador. La traducción no espera a que el usuario avance en less: en
+    cuanto acaba se llama a on_complete(translated, translated_opts), aunque
+    less siga abierto.
+    Devuelve la salida completa, o None si el usuario cierra less antes de
+    terminar: en ese caso no se sigue traduciendo, y lo ya traducido queda
+    en la memoria de traducción para la próxima vez.
+    """
+    pager = open_pager()
+    sink = pager.stdin if pager is not None else sys.stdout
+    ready = queue.Queue()
+    stop = threading.Event()
+    out_chunks, errors = [], []
+
+    def produce():
+        translated, translated_opts = {}, {}
+        try:
+            for group in stream_groups(blocks, BATCH_SIZE):
+                if stop.is_set():
+                    return
+                translate_document(group, translated, translated_opts, dest)
+                text = render_document(group, translated, translated_opts, dest)
+                out_chunks.append(text)
+                ready.put(text)
+            if on_complete is not None:
+                on_complete(translated, translated_opts)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            ready.put(None)
+
+    worker = threading.Thread(target=produce, daemon=True)
+    worker.start()
+    complete = True
+    try:
+        while (text := ready.get()) is not None:
+            sink.write(text)
+            sink.flush()
+            trace.mark("first_output")  # lo que espera el usuario hasta ver algo
+    except BrokenPipeError:
+        complete = False
+        stop.set()
+    if pager is not None:
+        try:
+            pager.stdin.close()
+        except BrokenPipeError:
+            pass
+        pager.wait()
+    worker.join()
+    if errors:
+        raise errors[0]
+    return "".join(out_chunks) if complete else None
+
+# === LECTURA + CACHÉ ===
+
+# MANTR_NO_PAGER=1 (usado por mantr --prefetch): no abre less, solo rellena
+# la caché e imprime "cached" o "translated"
+NO_PAGER = os.environ.get("MANTR_NO_PAGER", "0") == "1"
+# MANTR_STREAM=0 espera a tener la página entera antes de abrir less
+STREAM = False  # ver setup()
+
+# los borradores solo se sirven en uso interactivo: --prefetch, --output y
+# --refine los tratan como si no estuvieran y traducen la página bien
+ACCEPT_DRAFTS = False  # ver setup()
+
+def cached_text(key):
+    """La entrada de caché tal cual, o None (también si es un borrador que no se acepta)."""
+    text = cache.get(key)
+    if text is None:
+        return None
+    if not ACCEPT_DRAFTS and cache.quality(key) == "draft":
+        trace.count("cache.draft_skipped")
+        return None
+    return text
+
+def cached_page(key, dest=None):
+    """La página en caché, ya maquetada para este terminal y formato, o None."""
+    text = cached_text(key)
+    if text is None:
+        return None
+    segments = mantr_render.loads(text)
+    if segments is None:
+        # entrada de una versión anterior, maquetada a 80 columnas: solo vale
+        # tal cual; si no, se vuelve a traducir (casi todo sale de la memoria)
+        if WIDTH == WRAP_WIDTH and FORMAT == "text":
+            return text
+        trace.count("cache.legacy_skipped")
+        return None
+    return render_page(segments, dest)
+
+def run_later(flag, raw=None):
+    """
+    Lanza en segundo plano, con prioridad baja y desligado del terminal,
+    `mantr_consume.py <flag>`, que traduce la página entera con BACKEND y
+    la deja en caché: --refine sustituye un borrador (misma clave) y
+    --complete termina una página de la que solo se ha visto una parte
+    (-o/--option). `raw` es el protocolo de mantr_regex.sh cuando no hay
+    --page.
+    """
+    # nice(1) y no preexec_fn: este proceso puede tener hilos (streaming, varios idiomas)
+    nice = ["nice", "-n", "10"] if shutil.which("nice") else []
+    argv = nice + [sys.executable, str(Path(__file__).resolve()), flag]
+    if ARGS.page:
+        argv += ["--page", ARGS.page] + (["--section", ARGS.section] if ARGS.section else [])
+    argv.append(TARGET)
+    env = dict(os.environ, MANTR_NO_PAGER="1", MANTR_DRAFT="")
+    env.pop("MANTR_TRACE_T0", None)
+    stdin = subprocess.DEVNULL
+    if not ARGS.page:
+        stdin = tempfile.TemporaryFile("w+", encoding="utf-8")
+        stdin.write(raw or "")
+        stdin.seek(0)
+    try:
+        subprocess.Popen(argv, stdin=stdin, stdout=subprocess.DEVNULL,
+                         stderr=subprocess.DEVNULL, env=env, start_new_session=True)
+        trace.count(f"{flag.lstrip('-')}.spawned")
+    except OSError:
+        pass
+    finally:
+        if stdin is not subprocess.DEVNULL:
+            stdin.close()
+
+def serve_cached(text: str, key=None, raw=None) -> None:
+    cache.record(hit=True)
+    draft = key is not None and ACCEPT_DRAFTS and cache.quality(key) == "draft"
+    trace.annotate(outcome="cached", quality="draft" if draft else "final")
+    if NO_PAGER:
+        print("cached")
+    else:
+        show(text)
+    if draft:
+        # el refinado anterior no llegó a terminar (o sigue en marcha: si
+        # es así, este espera al cerrojo y ve que ya no hace falta)
+        run_later("--refine", raw)
+
+
+def fan_out(targets):
+    """
+    Varios idiomas a la vez: la página se localiza, se lee y se trocea una
+    sola vez, y cada idioma que no esté en caché se traduce en su propio
+    hilo (con el backend cargado una vez por proceso). Cada página se
+    guarda en caché, con su cerrojo, en cuanto está lista.
+    Devuelve {idioma: (salida, "cached" | "translated")}.
+    """
+    results = {}
+    source = None
+    if ARGS.page and PARSER != "rendered":
+        source = locate_source(ARGS.page, ARGS.section)
+    source_keys = {lang: source_cache_key(lang, BACKEND, source) if source is not None else None
+                   for lang in targets}
+    for lang in targets:
+        cached = cached_page(source_keys[lang], lang) if source_keys[lang] else None
+        if cached is not None:
+            trace.count("cache.source_hit")
+            results[lang] = (cached, "cached")
+    missing = [lang for lang in targets if lang not in results]
+    if not missing:
+        return results
+
+    if ARGS.page:
+        blocks, raw = load_page(ARGS.page, ARGS.section, path=source)
+    else:
+        raw = sys.stdin.read()
+        blocks = read_protocol(raw) if raw else []
+    if not raw:
+        return results
+    trace.annotate(blocks=len(blocks))
+
+    keys = {lang: compute_cache_key(lang, BACKEND, raw) for lang in missing}
+    locks, todo = {}, []
+    try:
+        # los cerrojos, siempre en el mismo orden: dos `mantr es,fr` y
+        # `mantr fr,es` a la vez no se quedan esperando cada uno al otro
+        for lang in sorted(missing):
+            cached = cached_page(keys[lang], lang)
+            if cached is None:
+                locks[lang] = ExitStack()
+                locks[lang].enter_context(cache.lock(keys[lang], on_wait=lambda lang=lang: print(
+                    f"mantr: otro proceso está traduciendo {cache_cmd()} ({lang}), esperando...",
+                    file=sys.stderr)))
+                cached = cached_page(keys[lang], lang)
+            if cached is not None:
+                if lang in locks:
+                    locks.pop(lang).close()
+                if source_keys[lang]:
+                    cache.alias(source_keys[lang], keys[lang])
+                results[lang] = (cached, "cached")
+            else:
+                todo.append(lang)
+
+        def work(lang):
+            translated, translated_opts = translate_document(blocks, dest=lang)
+            return (document(blocks, translated, translated_opts, dest=lang),
+                    search_fields(blocks, translated, translated_opts, dest=lang))
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=max(1, len(todo))) as pool:
+            futures = {pool.submit(work, lang): lang for lang in todo}
+            for fut in as_completed(futures):
+                lang = futures[fut]
+                segments, fields = fut.result()
+                # la caché se escribe desde este hilo, según va acabando cada idioma
+                cache.put(keys[lang], mantr_render.dumps(segments, lang), cache_cmd(), lang, BACKEND,
+                          cost=time.monotonic() - started,
+                          aliases=[source_keys[lang]] if source_keys[lang] else [],
+                          index=fields)
+                locks.pop(lang).close()
+                results[lang] = (render_page(segments, lang), "translated")
+    finally:
+        for lock in locks.values():
+            lock.close()
+    return results
+
+
+def output_path(lang) -> Path:
+    return Path(ARGS.output) / lang / f"{cache_cmd()}.{'html' if FORMAT == 'html' else 'txt'}"
+
+
+def main_fan_out():
+    """mantr ls es,fr,de [--output DIR]"""
+    results = fan_out(TARGETS)
+    if not results:
+        sys.exit(0)
+    for lang in TARGETS:
+        if lang in results:
+            cache.record(hit=results[lang][1] == "cached")
+    trace.annotate(outcome=",".join(f"{lang}:{results[lang][1]}" for lang in TARGETS
+                                    if lang in results))
+
+    if ARGS.output:
+        for lang in TARGETS:
+            if lang not in results:
+                continue
+            path = output_path(lang)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_text(results[lang][0], encoding="utf-8")
+            print(f"{lang}: {results[lang][1]} → {path}")
+    elif NO_PAGER:
+        for lang in TARGETS:
+            if lang in results:
+                print(f"{lang}: {results[lang][1]}")
+    else:
+        # se muestra el primer idioma; el resto ya queda en caché
+        rest = [lang for lang in TARGETS[1:] if lang in results]
+        if rest:
+            print(f"mantr: {', '.join(rest)} en caché (mantr {cache_cmd()} <idioma> para verlos)",
+                  file=sys.stderr)
+        if TARGET in results:
+            show(results[TARGET][0])
+
+    report_stats()
+
+
+# === SOLO UNA PARTE (-o SECCIÓN / --option=FLAG) ===
+# La página se indexa por secciones (split_sections) y por opciones
+# (flag_names) antes de traducir nada, y solo se traduce lo pedido; al
+# cerrar less, run_later("--complete") traduce el resto en segundo plano.
+# Cada sección traducida se guarda en caché como pieza (piece_key) en
+# cuanto está, así que nada de lo hecho se pierde aunque se corte a medias.
+SECTION_QUERY, OPTION_QUERY = [], []  # ver setup()
+PARTIAL = False
+
+def split_sections(items) -> list:
+    """Bloques (o segmentos) por sección: cada grupo empieza en su título, salvo quizá el primero."""
+    groups = [[]]
+    for item in items:
+        if item[0] == "section" and groups[-1]:
+            groups.append([])
+        groups[-1].append(item)
+    return [g for g in groups if g]
+
+def section_title(group) -> str:
+    return group[0][1].strip() if group[0][0] == "section" else ""
+
+def wanted_section(title, dest=None) -> bool:
+    """¿Pide -o esta sección? Vale el título en inglés o traducido, sin distinguir mayúsculas."""
+    dest = dest or TARGET
+    titles = rules_for(dest).sections
+    names = {title.casefold(), titles.get(title, title).casefold()}
+    return any(q.casefold() in names or titles.get(q.upper(), q).casefold() in names
+               for q in SECTION_QUERY)
+
+def flag_names(flags) -> set:
+    """'-e PATTERNS, --regexp=PATTERNS' → {'-e', '--regexp'}; '--color[=WHEN]' → {'--color'}."""
+    return {re.split(r"[\s=\[]", f.strip(), maxsplit=1)[0] for f in flags.split(",") if f.strip()}
+
+def wanted_option(flags) -> bool:
+    """¿Pide --option alguno de estos flags? 'recursive' vale por -recursive y --recursive."""
+    names = flag_names(flags)
+    return any(names & ({q} if q.startswith("-") else {f"-{q}", f"--{q}"}) for q in OPTION_QUERY)
+
+def piece_key(key, index) -> str:
+    """Clave de la sección `index` de la página `key`, guardada suelta."""
+    return f"{key}_s{index}"
+
+def section_piece(group, key, index, dest=None) -> list:
+    """Los segmentos de una sección: de la caché si ya es una pieza; si no, se traduce y se guarda."""
+    segments = mantr_render.loads(cached_text(piece_key(key, index)))
+    if segments is not None:
+        trace.count("cache.piece_hit")
+        return segments
+    translated, translated_opts = translate_document(group, dest=dest)
+    segments = document(group, translated, translated_opts, dest)
+    store_piece(key, index, segments, dest)
+    return segments
+
+def store_piece(key, index, segments, dest=None):
+    dest = dest or TARGET
+    # sin campos de búsqueda: `mantr -k` encuentra la página cuando está entera
+    cache.put(piece_key(key, index), mantr_render.dumps(segments, dest), cache_cmd(), dest,
+              BACKEND, quality="draft" if DRAFTING else "final")
+
+def translate_by_section(blocks, key, dest=None):
+    """
+    Como translate_document, pero sección a sección, guardando cada una
+    como pieza según acaba (mantr_consume.py --complete).
+    """
+    translated, translated_opts = {}, {}
+    for index, group in enumerate(split_sections(blocks)):
+        translate_document(group, translated, translated_opts, dest)
+        store_piece(key, index, document(group, translated, translated_opts, dest), dest)
+    return translated, translated_opts
+
+def select_segments(segments) -> list:
+    """La parte pedida de una página ya traducida entera (de la caché)."""
+    out = []
+    for group in split_sections(segments):
+        if SECTION_QUERY and wanted_section(section_title(group)):
+            out.extend(group)
             continue
-        if tag in ("text", "code", "options", "section"):
-            flush()
-            mode = tag
+        hits = [item for kind, body in group if kind == "options"
+                for item in body if not isinstance(item, str) and wanted_option(item[0])]
+        if hits:
+            out.extend(group[:1] if section_title(group) else [])
+            out.append(["options", hits])
+    return out
+
+def translate_selection(blocks, key, dest=None) -> list:
+    """
+    Traduce solo la parte pedida: las secciones de -o (como piezas, ver
+    section_piece) y las descripciones de las opciones de --option.
+    """
+    out = []
+    for index, group in enumerate(split_sections(blocks)):
+        title = section_title(group)
+        if SECTION_QUERY and wanted_section(title, dest):
+            out.extend(section_piece(group, key, index, dest))
             continue
-    buf.append(line)
+        items = [it for mode, chunk, _ in group if mode == "options"
+                 for it in parse_options_block(chunk) if it[0] == "option" and wanted_option(it[1])]
+        if items:
+            descs = [normalize_for_translation(it[2]) for it in items]
+            translated = dict(zip(descs, translate_with_retry_batch(descs, dest=dest)))
+            if title:
+                out.append(segment(*group[0], {}, {}, dest))
+            out.append(options_segment(items, translated))
+    return out
 
-flush()
+def serve_cached_selection(key) -> bool:
+    """La parte pedida de la página entera en caché; False si no está (o es de otra versión)."""
+    segments = mantr_render.loads(cached_text(key))
+    if segments is None:
+        return False
+    cache.record(hit=True)
+    trace.annotate(outcome="cached")
+    serve_selection(select_segments(segments), [section_title(g) for g in split_sections(segments)])
+    return True
+
+def serve_selection(segments, titles) -> None:
+    """Muestra la parte pedida; si no hay nada, dice qué secciones tiene la página."""
+    if not segments:
+        asked = ", ".join(SECTION_QUERY + OPTION_QUERY)
+        print(f"mantr: {cache_cmd()}: nada que coincida con {asked}"
+              f" (secciones: {', '.join(t for t in titles if t)})", file=sys.stderr)
+        sys.exit(1)
+    if NO_PAGER:
+        print(render_page(segments), end="")
+    else:
+        show(render_page(segments))
 
-# 5) generar salida final
-output = "".join(out_chunks)
 
-# 6) guardar en caché
-try:
-    cache_file.write_text(output, encoding="utf-8")
-except Exception:
-    pass  # si falla la caché no rompemos nada
+def setup(argv):
+    """
+    Lee los argumentos y prepara lo que depende de ellos: idiomas, ancho,
+    formato, borradores, caché, traductor y memoria de traducción.
+    """
+    global ARGS, TARGETS, TARGET, WIDTH, FORMAT, DRAFTING, ENGINE, MEMORY_BACKENDS
+    global STREAM, ACCEPT_DRAFTS, SECTION_QUERY, OPTION_QUERY, PARTIAL, cache, tr, tm
+    ARGS = parse_args(argv)
+    TARGETS = list(dict.fromkeys(l.strip() for l in ARGS.lang.split(",") if l.strip())) or ["es"]
+    TARGET = TARGETS[0]
+    WIDTH = mantr_render.page_width(terminal=not ARGS.output)
+    FORMAT = ARGS.format
+
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    with trace.span("cache.open"):
+        cache = open_cache(CACHE_DIR)
+    trace.annotate(cmd=cache_cmd(), lang=",".join(TARGETS), section=ARGS.section)
+
+    DRAFTING = (bool(DRAFT) and DRAFT != BACKEND and not (ARGS.refine or ARGS.complete)
+                and not ARGS.output and len(TARGETS) == 1 and not NO_PAGER)
+    ENGINE = DRAFT if DRAFTING else BACKEND
+    # un borrador aprovecha lo que ya tradujo BACKEND antes que lo suyo
+    MEMORY_BACKENDS = (BACKEND, DRAFT) if DRAFTING else (BACKEND,)
+    with trace.span("translator.make"):
+        tr = make_translator(ENGINE)
+    trace.annotate(backend=BACKEND, translator=type(tr).__name__,
+                   quality="draft" if DRAFTING else "final")
+    with trace.span("tm.open"):
+        tm = open_memory(CACHE_DIR)
+
+    # MANTR_STREAM=0 espera a tener la página entera antes de abrir less
+    STREAM = os.environ.get("MANTR_STREAM", "1") != "0" and not NO_PAGER and FORMAT != "html"
+    # los borradores solo se sirven en uso interactivo: --prefetch, --output,
+    # --refine y --complete los tratan como si no estuvieran
+    ACCEPT_DRAFTS = not NO_PAGER and not ARGS.output and not (ARGS.refine or ARGS.complete)
+
+    SECTION_QUERY = [q.strip() for arg in ARGS.only for q in arg.split(",") if q.strip()]
+    OPTION_QUERY = [q.strip() for q in ARGS.option if q.strip()]
+    PARTIAL = bool(SECTION_QUERY or OPTION_QUERY) and not (ARGS.refine or ARGS.complete)
+
+
+def main():
+    setup(sys.argv[1:])
+    if len(TARGETS) > 1 or ARGS.output:
+        if PARTIAL:
+            print("mantr: -o y --option van con un solo idioma y sin --output", file=sys.stderr)
+            sys.exit(2)
+        return main_fan_out()
+
+    # 1) con --page, la clave sale de la identidad del fuente (`man -w`):
+    #    si ya está en caché, ni se lee ni se renderiza la página
+    source, source_key = None, None
+    if ARGS.page and PARSER != "rendered":
+        source = locate_source(ARGS.page, ARGS.section)
+        if source is not None:
+            source_key = source_cache_key(TARGET, BACKEND, source)
+            if PARTIAL and serve_cached_selection(source_key):
+                sys.exit(0)
+            cached = cached_page(source_key)
+            if cached is not None:
+                trace.count("cache.source_hit")
+                serve_cached(cached, source_key)
+                sys.exit(0)
+
+    # 2) leer la página: directamente (--page) o el protocolo de mantr_regex.sh
+    if ARGS.page:
+        blocks, raw = load_page(ARGS.page, ARGS.section, path=source)
+    else:
+        raw = sys.stdin.read()
+        blocks = None
+    if not raw:
+        sys.exit(0)
+
+    # 3) clave por contenido: la misma página con otro mtime (reinstalada,
+    #    o renderizada por man) reutiliza la traducción
+    cache_key = compute_cache_key(TARGET, BACKEND, raw)
+    if PARTIAL:
+        # 3b) solo una parte: de la página entera si ya está; si no, se
+        #     traduce lo pedido y el resto en segundo plano
+        if serve_cached_selection(cache_key):
+            if source_key is not None:
+                cache.alias(source_key, cache_key)
+            sys.exit(0)
+        if blocks is None:
+            blocks = read_protocol(raw)
+        trace.annotate(outcome="partial", blocks=len(blocks))
+        serve_selection(translate_selection(blocks, cache_key),
+                        [section_title(g) for g in split_sections(blocks)])
+        run_later("--complete", raw)
+        report_stats()
+        sys.exit(0)
+    cached = cached_page(cache_key)
+    lock = ExitStack()
+    if cached is None:
+        # 4) cerrojo sobre la página: si otro proceso la está traduciendo,
+        #    se espera a que la deje en caché en vez de traducirla dos veces
+        lock.enter_context(cache.lock(cache_key, on_wait=lambda: print(
+            f"mantr: otro proceso está traduciendo {cache_cmd()}, esperando...",
+            file=sys.stderr)))
+        cached = cached_page(cache_key)
+    if cached is not None:
+        lock.close()
+        if source_key is not None:
+            cache.alias(source_key, cache_key)
+        serve_cached(cached, cache_key, raw)
+        sys.exit(0)
+    cache.record(hit=False)
+    trace.annotate(outcome="translated")
+
+    # 5) en cuanto la página está completa se guarda en caché, con lo que ha
+    #    costado traducirla (--cache-stats lo usa) y sus campos para `mantr -k`,
+    #    y se suelta el cerrojo
+    started = time.monotonic()
+
+    def store(translated, translated_opts, segments=None):
+        if segments is None:
+            segments = document(blocks, translated, translated_opts)
+        stored = cache.put(cache_key, mantr_render.dumps(segments, TARGET), cache_cmd(), TARGET,
+                           BACKEND, cost=time.monotonic() - started,
+                           aliases=[source_key] if source_key else [],
+                           quality="draft" if DRAFTING else "final",
+                           index=search_fields(blocks, translated, translated_opts))
+        if stored:
+            # las piezas de -o/--complete ya están en la página entera
+            cache.discard(piece_key(cache_key, i) for i in range(len(split_sections(blocks))))
+        lock.close()
+
+    # 6) planificar, traducir por lotes y recomponer en orden
+    with lock:
+        if blocks is None:
+            blocks = read_protocol(raw)
+        trace.annotate(blocks=len(blocks))
+        if STREAM:
+            # se va mostrando según se traduce
+            output = stream_document(blocks, on_complete=store)
+            if output is None:
+                trace.annotate(outcome="aborted")  # cerraron less antes del final
+        else:
+            if ARGS.complete:
+                translated, translated_opts = translate_by_section(blocks, cache_key)
+            else:
+                translated, translated_opts = translate_document(blocks)
+            segments = document(blocks, translated, translated_opts)
+            output = render_page(segments)
+            store(translated, translated_opts, segments)
+
+    # 7) mostrar por less (como antes)
+    if NO_PAGER:
+        print("translated")
+    elif not STREAM:
+        show(output)
+
+    # 8) con MANTR_DRAFT, ya con less cerrado, la traducción buena en segundo plano
+    if DRAFTING:
+        run_later("--refine", raw)
 
-# 7) mostrar por less (como antes)
-try:
-    p = subprocess.Popen(["less", "-R"], stdin=subprocess.PIPE, text=True)
-    p.communicate(output)
-except Exception:
-    print(output, end="")
+    report_stats()
+
+
+if __name__ == "__main__":
+    try:
+        main()
+    finally:
+        trace.counters(STATS)
@@ -0,0 +1,420 @@
+"""
+Paquetes de traducciones de mantr (.mpack).
+
+Un paquete es un único fichero de solo lectura con páginas de la caché y
+segmentos de la memoria de traducción de un idioma, para repartir el
+núcleo (coreutils, grep, tar, findutils, bash...) ya traducido en vez de
+traducirlo en cada máquina. No se carga en memoria: se abre con mmap y
+cada consulta es una búsqueda binaria en su índice.
+
+Formato (little endian):
+
+  cabecera  HEADER: "MANTRPK1", versión, nº de páginas, nº de segmentos y
+            dónde empiezan los dos índices y los metadatos
+  datos     las páginas tal como están en la caché (gzip) y las
+            traducciones de los segmentos (UTF-8), una detrás de otra
+  índices   registros RECORD ordenados por resumen (16 bytes): blake2b de
+            la clave de caché (también de sus alias) o el principio del
+            sha256 de mantr_tm.segment_key, con la posición y el tamaño
+  metadatos JSON comprimido: idioma, versión, las entradas (para --show-cache
+            y --cache-stats) y los campos de búsqueda (para `mantr -k`)
+
+Se usan los paquetes de <caché>/packs (donde los deja --import-pack) y de
+MANTR_PACK_PATH (carpetas separadas por ":"; por defecto
+/usr/share/mantr/packs, donde los instalaría un .deb por idioma): basta
+con dejar el fichero ahí. Van después de las demás capas de la caché y
+de la memoria de traducción, que siempre ganan. `mantr --clear-cache` no
+toca <caché>/packs (solo las páginas); `--clear-cache --all`, sí.
+
+Uso directo (lo llaman `mantr --export-pack` / `mantr --import-pack`):
+  python3 mantr_pack.py export <idioma> [-o fichero] [--backend B] [--no-pages] [--no-tm]
+  python3 mantr_pack.py import <fichero>...
+  python3 mantr_pack.py info <fichero>...
+"""
+import os, re, sys, gzip, json, mmap, time, struct, hashlib, argparse, sqlite3, tempfile
+from pathlib import Path
+
+import mantr_trace as trace
+
+MAGIC = b"MANTRPK1"
+VERSION = 1
+SUFFIX = ".mpack"
+
+# magic, versión, flags, páginas, segmentos, índice de páginas, de segmentos,
+# posición y tamaño de los metadatos
+HEADER = struct.Struct("<8sIIIIQQQQ")
+# resumen, posición, tamaño, flags
+RECORD = struct.Struct("<16sQII")
+DIGEST = 16
+
+PACK_PATH = os.environ.get("MANTR_PACK_PATH", "/usr/share/mantr/packs")
+
+
+class PackError(ValueError):
+    """El fichero no es un paquete de mantr o es de una versión que no se entiende."""
+
+
+def page_digest(key):
+    return hashlib.blake2b(key.encode("utf-8"), digest_size=DIGEST).digest()
+
+
+def segment_digest(tm_key):
+    """tm_key: mantr_tm.segment_key (sha256 en hexadecimal)."""
+    return bytes.fromhex(tm_key)[:DIGEST]
+
+
+# ==================== LECTURA ====================
+class Pack:
+    """Un paquete abierto con mmap; las consultas no leen más que lo que tocan."""
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            try:
+                self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            except ValueError:
+                raise PackError(f"{self.path}: fichero vacío") from None
+        if len(self._mm) < HEADER.size:
+            raise PackError(f"{self.path}: no es un paquete de mantr")
+        (magic, version, _flags, self.n_pages, self.n_segments,
+         self._pages_at, self._segments_at, self._meta_at, self._meta_len) = HEADER.unpack_from(self._mm)
+        if magic != MAGIC:
+            raise PackError(f"{self.path}: no es un paquete de mantr")
+        if version != VERSION:
+            raise PackError(f"{self.path}: versión {version} del formato (se entiende la {VERSION})")
+        if self._meta_at + self._meta_len > len(self._mm):
+            raise PackError(f"{self.path}: fichero incompleto")
+        self._meta = None
+
+    def _find(self, at, count, digest):
+        """Búsqueda binaria en un índice: (posición, tamaño) o None."""
+        mm, lo, hi = self._mm, 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            pos = at + mid * RECORD.size
+            probe = mm[pos:pos + DIGEST]
+            if probe < digest:
+                lo = mid + 1
+            elif probe > digest:
+                hi = mid
+            else:
+                _, off, size, _ = RECORD.unpack_from(mm, pos)
+                return off, size
+        return None
+
+    def page(self, key):
+        """La entrada de caché `key` (texto, como PageCache.get) o None."""
+        found = self._find(self._pages_at, self.n_pages, page_digest(key))
+        if found is None:
+            return None
+        off, size = found
+        try:
+            return gzip.decompress(self._mm[off:off + size]).decode("utf-8")
+        except (OSError, EOFError, UnicodeDecodeError):
+            return None
+
+    def segment(self, tm_key):
+        """La traducción del segmento (clave de mantr_tm.segment_key) o None."""
+        found = self._find(self._segments_at, self.n_segments, segment_digest(tm_key))
+        if found is None:
+            return None
+        off, size = found
+        return self._mm[off:off + size].decode("utf-8", errors="replace")
+
+    @property
+    def meta(self):
+        if self._meta is None:
+            raw = self._mm[self._meta_at:self._meta_at + self._meta_len]
+            try:
+                self._meta = json.loads(gzip.decompress(raw).decode("utf-8"))
+            except (OSError, EOFError, ValueError):
+                self._meta = {}
+        return self._meta
+
+    @property
+    def size(self):
+        return len(self._mm)
+
+    def close(self):
+        try:
+            self._mm.close()
+        except (BufferError, ValueError):
+            pass
+
+
+_OPEN = {}  # ruta → Pack: la caché y la memoria comparten el mismo mmap
+
+
+def pack_dirs(cache_dir):
+    return [Path(cache_dir) / "packs"] + [Path(p) for p in PACK_PATH.split(":") if p]
+
+
+def open_packs(cache_dir):
+    """Los paquetes de las carpetas de pack_dirs; los que no se pueden abrir se saltan."""
+    packs = []
+    for folder in pack_dirs(cache_dir):
+        try:
+            files = sorted(folder.glob(f"*{SUFFIX}"))
+        except OSError:
+            continue
+        for path in files:
+            real = path.resolve()
+            if real not in _OPEN:
+                try:
+                    with trace.span("pack.open"):
+                        _OPEN[real] = Pack(real)
+                except (OSError, PackError):
+                    _OPEN[real] = None
+            if _OPEN[real] is not None and _OPEN[real] not in packs:
+                packs.append(_OPEN[real])
+    return packs
+
+
+class PackCache:
+    """Un paquete como capa de solo lectura de la caché (ver mantr_cache.LayeredCache)."""
+    readonly = True
+    shared = False
+    available = True
+    _fts = True  # `mantr -k` busca también en los campos de los metadatos
+
+    def __init__(self, pack):
+        self.pack = pack
+        self.root = pack.path
+        self.max_bytes = 0
+
+    @trace.traced("pack.get")
+    def get(self, key):
+        return self.pack.page(key)
+
+    def quality(self, key):
+        # solo se empaquetan traducciones definitivas
+        return "final" if self.pack._find(self.pack._pages_at, self.pack.n_pages,
+                                          page_digest(key)) else None
+
+    def record(self, hit):
+        pass
+
+    def alias(self, alias, key):
+        pass
+
+    def entries(self):
+        created = self.pack.meta.get("created", 0)
+        return [(key, lang, backend, size, raw, 0, created)
+                for key, cmd, lang, backend, size, raw in self.pack.meta.get("entries", [])]
+
+    def stats(self, top=10):
+        entries = self.pack.meta.get("entries", [])
+        return {"entries": len(entries), "drafts": 0, "size": self.pack.size,
+                "raw_size": sum(e[5] for e in entries), "max": 0,
+                "lookups": 0, "hits": 0, "evictions": 0, "costly": [],
+                "segments": self.pack.n_segments}
+
+    def search(self, query, lang=None, limit=50):
+        """Como PageCache.search, recorriendo los campos de los metadatos."""
+        from mantr_cache import fold
+        words = [fold(w) for w in re.findall(r'"([^"]+)"', query)]
+        if not words:
+            return []
+        hits = []
+        for cmd, lng, name, headings, options in self.pack.meta.get("search", []):
+            if lang and lng != lang and not lng.startswith(lang + "_"):
+                continue
+            fields = [fold(f) for f in (cmd, name, headings, options)]
+            score = 0.0
+            for w in words:
+                rx = re.compile(r"\b" + re.escape(w))
+                found = [weight for weight, f in zip((10.0, 5.0, 2.0, 1.0), fields) if rx.search(f)]
+                if not found:
+                    break
+                score += sum(found)
+            else:
+                line = next((ln for ln in options.splitlines()
+                             if any(w in fold(ln) for w in words)), "")
+                hits.append((-score, cmd, lng, name, line[:80]))
+        return sorted(hits)[:limit]
+
+    def close(self):
+        pass
+
+
+# ==================== ESCRITURA ====================
+def write_pack(path, pages, segments, meta):
+    """
+    pages: [(claves, página en gzip)]; segments: [(clave de mantr_tm, traducción)].
+    Se escribe en un temporal y se renombra: quien lo tenga abierto sigue con el anterior.
+    """
+    path = Path(path)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\0" * HEADER.size)
+            page_records, seg_records = {}, {}
+            for keys, blob in pages:
+                off = f.tell()
+                f.write(blob)
+                for key in keys:
+                    page_records.setdefault(page_digest(key), (off, len(blob)))
+            for tm_key, target in segments:
+                data = target.encode("utf-8")
+                off = f.tell()
+                f.write(data)
+                seg_records.setdefault(segment_digest(tm_key), (off, len(data)))
+            indexes = []
+            for records in (page_records, seg_records):
+                indexes.append(f.tell())
+                for digest in sorted(records):
+                    f.write(RECORD.pack(digest, *records[digest], 0))
+            meta_at = f.tell()
+            raw = gzip.compress(json.dumps(meta, ensure_ascii=False).encode("utf-8"))
+            f.write(raw)
+            f.seek(0)
+            f.write(HEADER.pack(MAGIC, VERSION, 0, len(page_records), len(seg_records),
+                                indexes[0], indexes[1], meta_at, len(raw)))
+        os.chmod(tmp, 0o644)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    return len(page_records), len(seg_records)
+
+
+# secciones sueltas de una página (mantr_consume.piece_key): no son páginas
+PIECE_RE = re.compile(r"_s\d+$")
+
+
+def collect_pages(cache, lang, backend=None):
+    """Entradas definitivas de `lang` en las capas SQLite de la caché, con sus alias."""
+    pages, entries, search, seen = [], [], [], set()
+    for layer in cache.layers:
+        db = getattr(layer, "_db", None)
+        if isinstance(layer, PackCache) or db is None:
+            continue
+        sql = ("SELECT rowid, key, cmd, lang, backend, size, raw_size FROM entries"
+               " WHERE lang = ? AND quality = 'final'")
+        args = [lang]
+        if backend:
+            sql += " AND backend = ?"
+            args.append(backend)
+        try:
+            rows = db.execute(sql, args).fetchall()
+        except sqlite3.Error:
+            continue
+        for rowid, key, cmd, lng, be, size, raw in rows:
+            if key in seen or PIECE_RE.search(key):
+                continue
+            try:
+                blob = (layer.pages / f"{key}.gz").read_bytes()
+            except OSError:
+                continue
+            seen.add(key)
+            aliases = [a for (a,) in db.execute("SELECT alias FROM aliases WHERE key = ?", (key,))]
+            pages.append(([key] + aliases, blob))
+            entries.append([key, cmd, lng, be, len(blob), raw])
+            if layer._fts:
+                row = db.execute("SELECT name, headings, options FROM search WHERE rowid = ?",
+                                 (rowid,)).fetchone()
+                if row:
+                    search.append([cmd, lng, *row])
+    return pages, entries, search
+
+
+def collect_segments(tm, lang, backend=None):
+    if tm is None or tm._db is None:
+        return []
+    sql, args = "SELECT key, target FROM segments WHERE lang = ?", [lang]
+    if backend:
+        sql += " AND backend = ?"
+        args.append(backend)
+    with tm._lock:
+        return tm._db.execute(sql, args).fetchall()
+
+
+def export(args):
+    from mantr_cache import CACHE_DIR, fmt_size, open_cache
+    from mantr_tm import open_memory
+    out = Path(args.output or f"mantr-{args.lang}{SUFFIX}")
+    pages, entries, search = ([], [], []) if args.no_pages else \
+        collect_pages(open_cache(CACHE_DIR), args.lang, args.backend)
+    segments = [] if args.no_tm else collect_segments(open_memory(CACHE_DIR), args.lang, args.backend)
+    if not pages and not segments:
+        print(f"mantr: no hay nada traducido al idioma {args.lang} que empaquetar.", file=sys.stderr)
+        return 1
+    meta = {"format": VERSION, "lang": args.lang, "backend": args.backend or "",
+            "created": time.time(), "entries": entries, "search": search}
+    n_keys, n_segments = write_pack(out, pages, segments, meta)
+    print(f"{out}: {len(entries)} páginas ({n_keys} claves), {n_segments} segmentos, "
+          f"{fmt_size(out.stat().st_size)}")
+    return 0
+
+
+def import_packs(args):
+    from mantr_cache import CACHE_DIR
+    dest = pack_dirs(CACHE_DIR)[0]
+    status = 0
+    for name in args.files:
+        src = Path(name)
+        try:
+            pack = Pack(src)
+            n_pages, n_segments, lang = pack.n_pages, pack.n_segments, pack.meta.get("lang", "?")
+            pack.close()
+            dest.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=dest, prefix=f".{src.name}.")
+            with os.fdopen(fd, "wb") as out, open(src, "rb") as f:
+                while chunk := f.read(1 << 20):
+                    out.write(chunk)
+            target = dest / (src.name if src.name.endswith(SUFFIX) else src.name + SUFFIX)
+            os.replace(tmp, target)
+        except (OSError, PackError) as e:
+            print(f"mantr: {e}", file=sys.stderr)
+            status = 1
+            continue
+        print(f"{target}: {n_pages} claves de páginas y {n_segments} segmentos ({lang})")
+    if status == 0 and args.files:
+        print("(se conservan con --clear-cache; --clear-cache --all los borra)")
+    return status
+
+
+def info(args):
+    from mantr_cache import fmt_size
+    status = 0
+    for name in args.files:
+        try:
+            pack = Pack(name)
+        except (OSError, PackError) as e:
+            print(f"mantr: {e}", file=sys.stderr)
+            status = 1
+            continue
+        meta = pack.meta
+        when = time.strftime("%Y-%m-%d %H:%M", time.localtime(meta.get("created", 0)))
+        print(f"{name}: formato {VERSION}, idioma {meta.get('lang', '?')}, "
+              f"backend {meta.get('backend') or 'todos'}, creado {when}")
+        print(f"  {len(meta.get('entries', []))} páginas ({pack.n_pages} claves), "
+              f"{pack.n_segments} segmentos, {fmt_size(pack.size)}")
+        pack.close()
+    return status
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(prog="mantr_pack.py")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("export", help="empaqueta lo traducido a un idioma")
+    p.add_argument("lang")
+    p.add_argument("-o", "--output", help=f"fichero (por defecto: mantr-<idioma>{SUFFIX})")
+    p.add_argument("--backend", help="solo lo traducido con este backend")
+    p.add_argument("--no-pages", action="store_true", help="sin las páginas de la caché")
+    p.add_argument("--no-tm", action="store_true", help="sin la memoria de traducción")
+    p.set_defaults(run=export)
+    p = sub.add_parser("import", help="instala paquetes en <caché>/packs")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(run=import_packs)
+    p = sub.add_parser("info", help="describe paquetes")
+    p.add_argument("files", nargs="+")
+    p.set_defaults(run=info)
+    args = ap.parse_args(argv)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
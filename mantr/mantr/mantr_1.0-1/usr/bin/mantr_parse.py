@@ -0,0 +1,677 @@
+"""
+Lectura de páginas man a bloques, dentro del propio proceso.
+
+Sustituye a `man | col -bx | awk` (mantr_regex.sh) y al protocolo de texto
+`--- tipo --- ... --- /tipo ---` que luego había que volver a trocear.
+El resultado es siempre una lista de Block(kind, text, section), con kind
+en "section", "text", "options" o "code", en orden de documento; el texto
+de cada bloque tiene la misma forma que tendría en la página renderizada
+(sangría de 7 columnas, descripciones de opciones a 14), así que el resto
+de mantr lo trata igual venga de donde venga.
+
+Hay tres entradas:
+
+  parse_roff(fuente)       el fuente man(7) que devuelve `man -w`, sin groff
+  parse_rendered(texto)    la página ya renderizada por man (clasificador de
+                           mantr_regex.sh portado a Python)
+  read_protocol(texto)     la salida de mantr_regex.sh, por compatibilidad
+
+load_page() elige: el fuente si es man(7) sencillo, y si no (mdoc, tbl,
+fichero comprimido con zstd...) la página renderizada.
+"""
+import os, re, bz2, gzip, lzma, subprocess, textwrap
+from collections import namedtuple
+from pathlib import Path
+
+import mantr_trace as trace
+
+# Se incluye en la clave de caché: si cambia la forma de trocear, cambia la clave
+PARSER_VERSION = "2"
+# MANTR_PARSER: auto | roff | rendered (ver load_page)
+PARSER = os.environ.get("MANTR_PARSER", "auto")
+
+Block = namedtuple("Block", "kind text section")
+BLOCK_TAGS = ("text", "code", "options", "section")
+
+INDENT = " " * 7        # sangría del cuerpo en la página renderizada
+DESC_INDENT = " " * 14  # sangría de la descripción de una opción
+WIDTH = 80              # columnas de la página renderizada (MANWIDTH)
+
+
+class Unsupported(Exception):
+    """El fuente no es man(7) que sepamos leer; hay que pasar por man."""
+
+
+# Patrones reutilizables para flags cortas / largas.
+# Soportan ejemplos como:
+#   -q
+#   -q, --quiet
+#   -q, --quiet, --silent
+#   --color[=WHEN]
+#   --color[=WHEN], --colour[=WHEN]
+FLAG_SHORT = r'-[A-Za-z0-9]+'
+FLAG_LONG  = r'--[A-Za-z0-9][A-Za-z0-9-]*(?:\[=[^]]+\]|=[^\s]+)?'
+FLAG       = rf'(?:{FLAG_SHORT}|{FLAG_LONG})'
+
+OPTION_HEAD_RE = re.compile(
+    rf'^\s*(?:{FLAG})(?:\s*,\s*{FLAG})*\s*$',
+    re.M,
+)
+
+
+def looks_like_options_block(chunk: str) -> bool:
+    """
+    Devuelve True si el 'chunk' parece listado de opciones:
+    - Una o más líneas que son solo flags (-x, --xxx, -x, --xxx, --xxx=WORD)
+    - Y al menos una línea de descripción indentada a continuación.
+    """
+    lines = chunk.splitlines()
+    i = 0
+    saw_pair = False
+    while i < len(lines):
+        ln = lines[i]
+        if not ln.strip():
+            i += 1
+            continue
+        # ¿línea de cabecera de opción?
+        if OPTION_HEAD_RE.match(ln):
+            j = i + 1
+            # buscar una continuación indentada (descripción)
+            if j < len(lines) and (lines[j].startswith(" ") or lines[j].startswith("\t")):
+                saw_pair = True
+            # saltar hasta el siguiente “bloque” (sigue leyendo continuaciones indentadas)
+            i = j
+            while i < len(lines) and (not lines[i].strip() or lines[i].startswith(" ") or lines[i].startswith("\t")):
+                i += 1
+            continue
+        else:
+            # no es opción ⇒ no cumple
+            return False
+    return saw_pair
+
+
+def reclassify(blocks):
+    """Los bloques de texto que en realidad son listados de opciones pasan a "options"."""
+    return [Block("options", b.text, b.section)
+            if b.kind == "text" and looks_like_options_block(b.text) else b
+            for b in blocks]
+
+
+# === PROTOCOLO DE mantr_regex.sh ===
+
+@trace.traced("parse.protocol")
+def read_protocol(raw: str):
+    """
+    Lee la salida de mantr_regex.sh (--- tipo --- ... --- /tipo ---) y
+    devuelve la lista de bloques en orden de documento.
+    """
+    blocks, buf, mode = [], [], None
+    section = None
+
+    def flush():
+        nonlocal buf, mode, section
+        if mode is not None:
+            chunk = "".join(buf)
+            if mode == "section":
+                section = (chunk or "").strip()
+            blocks.append(Block(mode, chunk, section))
+        buf, mode = [], None
+
+    for line in raw.splitlines(keepends=True):
+        if line.startswith("--- ") and line.strip().endswith("---"):
+            tag = line.strip().strip("- ").strip("/")
+            if tag in BLOCK_TAGS:
+                flush()
+                if not line.strip().startswith("--- /"):
+                    mode = tag
+                continue
+        buf.append(line)
+
+    flush()
+    return reclassify(blocks)
+
+
+# === PÁGINA RENDERIZADA ===
+# Mismo criterio que el awk de mantr_regex.sh, pero sin pasar por el protocolo.
+
+SECTION_RE = re.compile(r"^[A-Z][A-Z0-9 ]+$")
+HEADER_RE = re.compile(r"^[A-Z0-9_.-]+\([0-9][^)]+\)\s+.*$")
+OVERSTRIKE_RE = re.compile(r".\x08")
+ANSI_RE = re.compile(r"\x1b\[[0-9;]*m")
+LONG_WORD_RE = re.compile(r"\b[^\W\d_]{3,}\b")
+ALPHA3_RE = re.compile(r"[^\W\d_]{3,}")
+PUNCT_RE = re.compile(r"[.;:!?)]")
+
+
+def is_section_title(line: str) -> bool:
+    return bool(SECTION_RE.match(line)) and not HEADER_RE.match(line)
+
+
+def looks_sentence(txt: str) -> bool:
+    return (len(LONG_WORD_RE.findall(txt)) >= 6 and bool(PUNCT_RE.search(txt))
+            and re.search(r"[a-z]", txt) is not None)
+
+
+def dedent_common(lines):
+    ind = [len(ln) - len(ln.lstrip(" ")) for ln in lines if ln.strip()]
+    cut = min(ind) if ind else 0
+    return [ln[cut:] if ln.strip() else ln for ln in lines]
+
+
+def looks_code(lines) -> bool:
+    indented = sum(1 for ln in lines if re.match(r"\s{6,}", ln))
+    words = sum(1 for ln in lines if ALPHA3_RE.search(ln))
+    has_punct = any(PUNCT_RE.search(ln) for ln in lines)
+    # en el awk el bloque desindentado acababa en "\n\n": split() contaba
+    # dos líneas vacías más, y seguimos contándolas para clasificar igual
+    return indented * 2 >= len(lines) + 2 and (not has_punct or words <= 1)
+
+
+def classify(lines, section) -> str:
+    first = next((ln for ln in lines if ln.strip()), "")
+    if section == "NAME":
+        return "text"
+    if re.match(r"--?[A-Za-z0-9]", first.lstrip()):
+        return "options"
+    deb = dedent_common(lines)
+    if section == "DESCRIPTION" and looks_sentence(" ".join(" ".join(deb).split())):
+        return "text"
+    if looks_code(deb):
+        return "code"
+    return "text"
+
+
+def clean_rendered(text: str) -> str:
+    """Lo que hacía `col -bx`: quita negritas/subrayados por sobreimpresión y tabuladores."""
+    text = OVERSTRIKE_RE.sub("", ANSI_RE.sub("", text))
+    return "\n".join(ln.expandtabs() for ln in text.splitlines())
+
+
+@trace.traced("parse.rendered")
+def parse_rendered(text: str, reclassify_options=True):
+    """Trocea una página ya renderizada por man en bloques."""
+    blocks, para = [], []
+    section = ""
+
+    def flush():
+        if para:
+            blocks.append(Block(classify(para, section), "".join(ln + "\n" for ln in para),
+                                section or None))
+            para.clear()
+
+    for line in clean_rendered(text).splitlines():
+        if is_section_title(line):
+            flush()
+            section = line
+            blocks.append(Block("section", line + "\n", section))
+        elif not line.strip():
+            flush()
+        else:
+            para.append(line)
+    flush()
+    return reclassify(blocks) if reclassify_options else blocks
+
+
+# === FUENTE ROFF (man(7)) ===
+
+# \(xx y \[nombre]: caracteres especiales habituales en páginas man
+SPECIAL_CHARS = {
+    "em": "—", "en": "–", "hy": "-", "mi": "-", "pl": "+", "eq": "=",
+    "aq": "'", "dq": '"', "lq": "“", "rq": "”", "oq": "‘", "cq": "’",
+    "Fo": "«", "Fc": "»", "fo": "‹", "fc": "›",
+    "bu": "•", "co": "©", "rg": "®", "tm": "™", "de": "°", "mu": "×",
+    "di": "÷", "+-": "±", ">=": "≥", "<=": "≤", "!=": "≠", "->": "→",
+    "<-": "←", "==": "≡", "ti": "~", "ha": "^", "ga": "`", "aa": "´",
+    "rs": "\\", "sl": "/", "ba": "|", "or": "|", "at": "@", "sh": "#",
+    "Do": "$", "Eu": "€", "ct": "¢", "Po": "£", "ul": "_",
+    "lB": "[", "rB": "]", "lC": "{", "rC": "}", "la": "⟨", "ra": "⟩",
+    "sc": "§", "ps": "¶", "tf": "∴",
+}
+# \*(xx: cadenas predefinidas (an-ext y pod2man)
+STRINGS = {
+    "Aq": "'", "aq": "'", "lq": "“", "rq": "”", "L\"": "“", "R\"": "”",
+    "C+": "C++", "C`": "‘", "C'": "’", "Tm": "™", "R": "®",
+}
+
+ESCAPE_RE = re.compile(r"""\\(?:
+      f(?:\[[^]]*\]|\(..|.)                 # fuente
+    | s(?:\[[^]]*\]|[+-]?\(..|[+-]?\d\d?)   # tamaño
+    | [mM](?:\[[^]]*\]|\(..|.)             # color
+    | [hvwlLoxDXbZSRN]'[^']*'               # movimientos, dibujo, \X'...'
+    | [nkgVYF*$](?:\[[^]]*\]|\(..|[+-]?.)   # registros, cadenas, argumentos
+    | \(..                                  # carácter especial \(xx
+    | \[[^]]*\]                             # carácter especial \[nombre]
+    | ".*                                   # comentario hasta fin de línea
+    | .                                     # el resto: \- \& \e \\ ...
+)""", re.X)
+
+
+def _escape(m) -> str:
+    s = m.group(0)
+    c = s[1]
+    if c in "fsmMhvwlLoxDXbZSRNnkgVYF$":
+        return ""
+    if c == "*":
+        name = s[3:-1] if s[2] == "[" else s[3:] if s[2] == "(" else s[2:]
+        return STRINGS.get(name, "")
+    if c == "(":
+        return SPECIAL_CHARS.get(s[2:], "")
+    if c == "[":
+        name = s[2:-1]
+        if name.startswith("u") and re.fullmatch(r"u[0-9A-Fa-f]{4,6}", name):
+            return chr(int(name[1:], 16))
+        return SPECIAL_CHARS.get(name, "")
+    if c == '"':
+        return ""
+    return {"-": "-", "e": "\\", "\\": "\\", ".": ".", "'": "'", "`": "`",
+            " ": " ", "~": " ", "0": " ", "_": "_", "t": " "}.get(c, "")
+
+
+def unescape(s: str) -> str:
+    return ESCAPE_RE.sub(_escape, s)
+
+
+def macro_args(s: str):
+    """Argumentos de una macro: separados por espacios, con "comillas" y "" dentro."""
+    args, i, n = [], 0, len(s)
+    while i < n:
+        while i < n and s[i] in " \t":
+            i += 1
+        if i >= n:
+            break
+        if s[i] == '"':
+            i += 1
+            buf = []
+            while i < n:
+                if s[i] == '"':
+                    if i + 1 < n and s[i + 1] == '"':
+                        buf.append('"')
+                        i += 2
+                        continue
+                    i += 1
+                    break
+                buf.append(s[i])
+                i += 1
+            args.append("".join(buf))
+        else:
+            j = i
+            while j < n and s[j] not in " \t":
+                # las secuencias de escape pueden llevar espacios (\ )
+                j += 2 if s[j] == "\\" else 1
+            args.append(s[i:j])
+            i = j
+    return args
+
+
+FONT_MACROS = ("B", "I", "BI", "BR", "IB", "IR", "RB", "RI", "SM", "SB")
+# macros que cierran lo pendiente de una .TP/.SH sin etiqueta
+STRUCTURE = {"SH", "SS", "TP", "PP", "P", "LP", "IP", "nf", "fi", "EX", "EE"}
+
+
+def wrap(line):
+    """Corta una línea rellenada a WIDTH columnas, con su misma sangría."""
+    if len(line) <= WIDTH:
+        return [line]
+    indent = line[:len(line) - len(line.lstrip())]
+    return textwrap.wrap(line.strip(), WIDTH, initial_indent=indent,
+                         subsequent_indent=indent, break_long_words=False,
+                         break_on_hyphens=False) or [line]
+
+
+class _RoffParser:
+    def __init__(self):
+        self.blocks = []
+        self.section = None
+        self.kind = None      # bloque abierto: "text", "options", "code"
+        self.lines = []       # líneas del bloque abierto
+        self.tag = None       # "TP"/"TQ"/"SH": la línea siguiente es etiqueta o título
+        self.fill = True      # .nf / .fi
+        self.join = False     # \c: la línea siguiente continúa esta
+        self.brk = False      # .br/.TQ: la línea siguiente empieza una nueva
+        self.defined = set()  # macros que define la propia página
+
+    # -- bloques --
+    def flush(self):
+        if self.kind and any(ln.strip() for ln in self.lines):
+            lines = self.lines
+            if self.kind != "code":
+                # relleno como el de man: párrafos cortados a WIDTH columnas
+                lines = [w for ln in lines for w in wrap(ln)]
+            text = "".join(ln.rstrip() + "\n" for ln in lines)
+            self.blocks.append(Block(self.kind, text, self.section))
+        self.kind, self.lines, self.join, self.brk = None, [], False, False
+
+    def open(self, kind):
+        self.flush()
+        self.kind = kind
+
+    def add(self, text, indent=INDENT):
+        if self.kind is None:
+            self.kind = "text" if self.fill else "code"
+        prev = self.lines[-1] if self.lines else ""
+        if self.join and self.lines:
+            self.lines[-1] += text
+        elif (self.fill and self.kind != "code" and not self.brk
+              and prev.strip() and text.strip()
+              and prev[:len(prev) - len(prev.lstrip())] == indent):
+            # modo relleno: las líneas del fuente forman un solo párrafo
+            self.lines[-1] = prev.rstrip() + " " + text
+        else:
+            self.lines.append(indent + text if text.strip() else "")
+        self.join = self.brk = False
+
+    def text(self, text):
+        """Una línea de texto, ya sin escapes."""
+        tag, self.tag = self.tag, None
+        if tag == "SH":
+            self.section_title(text.strip())
+        elif tag == "TP":
+            self.item(text)
+        elif tag == "TQ" and self.kind == "options":
+            self.lines.append(INDENT + text.strip())
+            self.brk = True
+        elif not self.fill:
+            self.add(text)
+        elif not text.strip():
+            # línea en blanco: como .sp
+            self.macro("sp", "")
+        elif self.kind == "options":
+            self.add(text.strip(), DESC_INDENT)
+        else:
+            self.add(text.strip())
+
+    def bare_option(self):
+        """¿Hay una opción abierta que aún no tiene descripción? (.PD 0 + .TP)"""
+        return self.kind == "options" and not any(
+            ln.startswith(DESC_INDENT) for ln in self.lines)
+
+    def item(self, tag):
+        """Etiqueta de .TP / .IP: si es una flag, empieza una opción."""
+        tag = tag.strip()
+        if re.match(r"--?[A-Za-z0-9]", tag):
+            # varias flags seguidas comparten la descripción que venga después
+            if not self.bare_option():
+                self.open("options")
+            self.lines.append(INDENT + tag)
+        else:
+            self.open("text")
+            if tag:
+                self.lines.append(INDENT + tag)
+        self.brk = True
+
+    def section_title(self, title):
+        self.flush()
+        self.section = title
+        self.blocks.append(Block("section", title + "\n", title))
+
+    # -- macros --
+    def macro(self, name, rest):
+        args = [unescape(a) for a in macro_args(rest)]
+        if name == "SH":
+            if args:
+                self.section_title(" ".join(args).strip())
+            else:
+                self.flush()
+                self.tag = "SH"
+        elif name == "SS":
+            self.open("text")
+            self.add(" ".join(args).strip(), " " * 3)
+            self.flush()
+        elif name in ("PP", "P", "LP"):
+            self.flush()
+        elif name in ("sp", "br"):
+            # dentro de una opción, la descripción sigue en otra línea
+            if self.fill and self.kind != "options":
+                self.flush()
+            self.brk = True
+        elif name == "TP":
+            if not self.bare_option():
+                self.flush()
+            self.tag = "TP"
+        elif name == "TQ":
+            self.tag = "TQ"
+        elif name == "IP":
+            tag = args[0].strip() if args else ""
+            if tag in ("", "•", "-", "*", "o"):
+                # viñeta o sangría sin etiqueta: un párrafo más
+                self.open("text")
+                if tag:
+                    self.add(tag + " ")
+                    self.join = True
+            else:
+                self.item(tag)
+        elif name in ("nf", "EX"):
+            self.open("code")
+            self.fill = False
+        elif name in ("fi", "EE"):
+            self.flush()
+            self.fill = True
+        elif name in FONT_MACROS:
+            # .B/.I sin argumentos afectan a la línea siguiente: texto normal
+            if args:
+                sep = " " if name in ("B", "I", "SM", "SB") else ""
+                self.text(sep.join(args))
+        elif name == "SY" and args:
+            self.text(args[0])
+        elif name == "OP" and args:
+            self.text("[" + " ".join(args) + "]")
+        elif name == "MR" and len(args) >= 2:
+            self.text(f"{args[0]}({args[1]}){''.join(args[2:])}")
+        elif name in ("EQ", "PS") and name not in self.defined:
+            raise Unsupported(name)
+
+    def table(self, lines, i):
+        """
+        .TS ... .TE (tbl): cada fila como una línea de código, celdas
+        separadas por dos espacios. Devuelve el índice tras el .TE.
+        """
+        self.open("code")
+        n = len(lines)
+        # opciones globales ("allbox;") y formato de columnas, que acaba en "."
+        while i < n and not lines[i].rstrip().endswith(".") and lines[i].strip() != ".TE":
+            i += 1
+        i += 1
+        row, cell = [], None   # cell: líneas de un bloque de texto T{ ... T}
+
+        def cells(text):
+            nonlocal row, cell
+            for c in text.split("\t"):
+                if c.strip() == "T{":
+                    cell = []
+                else:
+                    row.append(" ".join(unescape(c).split()))
+            if cell is None:
+                self.add("  ".join(row))
+                row = []
+
+        while i < n and lines[i].strip() != ".TE":
+            ln = lines[i]
+            i += 1
+            if cell is not None and ln.startswith("T}"):
+                row.append(" ".join(" ".join(cell).split()))
+                cell = None
+                rest = ln[2:].lstrip("\t")
+                if rest:
+                    cells(rest)
+                else:
+                    self.add("  ".join(row))
+                    row = []
+            elif ln.startswith((".", "'")):
+                name, _, rest = ln[1:].lstrip().partition(" ")
+                if cell is not None and name in FONT_MACROS:
+                    sep = " " if name in ("B", "I", "SM", "SB") else ""
+                    cell.append(sep.join(unescape(a) for a in macro_args(rest)))
+            elif cell is not None:
+                cell.append(unescape(ln))
+            elif ln.strip() not in ("_", "=", ""):
+                cells(ln)
+        self.flush()
+        return i + 1
+
+    def feed(self, source):
+        lines = source.splitlines()
+        i, n = 0, len(lines)
+        while i < n:
+            raw = lines[i]
+            i += 1
+            # líneas continuadas con \ al final
+            while raw.endswith("\\") and not raw.endswith("\\\\") and i < n:
+                raw = raw[:-1] + lines[i]
+                i += 1
+            if raw.startswith((".", "'")):
+                body = raw[1:].lstrip()
+                if not body or body.startswith('\\"'):
+                    continue
+                name, _, rest = body.partition(" ")
+                if name in ("de", "de1", "am", "ig"):
+                    # definición de macro: hasta ".."
+                    self.defined.update(rest.split()[:1])
+                    while i < n and lines[i].strip() != "..":
+                        i += 1
+                    i += 1
+                    continue
+                if name in ("if", "ie", "el"):
+                    # condicionales: se ignoran (también sus bloques \{ ... \})
+                    depth = raw.count("\\{") - raw.count("\\}")
+                    while depth > 0 and i < n:
+                        depth += lines[i].count("\\{") - lines[i].count("\\}")
+                        i += 1
+                    continue
+                if name == "TS" and name not in self.defined:
+                    i = self.table(lines, i)
+                    continue
+                if name in ("Dd", "Dt", "Sh", "Nm"):
+                    raise Unsupported("mdoc")
+                if name in STRUCTURE:
+                    self.tag = None
+                self.macro(name, rest)
+                continue
+            join_next = raw.rstrip().endswith("\\c")
+            if join_next:
+                raw = raw.rstrip()[:-2]
+            self.text(unescape(raw))
+            self.join = join_next
+        self.flush()
+        return self.blocks
+
+
+@trace.traced("parse.roff")
+def parse_roff(source: str):
+    """
+    Trocea el fuente man(7) de una página. Lanza Unsupported con mdoc o si
+    usa tablas, ecuaciones o gráficos (tbl, eqn, pic), que solo man sabe
+    maquetar.
+    """
+    return reclassify(_RoffParser().feed(source))
+
+
+# === LOCALIZAR Y CARGAR LA PÁGINA ===
+
+def _read_file(path) -> str:
+    opener = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open,
+              ".lzma": lzma.open}.get(path.suffix)
+    if path.suffix in (".zst", ".Z"):
+        raise Unsupported("compresión " + path.suffix)
+    if opener is not None:
+        with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+            return f.read()
+    return path.read_text(encoding="utf-8", errors="replace")
+
+
+def so_target(path, source):
+    """Si la página solo redirige a otra (.so, p. ej. egrep.1 → grep.1), su ruta."""
+    body = [ln for ln in source.splitlines() if ln.strip() and not ln.startswith('.\\"')]
+    m = re.match(r"\.so\s+(\S+)\s*$", body[0]) if len(body) == 1 else None
+    if m:
+        root = path.parent.parent
+        for cand in [root / m.group(1)] + sorted(root.glob(m.group(1) + ".*")):
+            if cand.is_file():
+                return cand
+    return None
+
+
+def read_source(path, depth=0):
+    """Lee un fuente man (comprimido o no), siguiendo los .so."""
+    path = Path(path)
+    source = _read_file(path)
+    target = so_target(path, source)
+    if target is not None and depth < 3:
+        return read_source(target, depth + 1)
+    return source
+
+
+def source_identity(path) -> str:
+    """
+    Identidad del fuente para la caché, sin leerlo: ruta, tamaño y mtime
+    (y los de la página a la que redirige si es un .so, que son pocos bytes).
+    """
+    parts, path = [], Path(path)
+    for _ in range(4):
+        st = path.stat()
+        parts.append(f"{path}:{st.st_size}:{st.st_mtime_ns}")
+        if st.st_size > 512:
+            break
+        try:
+            path = so_target(path, _read_file(path))
+        except (Unsupported, OSError, EOFError, lzma.LZMAError):
+            path = None
+        if path is None:
+            break
+    return "\0".join(parts)
+
+
+@trace.traced("man.locate")
+def locate_source(cmd, section=None):
+    """Ruta del fuente de la página según `man -w`, o None."""
+    argv = ["man", "-w"] + ([section] if section else []) + [cmd]
+    try:
+        out = subprocess.run(argv, capture_output=True, text=True, timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    path = out.stdout.strip().splitlines()[:1]
+    if out.returncode != 0 or not path or not Path(path[0]).is_file():
+        return None
+    return Path(path[0])
+
+
+@trace.traced("man.render")
+def render_with_man(cmd, section=None) -> str:
+    """La página renderizada por man, sin col ni awk."""
+    argv = ["man"] + ([section] if section else []) + [cmd]
+    env = dict(os.environ, MAN_KEEP_FORMATTING="0", MANPAGER="cat", PAGER="cat")
+    env.setdefault("MANWIDTH", "80")
+    try:
+        # stderr tal cual: el "No manual entry for ..." de man lo ve el usuario
+        out = subprocess.run(argv, stdout=subprocess.PIPE, env=env, timeout=120)
+    except (OSError, subprocess.SubprocessError):
+        return ""
+    return out.stdout.decode("utf-8", errors="replace")
+
+
+def load_page(cmd, section=None, mode=None, path=None):
+    """
+    Devuelve (bloques, identidad) de la página. `identidad` es el texto que
+    se resume en la clave de caché (fuente o página renderizada). mode
+    (MANTR_PARSER): "auto" (por defecto), "roff" (solo el fuente) o
+    "rendered" (solo la salida de man). `path` evita repetir `man -w`.
+    """
+    mode = mode or PARSER
+    if mode != "rendered":
+        path = path or locate_source(cmd, section)
+        if path is not None:
+            try:
+                with trace.span("source.read"):
+                    source = read_source(path)
+                blocks = parse_roff(source)
+                trace.annotate(parser="roff")
+                return blocks, f"roff{PARSER_VERSION}\0{source}"
+            except (Unsupported, OSError, EOFError, lzma.LZMAError) as e:
+                # p. ej. mdoc: se cuenta por tipo para saber cuánto cae en man
+                trace.count(f"parse.fallback.{type(e).__name__}")
+        if mode == "roff":
+            return [], ""
+    text = render_with_man(cmd, section)
+    if not text.strip():
+        return [], ""
+    trace.annotate(parser="rendered")
+    return parse_rendered(text), f"rendered{PARSER_VERSION}\0{text}"
@@ -0,0 +1,170 @@
+"""
+mantr --prefetch: rellena la caché de traducciones sin abrir less.
+
+Uso:
+  mantr --prefetch [-j N] [-l IDIOMA] [--restart] <comando>...
+  mantr --prefetch [-j N] [-l IDIOMA] [--restart] --section N
+  mantr --prefetch [-j N] [-l IDIOMA] [--restart] --all
+
+Cada página pasa por lo mismo que `mantr <cmd>` (mantr_consume.py --page)
+con MANTR_NO_PAGER=1, hasta N a la vez
+y con prioridad baja. Las páginas ya en caché se saltan. Las terminadas se
+apuntan en <caché>/prefetch/<idioma>.done, de modo que si se interrumpe,
+la siguiente ejecución sigue donde lo dejó (--restart lo ignora).
+"""
+import os, sys, time, shutil, argparse, subprocess, threading
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+BASEDIR = Path(__file__).resolve().parent
+CACHE_DIR = Path(os.environ.get("MANTR_CACHE_DIR", Path.home() / ".cache" / "mantr"))
+# prioridad baja para no estorbar al uso interactivo; con nice(1) y no con
+# preexec_fn, que no es seguro en un proceso con hilos (el pool de -j)
+NICE = ["nice", "-n", "10"] if shutil.which("nice") else []
+COMPRESSED = (".gz", ".bz2", ".xz", ".lzma", ".zst", ".Z")
+
+
+def man_dirs():
+    """Raíces del manpath (manpath de man-db, MANPATH o /usr/share/man)."""
+    try:
+        out = subprocess.run(["manpath", "-q"], capture_output=True, text=True).stdout.strip()
+    except OSError:
+        out = ""
+    paths = out or os.environ.get("MANPATH") or "/usr/share/man"
+    return [Path(p) for p in paths.split(":") if p]
+
+
+def pages_in(sections=None):
+    """
+    Lista (nombre, sección) de las páginas instaladas. Con sections=None
+    recorre todas las secciones (man1, man2, ..., man8, man3p...).
+    Las traducciones de man (es/, fr/...) no se miran: se traduce del inglés.
+    """
+    found = set()
+    for root in man_dirs():
+        for sub in sorted(root.glob("man*")):
+            sec = sub.name[3:]
+            if not sub.is_dir() or (sections is not None and sec not in sections):
+                continue
+            for f in sub.iterdir():
+                name = f.name
+                for ext in COMPRESSED:
+                    if name.endswith(ext):
+                        name = name[:-len(ext)]
+                        break
+                base, _, fsec = name.rpartition(".")
+                if base and fsec.startswith(sec[:1]):
+                    found.add((base, sec))
+    return sorted(found)
+
+
+def page_id(name, section):
+    # la sección 1 es la que usa `mantr <cmd>`, así comparten caché
+    return name if section in (None, "1") else f"{name}.{section}"
+
+
+def translate_page(name, section, lang):
+    """
+    Lanza mantr_consume.py para una página. Devuelve su estado y lo que ha
+    tardado (sin el rato que la página esperó su turno en el pool).
+    """
+    env = dict(os.environ, MANTR_CMD=page_id(name, section), MANTR_NO_PAGER="1")
+    env.pop("MANTR_TRACE_T0", None)  # el arranque del wrapper no es de esta página
+    env.setdefault("BACKEND", "argos")
+    argv = NICE + [sys.executable, str(BASEDIR / "mantr_consume.py"), "--page", name]
+    if section:
+        argv += ["--section", section]
+    t0 = time.monotonic()
+    consume = subprocess.run(
+        argv + [lang], capture_output=True, text=True, env=env,
+    )
+    spent = time.monotonic() - t0
+    # con varios idiomas (-l es,fr) sale una línea "<idioma>: <estado>" por idioma
+    statuses = [ln.rsplit(": ", 1)[-1] for ln in consume.stdout.strip().splitlines()] or ["empty"]
+    if consume.returncode != 0:
+        return "error", spent
+    return ("translated" if "translated" in statuses else statuses[-1]), spent
+
+
+def fmt_time(secs):
+    secs = int(secs)
+    if secs >= 3600:
+        return f"{secs // 3600} h {secs % 3600 // 60} min"
+    if secs >= 60:
+        return f"{secs // 60} min {secs % 60} s"
+    return f"{secs} s"
+
+
+def main(argv):
+    ap = argparse.ArgumentParser(prog="mantr --prefetch", add_help=True)
+    ap.add_argument("pages", nargs="*", help="comandos a traducir")
+    ap.add_argument("-j", "--jobs", type=int, default=max(1, (os.cpu_count() or 2) // 2),
+                    help="páginas en paralelo (por defecto: la mitad de los núcleos)")
+    ap.add_argument("-l", "--lang", default="es",
+                    help="idioma destino, o varios separados por comas (por defecto: es)")
+    ap.add_argument("--section", action="append", help="todas las páginas de la sección N")
+    ap.add_argument("--all", action="store_true", help="todas las páginas instaladas")
+    ap.add_argument("--restart", action="store_true",
+                    help="ignora el progreso guardado de ejecuciones anteriores")
+    args = ap.parse_args(argv)
+
+    todo = [(p, None) for p in args.pages]
+    if args.section or args.all:
+        todo += pages_in(None if args.all else set(args.section))
+    if not todo:
+        ap.error("indica comandos, --section N o --all")
+
+    state = CACHE_DIR / "prefetch" / f"{args.lang}.done"
+    state.parent.mkdir(parents=True, exist_ok=True)
+    done = set()
+    if state.exists() and not args.restart:
+        done = set(state.read_text(encoding="utf-8").split())
+    pending = [(n, s) for n, s in dict.fromkeys(todo) if page_id(n, s) not in done]
+
+    total = len(pending)
+    print(f"mantr --prefetch: {total} páginas por revisar "
+          f"({len(todo) - total} ya hechas), idioma {args.lang}, {args.jobs} en paralelo",
+          file=sys.stderr)
+
+    counts = {"translated": 0, "cached": 0, "empty": 0, "error": 0}
+    lock = threading.Lock()
+    start = time.monotonic()
+    finished = 0
+
+    with open(state, "a", encoding="utf-8") as log, \
+         ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+        futures = {pool.submit(translate_page, n, s, args.lang): (n, s) for n, s in pending}
+        try:
+            for fut in as_completed(futures):
+                name, section = futures[fut]
+                try:
+                    status, spent = fut.result()
+                except Exception:
+                    status, spent = "error", 0.0
+                with lock:
+                    finished += 1
+                    counts[status if status in counts else "error"] += 1
+                    if status != "error":
+                        log.write(page_id(name, section) + "\n")
+                        log.flush()
+                    elapsed = time.monotonic() - start
+                    rate = counts["translated"] / elapsed * 60 if elapsed else 0.0
+                    left = (total - finished) * elapsed / finished
+                    print(f"[{finished}/{total}] {page_id(name, section)}: {status} "
+                          f"({spent:.1f} s) — {rate:.1f} páginas traducidas/min, "
+                          f"quedan ~{fmt_time(left)}", file=sys.stderr)
+        except KeyboardInterrupt:
+            for fut in futures:
+                fut.cancel()
+            print("\nInterrumpido; la próxima ejecución continuará desde aquí.", file=sys.stderr)
+            return 130
+
+    elapsed = time.monotonic() - start
+    print(f"Hecho en {fmt_time(elapsed)}: {counts['translated']} traducidas, "
+          f"{counts['cached']} ya en caché, {counts['empty']} vacías, "
+          f"{counts['error']} con error.", file=sys.stderr)
+    return 1 if counts["error"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
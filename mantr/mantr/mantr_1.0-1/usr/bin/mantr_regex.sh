@@ -1,16 +1,28 @@
 #!/usr/bin/env bash
-# Uso: ./mantr_regex.sh <comando>
+# Uso: ./mantr_regex.sh <comando> [sección]
+#      ./mantr_regex.sh - < página_renderizada
+# mantr ya no lo usa (lee las páginas con mantr_parse.py); se mantiene para
+# comparar con el troceado anterior (bench/bench_parse.py)
 
 cmd="$1"
 if [ -z "$cmd" ]; then
-  echo "Uso: $0 <comando>"
+  echo "Uso: $0 <comando> [sección]"
   exit 1
 fi
+# Sección opcional (p. ej. 3 para printf(3)); sin ella, la que elija man
+section="$2"
 
 # Usamos gawk si existe; si no, awk normal
 AWK_BIN="$(command -v gawk || command -v awk)"
 
-man "$cmd" | col -bx | "$AWK_BIN" '
+# "-": la página ya renderizada llega por la entrada estándar
+if [ "$cmd" = "-" ]; then
+  render() { cat; }
+else
+  render() { man $section "$cmd"; }
+fi
+
+render | col -bx | "$AWK_BIN" '
 BEGIN {
   bloque = ""
   current_section = ""
@@ -0,0 +1,149 @@
+"""
+Maquetación de las páginas traducidas.
+
+La caché no guarda la página ya maquetada a 80 columnas sino el documento
+traducido en segmentos (dumps/loads), y este módulo lo compone al ancho y
+en el formato que se pidan, sin volver a traducir nada:
+
+  ["section", título]              título de sección ya traducido
+  ["text", párrafo]                párrafo en una sola línea
+  ["options", [elemento...]]       cada elemento es [flags, descripción]
+                                   o una línea que se copia tal cual
+  ["code", texto]                  ejemplos, tablas...: tal cual
+
+Formatos:
+  text   como man (lo de siempre)
+  ansi   como text, con los títulos y las opciones en negrita (less -R)
+  html   una página HTML con <h2>, <p>, <dl> y <pre>
+
+El ancho es MANWIDTH si está definido, si no el del terminal (como man) y
+si no hay terminal 80.
+"""
+import os, sys, json, html, shutil, textwrap
+
+DEFAULT_WIDTH = 80  # ancho típico de man
+MIN_WIDTH = 30      # por debajo, la sangría de las opciones no deja sitio
+FORMATS = ("text", "ansi", "html")
+
+DOC_VERSION = 1
+_DOC_PREFIX = '{"mantr":'
+
+BOLD, RESET = "\033[1m", "\033[0m"
+INDENT_FLAGS = " " * 7   # columna 8
+INDENT_DESC = " " * 14   # columna 15 (estilo GNU)
+
+
+def page_width(terminal=True):
+    """MANWIDTH, o el ancho del terminal si terminal y la salida es uno, o 80."""
+    try:
+        width = int(os.environ.get("MANWIDTH", ""))
+    except ValueError:
+        width = 0
+    if not width and terminal and sys.stdout.isatty():
+        width = shutil.get_terminal_size((DEFAULT_WIDTH, 24)).columns
+    return max(MIN_WIDTH, width or DEFAULT_WIDTH)
+
+
+# ==================== DOCUMENTO EN CACHÉ ====================
+def dumps(segments, lang=""):
+    return json.dumps({"mantr": DOC_VERSION, "lang": lang, "segments": segments},
+                      ensure_ascii=False, separators=(",", ":"))
+
+
+def loads(text):
+    """Segmentos de un documento guardado con dumps(), o None si no lo es (página ya maquetada)."""
+    if not text or not text.startswith(_DOC_PREFIX):
+        return None
+    try:
+        doc = json.loads(text)
+    except ValueError:
+        return None
+    return doc["segments"] if doc.get("mantr") == DOC_VERSION else None
+
+
+# ==================== TEXTO Y ANSI ====================
+def _options_text(items, width, bold):
+    out_lines = []
+    for item in items:
+        if isinstance(item, str):
+            out_lines.append(item)
+            continue
+        flags, desc = item
+        out_lines.append(INDENT_FLAGS + (BOLD + flags + RESET if bold else flags))
+        out_lines.append(textwrap.fill(desc, width=width, initial_indent=INDENT_DESC,
+                                       subsequent_indent=INDENT_DESC))
+    return "\n".join(out_lines) + "\n"
+
+
+def _segment_text(seg, width, bold):
+    kind, body = seg
+    if kind == "text":
+        return textwrap.fill(body, width=width) + "\n\n"
+    if kind == "options":
+        return _options_text(body, width, bold)
+    if kind == "section":
+        return (BOLD + body + RESET if bold else body) + "\n\n"
+    return body + ("\n" if not body.endswith("\n") else "")
+
+
+# ==================== HTML ====================
+def _options_html(items):
+    out, open_tag = [], None
+
+    def switch(tag):
+        nonlocal open_tag
+        if open_tag != tag:
+            if open_tag == "dl":
+                out.append("</dl>\n")
+            elif open_tag == "pre":
+                out.append("</pre>\n")
+            if tag == "dl":
+                out.append("<dl>\n")
+            elif tag == "pre":
+                out.append("<pre>")
+            open_tag = tag
+
+    for item in items:
+        if isinstance(item, str):
+            if not item.strip():
+                # las líneas en blanco entre opciones no cortan la lista
+                if open_tag == "pre":
+                    out.append("\n")
+                continue
+            switch("pre")
+            out.append(html.escape(item) + "\n")
+            continue
+        flags, desc = item
+        switch("dl")
+        out.append(f"<dt><code>{html.escape(flags)}</code></dt>\n<dd>{html.escape(desc)}</dd>\n")
+    switch(None)
+    return "".join(out)
+
+
+def _segment_html(seg):
+    kind, body = seg
+    if kind == "text":
+        return f"<p>{html.escape(body)}</p>\n"
+    if kind == "options":
+        return _options_html(body)
+    if kind == "section":
+        return f"<h2>{html.escape(body)}</h2>\n"
+    return f"<pre>{html.escape(body.rstrip(chr(10)))}</pre>\n"
+
+
+# ==================== API ====================
+def render_segment(seg, width=DEFAULT_WIDTH, fmt="text"):
+    """Un segmento suelto (así se va enviando a less en modo streaming)."""
+    if fmt == "html":
+        return _segment_html(seg)
+    return _segment_text(seg, width, bold=fmt == "ansi")
+
+
+def render(segments, width=DEFAULT_WIDTH, fmt="text", title="", lang=""):
+    """La página entera; en html, con su cabecera."""
+    body = "".join(render_segment(seg, width, fmt) for seg in segments)
+    if fmt != "html":
+        return body
+    return (f'<!DOCTYPE html>\n<html lang="{html.escape(lang)}">\n<head>\n'
+            f'<meta charset="utf-8">\n<title>{html.escape(title)}</title>\n</head>\n'
+            f"<body>\n{body}</body>\n</html>\n")
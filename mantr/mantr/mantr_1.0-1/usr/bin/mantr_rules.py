@@ -0,0 +1,135 @@
+"""
+Glosario y arreglos posteriores a la traducción, por idioma.
+
+Las reglas viven en ficheros JSON (<idioma>.json) en MANTR_RULES_DIR o, por
+defecto, en /usr/share/mantr/rules (../share/mantr/rules respecto a este
+script, así sirve igual instalado que en desarrollo):
+
+  glossary  términos técnicos → traducción (sin distinguir mayúsculas)
+  rules     [{"match": regex, "replace": "...\\1...", "flags": "is",
+              "map": {"1": "tabla"}}]  en orden de prioridad
+  maps      tablas para "map" (p. ej. verbos en inglés → infinitivo)
+  sections  títulos de sección de man (NAME → NOMBRE...)
+
+Todo se compila una sola vez en una única expresión regular: el glosario
+como un trie (los prefijos comunes se comparten, así que cientos de
+términos no cuestan cientos de pasadas) seguido de las reglas como
+alternativas. Cada segmento se reescribe en una sola pasada de izquierda a
+derecha; si dos reglas empiezan en el mismo sitio gana la primera (el
+glosario va delante).
+"""
+import os, re, json
+from pathlib import Path
+
+RULES_DIR = Path(os.environ.get(
+    "MANTR_RULES_DIR",
+    Path(__file__).resolve().parent.parent / "share" / "mantr" / "rules",
+))
+
+_FLAGS = {"i": re.I, "s": re.S}
+
+
+def trie_regex(words) -> str:
+    """
+    Expresión regular equivalente a (?:w1|w2|...) pero factorizando los
+    prefijos comunes, y con las alternativas largas antes que las cortas.
+    """
+    trie = {}
+    for w in words:
+        node = trie
+        for ch in w:
+            node = node.setdefault(ch, {})
+        node[""] = True
+
+    def build(node):
+        end = "" in node
+        alts = [re.escape(ch) + build(child)
+                for ch, child in sorted(node.items()) if ch != ""]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        if end:
+            # este nodo ya es un término completo: lo que sigue es opcional
+            # (y codicioso, así que se prueba antes el término más largo)
+            return "(?:" + body + ")?"
+        return body
+
+    return build(trie)
+
+
+class Rule:
+    def __init__(self, spec, maps):
+        flags = 0
+        for f in spec.get("flags", ""):
+            flags |= _FLAGS[f]
+        self.flags = spec.get("flags", "")
+        self.source = spec["match"]
+        self.regex = re.compile(self.source, flags)
+        self.replace = spec.get("replace", "")
+        self.maps = {int(g): maps[name] for g, name in spec.get("map", {}).items()}
+
+    def expand(self, m) -> str:
+        if not self.maps:
+            return m.expand(self.replace)
+        groups = {}
+        for g, table in self.maps.items():
+            v = (m.group(g) or "").lower()
+            groups[g] = table.get(v, v)  # si no está en la tabla, se deja tal cual
+        # sustituimos \N por el valor mapeado y el resto como siempre
+        return re.sub(r"\\(\d+)",
+                      lambda x: groups.get(int(x.group(1)), m.group(int(x.group(1))) or ""),
+                      self.replace)
+
+
+class RuleSet:
+    def __init__(self, data=None):
+        data = data or {}
+        self.glossary = {k.lower(): v for k, v in data.get("glossary", {}).items()}
+        maps = data.get("maps", {})
+        self.rules = [Rule(spec, maps) for spec in data.get("rules", [])]
+        self.sections = data.get("sections", {})
+
+        alts = []
+        if self.glossary:
+            alts.append(r"(?P<g>(?i:\b" + trie_regex(self.glossary) + r"\b))")
+        for i, rule in enumerate(self.rules):
+            inner = f"(?{rule.flags}:{rule.source})" if rule.flags else rule.source
+            alts.append(f"(?P<r{i}>{inner})")
+        self._combined = re.compile("|".join(alts)) if alts else None
+
+    def __bool__(self):
+        return self._combined is not None
+
+    def _repl(self, m) -> str:
+        name = m.lastgroup
+        if name == "g":
+            return self.glossary.get(m.group(0).lower(), m.group(0))
+        rule = self.rules[int(name[1:])]
+        # volvemos a casar la regla sola en la misma posición para tener sus grupos
+        m2 = rule.regex.match(m.string, m.start())
+        if m2 is None or m2.end() != m.end():
+            return m.group(0)
+        return rule.expand(m2)
+
+    def apply(self, text: str) -> str:
+        if not text or self._combined is None:
+            return text
+        return self._combined.sub(self._repl, text)
+
+
+_cache = {}
+
+def rules_for(lang: str) -> RuleSet:
+    """
+    Reglas del idioma (es, es_ES → es.json...), compiladas una vez por proceso.
+    Si no hay fichero para el idioma se devuelve un RuleSet vacío.
+    """
+    if lang not in _cache:
+        data = None
+        for name in (lang, lang.split("_")[0].split("-")[0]):
+            path = RULES_DIR / f"{name}.json"
+            if path.exists():
+                data = json.loads(path.read_text(encoding="utf-8"))
+                break
+        _cache[lang] = RuleSet(data)
+    return _cache[lang]
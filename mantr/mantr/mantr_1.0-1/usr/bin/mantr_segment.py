@@ -0,0 +1,118 @@
+"""
+Segmentación de párrafos de páginas man en frases, por reglas.
+
+Los párrafos largos (DESCRIPTION de bash o find) cuestan al modelo más que
+la suma de sus frases y a veces vuelven cortados; Argos además los parte
+con stanza, que pesa mucho. Translator (mantr_translator) los parte aquí
+antes de llegar al backend, con reglas pensadas para texto de man:
+
+  - fin de frase: . ! ? (y comillas o paréntesis de cierre) + espacio +
+    mayúscula, comilla, paréntesis, un ordinal de lista o un {n} de
+    mask_segment
+  - no se corta tras abreviaturas (e.g., i.e., etc., cf., vs., No....),
+    iniciales (J. Smith), ordinales de lista (1.) ni dentro de paréntesis
+    o corchetes: "(e.g. ls -l. Note that...)" es una sola frase
+  - los flags, rutas y versiones (-e., ./configure, 1.2.3) no llevan
+    espacio tras el punto, así que nunca son fin de frase
+
+pieces() además acota la longitud: una frase de más de max_chars se parte
+por "; ", ": ", ", " y, en último caso, por palabras. Juntando los trozos
+con un espacio se recupera el texto (salvo espacios repetidos).
+
+Uso directo, para ver cómo parte un texto:
+  python3 mantr_segment.py [max_chars] < texto
+"""
+import re, sys
+
+ABBREVIATIONS = frozenset("""
+    e.g eg i.e ie etc cf vs viz approx resp incl esp al fig figs no nos nr
+    sec secs ch chap vol ed eds dr mr mrs ms st jr sr inc ltd co corp
+    jan feb mar apr jun jul aug sep sept oct nov dec
+""".split())
+
+# candidato a fin de frase: puntuación, cierres opcionales y espacio
+BOUNDARY_RE = re.compile(r"[.!?]+[\"')\]]*\s+")
+# lo que puede empezar la frase siguiente
+START_RE = re.compile(r"[\"'(\[`]?(?:[A-Z]|\{\d+\}|\d+[.)]\s)")
+INITIALISM_RE = re.compile(r"(?:[A-Za-z]\.){2,}")   # e.g. i.e. U.S.
+ORDINAL_RE = re.compile(r"\(?\d+[.)]")              # 1.  2)  (3)
+
+CLAUSE_SEPARATORS = ("; ", ": ", ", ", " ")
+
+
+def _closes_sentence(text, start, end):
+    """¿El candidato text[start:end] (puntuación + espacio) cierra la frase?"""
+    if not START_RE.match(text, end):
+        return False
+    if text[start] != ".":
+        return True  # ! y ? no llevan abreviaturas
+    word = text[max(text.rfind(" ", 0, start), text.rfind("\n", 0, start)) + 1:start]
+    word = word.lstrip("\"'([`")
+    if not word:
+        return True
+    if word.lower() in ABBREVIATIONS or INITIALISM_RE.fullmatch(word + "."):
+        return False
+    if len(word) == 1 and word.isupper():
+        return False  # inicial de un nombre
+    return True
+
+
+def split(text):
+    """Frases de un párrafo (sin partir las que pasan de largo: ver pieces)."""
+    text = (text or "").strip()
+    if not text:
+        return []
+    out, begin, depth, scanned = [], 0, 0, 0
+    for m in BOUNDARY_RE.finditer(text):
+        # paréntesis y corchetes abiertos hasta aquí (dentro no se corta)
+        seg = text[scanned:m.end()]
+        depth = max(0, depth + seg.count("(") + seg.count("[") - seg.count(")") - seg.count("]"))
+        scanned = m.end()
+        if depth:
+            continue
+        first = text[begin:m.start()].split(None, 1)
+        if len(first) == 1 and ORDINAL_RE.fullmatch(first[0] + text[m.start()]):
+            continue  # "1. Primero..." es un elemento de lista, no una frase
+        if not _closes_sentence(text, m.start(), m.end()):
+            continue
+        out.append(text[begin:m.end()].strip())
+        begin = m.end()
+    rest = text[begin:].strip()
+    if rest:
+        out.append(rest)
+    return out
+
+
+def bound(sentence, max_chars, separators=CLAUSE_SEPARATORS):
+    """Parte `sentence` en trozos de como mucho max_chars por el primer separador que sirva."""
+    if len(sentence) <= max_chars or not separators:
+        return [sentence]
+    sep, rest = separators[0], separators[1:]
+    parts = sentence.split(sep)
+    if len(parts) == 1:
+        return bound(sentence, max_chars, rest)
+    chunks, cur = [], ""
+    for i, part in enumerate(parts):
+        # el separador ("," ";" ":") se queda con lo de delante
+        piece = part + (sep.rstrip() if i < len(parts) - 1 else "")
+        if cur and len(cur) + 1 + len(piece) > max_chars:
+            chunks.append(cur)
+            cur = piece
+        else:
+            cur = f"{cur} {piece}" if cur else piece
+    if cur:
+        chunks.append(cur)
+    return [c for chunk in chunks for c in bound(chunk, max_chars, rest) if c]
+
+
+def pieces(text, max_chars=400):
+    """Frases de `text`, ninguna de más de max_chars (salvo una palabra más larga)."""
+    return [p for s in split(text) for p in bound(s, max_chars)]
+
+
+if __name__ == "__main__":
+    limit = int(sys.argv[1]) if len(sys.argv) > 1 else 400
+    for paragraph in re.split(r"\n\s*\n", sys.stdin.read()):
+        for p in pieces(" ".join(paragraph.split()), limit):
+            print(p)
+        print()
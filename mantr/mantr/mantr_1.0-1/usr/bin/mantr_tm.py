@@ -0,0 +1,151 @@
+"""
+Memoria de traducción de mantr.
+
+Guarda en SQLite cada segmento ya traducido (párrafo o descripción de opción),
+indexado por texto normalizado + idioma destino + backend. Se comparte entre
+todos los comandos, así que el texto repetido de las herramientas GNU
+(--help, --version, REPORTING BUGS, COPYRIGHT...) solo pasa una vez por el
+modelo.
+
+Si no está, se busca en los paquetes de traducciones instalados (.mpack,
+ver mantr_pack.py), de solo lectura.
+
+Los aciertos (hits, used) se apuntan en memoria y se escriben todos juntos
+en una transacción con flush(): leer no cuesta una escritura por segmento.
+
+Cualquier fallo de la base de datos se ignora: la memoria es una ayuda,
+nunca debe impedir traducir.
+"""
+import os, re, sqlite3, hashlib, time, threading
+from pathlib import Path
+
+import mantr_trace as trace
+
+
+def normalize_segment(text: str) -> str:
+    """Colapsa espacios para que el reflujo del terminal no cambie la clave."""
+    return re.sub(r"\s+", " ", text or "").strip()
+
+
+def segment_key(text: str, lang: str, backend: str) -> str:
+    norm = normalize_segment(text)
+    raw = f"{lang}\0{backend}\0{norm}".encode("utf-8", errors="ignore")
+    return hashlib.sha256(raw).hexdigest()
+
+
+class TranslationMemory:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._db = None
+        self.packs = []  # mantr_pack.Pack, consultados si el segmento no está aquí
+        self._hits = {}  # clave → [aciertos, último uso], pendientes de flush()
+        # la conexión se comparte entre hilos (mantrd, varios idiomas a la vez)
+        self._lock = threading.Lock()
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # check_same_thread=False: se comparte entre hilos (con self._lock)
+            db = sqlite3.connect(str(self.path), timeout=10, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS segments ("
+                " key TEXT PRIMARY KEY,"
+                " lang TEXT NOT NULL,"
+                " backend TEXT NOT NULL,"
+                " source TEXT NOT NULL,"
+                " target TEXT NOT NULL,"
+                " hits INTEGER NOT NULL DEFAULT 0,"
+                " created REAL NOT NULL,"
+                " used REAL NOT NULL)"
+            )
+            db.commit()
+            self._db = db
+        except Exception:
+            self._db = None
+
+    @trace.traced("tm.get")
+    def get(self, text, lang, backend):
+        """Devuelve la traducción guardada (aquí o en un paquete) o None."""
+        key = segment_key(text, lang, backend)
+        if self._db is not None:
+            try:
+                with self._lock:
+                    hit = self._get(key)
+                if hit is not None:
+                    return hit
+            except Exception:
+                pass
+        for pack in self.packs:
+            hit = pack.segment(key)
+            if hit is not None:
+                trace.count("tm.pack_hits")
+                return hit
+        return None
+
+    def _get(self, key):
+        row = self._db.execute(
+            "SELECT target FROM segments WHERE key = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        pending = self._hits.setdefault(key, [0, 0.0])
+        pending[0] += 1
+        pending[1] = time.time()
+        return row[0]
+
+    def flush(self):
+        """Escribe los aciertos pendientes en una sola transacción."""
+        if self._db is None or not self._hits:
+            return
+        try:
+            with self._lock:
+                hits, self._hits = self._hits, {}
+                with self._db:
+                    self._db.executemany(
+                        "UPDATE segments SET hits = hits + ?, used = MAX(used, ?) WHERE key = ?",
+                        [(n, used, key) for key, (n, used) in hits.items()],
+                    )
+        except Exception:
+            pass
+
+    @trace.traced("tm.put")
+    def put(self, text, lang, backend, target):
+        if self._db is None or not target:
+            return
+        now = time.time()
+        try:
+            with self._lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO segments"
+                    " (key, lang, backend, source, target, hits, created, used)"
+                    " VALUES (?, ?, ?, ?, ?, 0, ?, ?)",
+                    (segment_key(text, lang, backend), lang, backend,
+                     normalize_segment(text), target, now, now),
+                )
+                self._db.commit()
+        except Exception:
+            pass
+
+    def close(self):
+        self.flush()
+        if self._db is not None:
+            try:
+                self._db.close()
+            except Exception:
+                pass
+            self._db = None
+
+
+def open_memory(cache_dir):
+    """
+    Abre la memoria indicada por MANTR_TM (ruta del fichero SQLite).
+    MANTR_TM=0 la desactiva; por defecto vive en <cache>/tm.sqlite3.
+    """
+    where = os.environ.get("MANTR_TM", "")
+    if where == "0":
+        return None
+    path = Path(where) if where else Path(cache_dir) / "tm.sqlite3"
+    tm = TranslationMemory(path)
+    from mantr_pack import open_packs
+    tm.packs = open_packs(cache_dir)
+    return tm if tm._db is not None or tm.packs else None
@@ -0,0 +1,284 @@
+"""
+Trazas de rendimiento de mantr (MANTR_TRACE).
+
+Con MANTR_TRACE=1 cada ejecución escribe al terminar una línea JSON por la
+salida de error; con MANTR_TRACE=<fichero> la añade a ese fichero (JSON
+Lines: se pueden juntar los de muchas máquinas con cat y resumirlos con
+`mantr_trace.py <fichero>...`). La línea lleva:
+
+  spans     tiempo por etapa (man, parse, translator.init, backend.*,
+            rules, render, cache.*...): llamadas, total y máximo en ms
+  hist      histogramas de latencia con cubetas fijas (HIST_BUCKETS), que
+            se pueden sumar entre ejecuciones sin perder nada
+  counters  contadores (reintentos por trozos, segmentos, aciertos...)
+  slowest   los MANTR_TRACE_TOP segmentos más lentos (por defecto 10)
+
+Sin MANTR_TRACE no se mide nada: span() devuelve siempre el mismo
+contexto vacío, traced() deja la función tal cual y count()/observe() no
+hacen nada. En bucles por segmento se comprueba ENABLED antes de llamar.
+"""
+import os, sys, json, time, heapq, socket, atexit, threading
+from contextlib import contextmanager, nullcontext
+
+TRACE = os.environ.get("MANTR_TRACE", "").strip()
+ENABLED = TRACE not in ("", "0")
+TOP = max(0, int(os.environ.get("MANTR_TRACE_TOP", "10") or 10))
+
+# límites superiores en ms; la última cubeta es "más de 10 s"
+HIST_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000, 10000)
+
+FORMAT = 1
+
+_NOOP = nullcontext()
+
+
+class Trace:
+    """Acumulador de una ejecución; seguro entre hilos (streaming)."""
+    def __init__(self):
+        self.started = time.time()
+        self.clock = time.perf_counter()
+        self.spans = {}
+        self.hist = {}
+        self.counters = {}
+        self.slowest = []   # montículo de (ms, n, info)
+        self.info = {}
+        self._n = 0
+        self._lock = threading.Lock()
+
+    def add_span(self, name, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            s = self.spans.get(name)
+            if s is None:
+                s = self.spans[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+            s["count"] += 1
+            s["total_ms"] += ms
+            s["max_ms"] = max(s["max_ms"], ms)
+
+    def observe(self, name, seconds):
+        ms = seconds * 1000
+        with self._lock:
+            h = self.hist.get(name)
+            if h is None:
+                h = self.hist[name] = {"counts": [0] * (len(HIST_BUCKETS) + 1),
+                                       "count": 0, "sum_ms": 0.0}
+            i = 0
+            while i < len(HIST_BUCKETS) and ms > HIST_BUCKETS[i]:
+                i += 1
+            h["counts"][i] += 1
+            h["count"] += 1
+            h["sum_ms"] += ms
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def segment(self, text, seconds, **info):
+        if not TOP:
+            return
+        item = (seconds * 1000, self._n,
+                dict(info, chars=len(text), text=" ".join(text.split())[:80]))
+        with self._lock:
+            self._n += 1
+            if len(self.slowest) < TOP:
+                heapq.heappush(self.slowest, item)
+            elif item[0] > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, item)
+
+    def report(self):
+        out = {
+            "v": FORMAT,
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S%z", time.localtime(self.started)),
+            "host": socket.gethostname(),
+            "pid": os.getpid(),
+        }
+        out.update(self.info)
+        out["wall_ms"] = round((time.perf_counter() - self.clock) * 1000, 3)
+        # el wrapper apunta cuándo arrancó (MANTR_TRACE_T0): lo que va de ahí
+        # a importar este módulo es bash + arrancar Python + los imports
+        t0 = os.environ.get("MANTR_TRACE_T0", "").replace(",", ".")
+        try:
+            out["startup_ms"] = round((self.started - float(t0)) * 1000, 3)
+            out["wall_ms"] = round(out["wall_ms"] + out["startup_ms"], 3)
+        except ValueError:
+            pass
+        out["spans"] = {k: {"count": v["count"], "total_ms": round(v["total_ms"], 3),
+                            "max_ms": round(v["max_ms"], 3)}
+                        for k, v in sorted(self.spans.items())}
+        out["hist"] = {k: {"le_ms": list(HIST_BUCKETS), "counts": v["counts"],
+                           "count": v["count"], "sum_ms": round(v["sum_ms"], 3)}
+                       for k, v in sorted(self.hist.items())}
+        out["counters"] = dict(sorted(self.counters.items()))
+        out["slowest"] = [dict(info, ms=round(ms, 3))
+                          for ms, _, info in sorted(self.slowest, key=lambda x: -x[0])]
+        return out
+
+
+_trace = Trace() if ENABLED else None
+
+
+@contextmanager
+def _span(name):
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        _trace.add_span(name, time.perf_counter() - t0)
+
+
+def span(name):
+    """Contexto que suma su duración a la etapa `name`."""
+    return _span(name) if ENABLED else _NOOP
+
+
+def traced(name):
+    """Decorador: como span(name) alrededor de cada llamada."""
+    def deco(fn):
+        if not ENABLED:
+            return fn
+        def timed(*args, **kwargs):
+            t0 = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                _trace.add_span(name, time.perf_counter() - t0)
+        timed.__name__, timed.__doc__, timed.__wrapped__ = fn.__name__, fn.__doc__, fn
+        return timed
+    return deco
+
+
+def add_span(name, seconds):
+    """Como span(), cuando la duración ya se ha medido."""
+    if ENABLED:
+        _trace.add_span(name, seconds)
+
+
+def count(name, n=1):
+    if ENABLED:
+        _trace.count(name, n)
+
+
+def observe(name, seconds):
+    """Una muestra (en segundos) para el histograma `name`."""
+    if ENABLED:
+        _trace.observe(name, seconds)
+
+
+def segment(text, seconds, **info):
+    """Candidato a los segmentos más lentos."""
+    if ENABLED:
+        _trace.segment(text, seconds, **info)
+
+
+def annotate(**info):
+    """Campos sueltos de la línea (comando, idioma, backend, resultado...)."""
+    if ENABLED:
+        _trace.info.update(info)
+
+
+def mark(name):
+    """Apunta `name`_ms: cuánto ha pasado desde que arrancó el proceso (la primera vez)."""
+    if ENABLED:
+        _trace.info.setdefault(f"{name}_ms",
+                               round((time.perf_counter() - _trace.clock) * 1000, 3))
+
+
+def counters(values):
+    """Vuelca un dict de contadores (p. ej. STATS del consumidor)."""
+    if ENABLED:
+        for k, v in values.items():
+            _trace.count(k, v)
+
+
+def _emit():
+    line = json.dumps(_trace.report(), ensure_ascii=False, separators=(",", ":")) + "\n"
+    if TRACE in ("1", "-", "stderr"):
+        sys.stderr.write(line)
+        return
+    try:
+        # una sola escritura con O_APPEND: las líneas de procesos a la vez no se mezclan
+        fd = os.open(TRACE, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+        try:
+            os.write(fd, line.encode("utf-8"))
+        finally:
+            os.close(fd)
+    except OSError as e:
+        print(f"mantr: no se pudo escribir la traza en {TRACE}: {e}", file=sys.stderr)
+
+
+if ENABLED and __name__ != "__main__":
+    atexit.register(_emit)
+
+
+# ==================== RESUMEN (mantr_trace.py <fichero>...) ====================
+def percentile(counts, q):
+    """Cota superior (ms) de la cubeta donde cae el cuantil q."""
+    total = sum(counts)
+    if not total:
+        return 0.0
+    seen = 0
+    for i, c in enumerate(counts):
+        seen += c
+        if seen >= q * total:
+            return float(HIST_BUCKETS[i]) if i < len(HIST_BUCKETS) else float("inf")
+    return float("inf")
+
+
+def summarize(lines):
+    runs, spans, hist, ctr, slow = 0, {}, {}, {}, []
+    for line in lines:
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        if rec.get("v") != FORMAT:
+            continue
+        runs += 1
+        for k, v in rec.get("spans", {}).items():
+            s = spans.setdefault(k, {"count": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["count"] += v["count"]
+            s["total_ms"] += v["total_ms"]
+            s["max_ms"] = max(s["max_ms"], v["max_ms"])
+        for k, v in rec.get("hist", {}).items():
+            h = hist.setdefault(k, [0] * len(v["counts"]))
+            for i, c in enumerate(v["counts"]):
+                h[i] += c
+        for k, v in rec.get("counters", {}).items():
+            ctr[k] = ctr.get(k, 0) + v
+        slow.extend(dict(s, cmd=rec.get("cmd")) for s in rec.get("slowest", []))
+    return runs, spans, hist, ctr, sorted(slow, key=lambda s: -s["ms"])[:TOP or 10]
+
+
+def main(argv):
+    if not argv or argv[0] in ("-h", "--help"):
+        print("Uso: mantr_trace.py <traza.jsonl>... (o - para la entrada estándar)")
+        return 0
+    lines = []
+    for name in argv:
+        if name == "-":
+            lines.extend(sys.stdin)
+        else:
+            with open(name, encoding="utf-8") as f:
+                lines.extend(f)
+    runs, spans, hist, ctr, slow = summarize(lines)
+    print(f"{runs} ejecuciones\n")
+    print(f"{'etapa':28} {'llamadas':>9} {'total ms':>11} {'media ms':>9} {'máx ms':>9}")
+    for k, s in sorted(spans.items(), key=lambda kv: -kv[1]["total_ms"]):
+        print(f"{k:28} {s['count']:9} {s['total_ms']:11.1f} "
+              f"{s['total_ms'] / max(1, s['count']):9.2f} {s['max_ms']:9.1f}")
+    if hist:
+        print(f"\n{'latencia':28} {'n':>7} {'p50 ≤ms':>8} {'p95 ≤ms':>8} {'p99 ≤ms':>8}")
+        for k, counts in sorted(hist.items()):
+            print(f"{k:28} {sum(counts):7} " + " ".join(
+                f"{percentile(counts, q):8g}" for q in (0.5, 0.95, 0.99)))
+    if ctr:
+        print("\ncontadores: " + ", ".join(f"{k}={v}" for k, v in sorted(ctr.items())))
+    if slow:
+        print("\nsegmentos más lentos:")
+        for s in slow:
+            print(f"  {s['ms']:9.1f} ms  {s.get('cmd') or '?':10} {s.get('backend', ''):6} {s['text']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
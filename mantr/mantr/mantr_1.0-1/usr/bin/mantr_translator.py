@@ -0,0 +1,738 @@
+"""
+Backends de traducción de mantr.
+
+Translator envuelve los motores gratuitos (Argos, LibreTranslate, HF, y el
+modelo de Argos directamente con CTranslate2), que se dan de alta en un registro (register_backend) y se cargan al usarse.
+TranslatorPool reparte los lotes entre varios procesos, cada uno con su
+propio Translator ya cargado (MANTR_JOBS=N).
+DaemonTranslator delega en el demonio mantrd si está arrancado.
+Antes de llegar a cualquier backend, Translator parte los párrafos en
+frases de longitud acotada (mantr_segment, MANTR_SEGMENT_CHARS).
+"""
+import os, sys, json, stat, time, socket, atexit, importlib, threading, multiprocessing
+from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
+
+import mantr_segment
+import mantr_trace as trace
+
+
+# ==================== REGISTRO DE BACKENDS ====================
+BACKENDS = {}       # nombre → clase del backend
+AUTO_ORDER = []     # orden que prueba "auto"
+
+
+def register_backend(name, auto=False):
+    """
+    Decorador para dar de alta un backend sin tocar Translator:
+
+        @register_backend("mio")
+        class MiBackend(Backend):
+            def load(self): ...
+            def translate_batch(self, texts, src, dest): ...
+
+    Con auto=True se añade al final de la cadena de "auto". Los módulos
+    listados en MANTR_PLUGINS (separados por comas) se importan al crear
+    el primer Translator, así que pueden registrar backends propios.
+    """
+    def deco(cls):
+        cls.name = name
+        BACKENDS[name] = cls
+        if auto and name not in AUTO_ORDER:
+            AUTO_ORDER.append(name)
+        return cls
+    return deco
+
+
+class Unsupported(Exception):
+    """El backend no puede traducir este par de idiomas (no es un fallo puntual)."""
+
+
+class Backend:
+    """
+    Base de los backends. load() se llama una sola vez, la primera vez que
+    hace falta el backend, y debe lanzar una excepción si no está
+    disponible. translate_batch devuelve una lista del mismo tamaño con
+    None en lo que no haya podido traducir, o lanza Unsupported si el par
+    de idiomas no existe.
+    """
+    name = None
+    # True si translate_batch ya apunta lo que tarda cada segmento (trace.segment)
+    traces_segments = False
+
+    def load(self):
+        pass
+
+    def translate_batch(self, texts, src, dest):
+        raise NotImplementedError
+
+
+@register_backend("argos", auto=True)
+class ArgosBackend(Backend):
+    """Argos Translate (offline puro, requiere el paquete del par instalado)."""
+    traces_segments = True
+
+    def load(self):
+        from argostranslate import translate as _atr
+        self._argos = _atr
+        self._pairs = {}
+
+    def _translation(self, src, dest):
+        # get_translation_from_codes recorre los paquetes instalados en cada
+        # llamada; lo resolvemos una sola vez por par de idiomas.
+        key = (src, dest)
+        if key not in self._pairs:
+            try:
+                self._pairs[key] = self._argos.get_translation_from_codes(src, dest)
+            except Exception:
+                self._pairs[key] = None
+        return self._pairs[key]
+
+    def translate_batch(self, texts, src, dest):
+        translation = self._translation(src, dest)
+        if translation is None:
+            raise Unsupported(f"argos: no hay paquete {src}→{dest} instalado")
+        out = []
+        for text in texts:
+            # Argos traduce frase a frase: aquí sí se sabe lo que tarda cada segmento
+            t0 = time.perf_counter() if trace.ENABLED else 0.0
+            try:
+                out.append(translation.translate(text))
+            except Exception:
+                out.append(None)
+            if trace.ENABLED:
+                elapsed = time.perf_counter() - t0
+                trace.observe("backend.argos.segment", elapsed)
+                trace.segment(text, elapsed, backend="argos")
+        return out
+
+
+@register_backend("libre", auto=True)
+class LibreBackend(Backend):
+    """
+    LibreTranslate (LIBRE_URL, http://localhost:5000/translate por defecto).
+
+    Usa una sesión de requests con conexiones persistentes y reintentos con
+    espera exponencial. Los textos se envían en lotes de MANTR_LIBRE_BATCH
+    (LibreTranslate acepta una lista en "q") y con hasta
+    MANTR_LIBRE_CONCURRENCY peticiones en vuelo a la vez. Si el servidor no
+    acepta listas, se vuelve a una petición por texto (también en paralelo).
+    """
+    def load(self):
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        self._url = os.environ.get("LIBRE_URL", "http://localhost:5000/translate")
+        self._api_key = os.environ.get("LIBRE_API_KEY")
+        self._batch = max(1, int(os.environ.get("MANTR_LIBRE_BATCH", "16") or 16))
+        self._concurrency = max(1, int(os.environ.get("MANTR_LIBRE_CONCURRENCY", "4") or 4))
+        self._arrays = True
+
+        retry = Retry(
+            total=int(os.environ.get("MANTR_LIBRE_RETRIES", "3") or 3),
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset(["POST"]),
+            respect_retry_after_header=True,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self._concurrency,
+            max_retries=retry,
+        )
+        self._session = requests.Session()
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+        self._pool = ThreadPoolExecutor(max_workers=self._concurrency)
+
+    def _post(self, q, src, dest):
+        payload = {"q": q, "source": src, "target": dest, "format": "text"}
+        if self._api_key:
+            payload["api_key"] = self._api_key
+        r = self._session.post(self._url, json=payload, timeout=15)
+        r.raise_for_status()
+        return r.json().get("translatedText")
+
+    def _translate_one(self, text, src, dest):
+        try:
+            return self._post(text, src, dest) or None
+        except Exception:
+            return None
+
+    def _translate_lot(self, lot, src, dest):
+        if self._arrays:
+            try:
+                res = self._post(lot, src, dest)
+                if isinstance(res, list) and len(res) == len(lot):
+                    return [r or None for r in res]
+                self._arrays = False  # versión antigua: no entiende listas
+            except Exception as e:
+                if getattr(getattr(e, "response", None), "status_code", None) == 400:
+                    self._arrays = False
+        return [self._translate_one(t, src, dest) for t in lot]
+
+    def translate_batch(self, texts, src, dest):
+        lots = [texts[i:i + self._batch] for i in range(0, len(texts), self._batch)]
+        if not self._arrays:
+            # una petición por texto, pero varias en vuelo
+            return list(self._pool.map(lambda t: self._translate_one(t, src, dest), texts))
+        res = self._pool.map(lambda lot: self._translate_lot(lot, src, dest), lots)
+        return [t for lot in res for t in lot]
+
+
+@register_backend("hf", auto=True)
+class HFBackend(Backend):
+    """HuggingFace (Helsinki-NLP/opus-mt-en-es); descarga 1ª vez y luego offline."""
+    def load(self):
+        from transformers import pipeline
+        self._pipe = pipeline(
+            "translation_en_to_es",
+            model="Helsinki-NLP/opus-mt-en-es"
+        )
+
+    def translate_batch(self, texts, src, dest):
+        # Modelo EN->ES; otro par no lo puede hacer
+        if not (src == "en" and dest == "es"):
+            raise Unsupported("hf: solo en→es")
+        try:
+            res = self._pipe(texts, batch_size=len(texts))
+            return [r["translation_text"] for r in res]
+        except Exception:
+            return [None] * len(texts)
+
+
+def argos_package_dirs():
+    """Carpetas donde Argos instala sus paquetes (como argostranslate.settings)."""
+    if os.environ.get("ARGOS_PACKAGES_DIR"):
+        return [Path(os.environ["ARGOS_PACKAGES_DIR"])]
+    data = Path(os.environ.get("XDG_DATA_HOME") or Path.home() / ".local" / "share")
+    return [data / "argos-translate" / "packages",
+            Path("/usr/share/argos-translate/packages")]
+
+
+def find_argos_package(src, dest):
+    """Carpeta del paquete Argos src→dest instalado (con metadata.json), o None."""
+    for base in argos_package_dirs():
+        if not base.is_dir():
+            continue
+        for pkg in sorted(base.iterdir()):
+            try:
+                meta = json.loads((pkg / "metadata.json").read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if meta.get("from_code") == src and meta.get("to_code") == dest:
+                return pkg, meta
+    return None
+
+
+@register_backend("ct2")
+class CT2Backend(Backend):
+    """
+    El modelo CTranslate2 y el tokenizador SentencePiece del paquete Argos
+    instalado, sin pasar por argostranslate: todas las frases del lote van
+    al modelo en una sola llamada, el modelo cargado se reutiliza entre
+    lotes y no se carga stanza.
+
+    MANTR_CT2_MODE=fast (por defecto) traduce en int8 y sin beam search
+    (greedy); quality usa el tipo de cálculo del modelo y beam 4, como
+    Argos. MANTR_CT2_COMPUTE, MANTR_CT2_BEAM, MANTR_CT2_BATCH (frases por
+    lote interno, 32) y MANTR_CT2_THREADS / MANTR_CT2_INTER (hilos por
+    traducción y traducciones a la vez) ajustan cada cosa por separado.
+    ct2-fast y ct2-quality fijan el modo en el nombre (p. ej. para usar
+    los dos a la vez con MANTR_DRAFT=ct2-fast BACKEND=ct2-quality).
+    """
+    mode = None  # None: MANTR_CT2_MODE
+    MODES = {
+        "fast": {"compute_type": "int8", "beam_size": 1},
+        "quality": {"compute_type": "default", "beam_size": 4},
+    }
+
+    def load(self):
+        import ctranslate2
+        import sentencepiece
+        self._ct2 = ctranslate2
+        self._spm = sentencepiece
+        mode = self.mode or os.environ.get("MANTR_CT2_MODE", "fast")
+        if mode not in self.MODES:
+            raise ValueError(f"ct2: modo desconocido {mode!r} (fast | quality)")
+        conf = self.MODES[mode]
+        self._compute = os.environ.get("MANTR_CT2_COMPUTE") or conf["compute_type"]
+        self._beam = int(os.environ.get("MANTR_CT2_BEAM") or conf["beam_size"])
+        self._batch = max(1, int(os.environ.get("MANTR_CT2_BATCH", "32") or 32))
+        # con MANTR_JOBS cada proceso recibe su parte de núcleos en ARGOS_INTRA_THREADS
+        self._threads = int(os.environ.get("MANTR_CT2_THREADS")
+                            or os.environ.get("ARGOS_INTRA_THREADS") or 0)
+        self._inter = max(1, int(os.environ.get("MANTR_CT2_INTER", "1") or 1))
+        self._models = {}
+
+    def _model(self, src, dest):
+        """(translator, tokenizer, prefijo) del par, cargados una vez."""
+        key = (src, dest)
+        if key not in self._models:
+            found = find_argos_package(src, dest)
+            if found is None:
+                raise Unsupported(f"ct2: no hay paquete Argos {src}→{dest} instalado")
+            pkg, meta = found
+            sp_path = pkg / "sentencepiece.model"
+            if not sp_path.is_file():
+                raise Unsupported(f"ct2: {pkg.name} no usa SentencePiece")
+            kwargs = dict(device="cpu", inter_threads=self._inter, intra_threads=self._threads)
+            try:
+                model = self._ct2.Translator(str(pkg / "model"), compute_type=self._compute, **kwargs)
+            except ValueError:
+                # la CPU no soporta ese tipo de cálculo: el que elija CTranslate2
+                model = self._ct2.Translator(str(pkg / "model"), compute_type="auto", **kwargs)
+            tokenizer = self._spm.SentencePieceProcessor(model_file=str(sp_path))
+            self._models[key] = (model, tokenizer, meta.get("target_prefix") or None)
+        return self._models[key]
+
+    def translate_batch(self, texts, src, dest):
+        model, tokenizer, prefix = self._model(src, dest)
+        sentences, owner = [], []
+        for i, text in enumerate(texts):
+            # Translator ya manda frases; por si se llama directamente
+            for s in mantr_segment.split(text) or [text]:
+                sentences.append(s)
+                owner.append(i)
+        if not sentences:
+            return [None] * len(texts)
+        try:
+            tokens = tokenizer.encode(sentences, out_type=str)
+            results = model.translate_batch(
+                tokens,
+                target_prefix=[[prefix]] * len(tokens) if prefix else None,
+                beam_size=self._beam,
+                max_batch_size=self._batch,
+                batch_type="examples",
+                replace_unknowns=True,
+                length_penalty=0.2,
+            )
+        except Exception:
+            return [None] * len(texts)
+        parts = [[] for _ in texts]
+        for i, res in zip(owner, results):
+            hyp = res.hypotheses[0] if res.hypotheses else []
+            if prefix and hyp and hyp[0] == prefix:
+                hyp = hyp[1:]
+            parts[i].append(tokenizer.decode(hyp).strip())
+        return [" ".join(p) or None for p in parts]
+
+
+@register_backend("ct2-fast")
+class CT2FastBackend(CT2Backend):
+    mode = "fast"
+
+
+@register_backend("ct2-quality")
+class CT2QualityBackend(CT2Backend):
+    mode = "quality"
+
+
+# ==================== SALUD DE LOS BACKENDS ====================
+CACHE_DIR = Path(os.environ.get("MANTR_CACHE_DIR", Path.home() / ".cache" / "mantr"))
+# fallos seguidos de un backend (para un par de idiomas) antes de abrir el circuito
+BREAKER_FAILURES = int(os.environ.get("MANTR_BREAKER_FAILURES", "3") or 3)
+# segundos que un backend caído se deja de intentar, también en llamadas posteriores
+BREAKER_TTL = float(os.environ.get("MANTR_BREAKER_TTL", "600") or 600)
+
+
+class Health:
+    """
+    Recuerda qué backends fallan y para qué par de idiomas. Si un backend no
+    se puede cargar o no soporta el par, se descarta para el resto del
+    proceso. Si falla BREAKER_FAILURES lotes seguidos sin traducir nada
+    (servidor caído, timeouts...) se abre el circuito: el resto de la página
+    va directa al siguiente backend, y se apunta en <caché>/backends.json
+    durante BREAKER_TTL segundos para que las siguientes páginas tampoco
+    pierdan tiempo con él.
+    """
+    def __init__(self, path=None):
+        self.path = Path(path) if path else CACHE_DIR / "backends.json"
+        self.failures = {}
+        self.skip = set()
+        self.open_until = {}
+        try:
+            now = time.time()
+            saved = json.loads(self.path.read_text(encoding="utf-8"))
+            self.open_until = {k: v for k, v in saved.items() if v > now}
+        except Exception:
+            pass
+
+    @staticmethod
+    def key(name, src, dest):
+        return f"{name}:{src}:{dest}"
+
+    def is_open(self, name, src, dest):
+        k = self.key(name, src, dest)
+        return k in self.skip or self.open_until.get(k, 0) > time.time()
+
+    def ok(self, name, src, dest):
+        self.failures.pop(self.key(name, src, dest), None)
+
+    def unavailable(self, name, src, dest):
+        # no instalado / par no soportado: no se guarda, por si lo instalan ya
+        self.skip.add(self.key(name, src, dest))
+
+    def fail(self, name, src, dest):
+        k = self.key(name, src, dest)
+        self.failures[k] = self.failures.get(k, 0) + 1
+        if self.failures[k] >= BREAKER_FAILURES:
+            self.open_until[k] = time.time() + BREAKER_TTL
+            self._save()
+
+    def _save(self):
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(f".{os.getpid()}.tmp")
+            tmp.write_text(json.dumps(self.open_until), encoding="utf-8")
+            os.replace(tmp, self.path)
+        except Exception:
+            pass
+
+
+def load_plugins():
+    for mod in os.environ.get("MANTR_PLUGINS", "").split(","):
+        mod = mod.strip()
+        if mod and mod not in sys.modules:
+            try:
+                importlib.import_module(mod)
+            except Exception as e:
+                print(f"mantr: no se pudo cargar el plugin {mod}: {e}", file=sys.stderr)
+
+
+# ==================== TRADUCTOR (solo gratis) ====================
+# longitud máxima de lo que se manda al backend: los párrafos se parten en
+# frases (y las frases más largas, por cláusulas); 0 los manda enteros
+SEGMENT_CHARS = int(os.environ.get("MANTR_SEGMENT_CHARS", "400") or 0)
+
+
+class Translator:
+    """
+    Backends (ver BACKENDS; se pueden añadir más con register_backend):
+      - argos : Argos Translate (offline puro, requiere paquete en→es instalado)
+      - libre : LibreTranslate local (http://localhost:5000/translate por defecto)
+      - hf    : HuggingFace (Helsinki-NLP/opus-mt-en-es); descarga 1ª vez y luego offline
+      - ct2   : el modelo del paquete Argos con CTranslate2, en lote (ver CT2Backend)
+      - auto  : intenta Argos → Libre → HF
+    Cada backend se carga la primera vez que hace falta, no al crear el
+    Translator: en "auto", si Argos traduce todo, HF ni se importa.
+    """
+    def __init__(self, backend="auto"):
+        self.backend = backend
+        self._init_clients()
+
+    def _init_clients(self):
+        with trace.span("translator.init"):
+            load_plugins()
+            self._chain = list(AUTO_ORDER) if self.backend == "auto" else [self.backend]
+            self._loaded = {}
+            self._load_lock = threading.Lock()  # varios idiomas a la vez: se carga una vez
+            self.health = Health()
+
+    def _get(self, name):
+        """Instancia y carga el backend la primera vez; None si no está disponible."""
+        with self._load_lock:
+            if name not in self._loaded:
+                backend = None
+                cls = BACKENDS.get(name)
+                if cls is not None:
+                    try:
+                        # cargar el modelo suele ser lo más caro de una página sin caché
+                        with trace.span(f"backend.{name}.load"):
+                            backend = cls()
+                            backend.load()
+                    except Exception:
+                        trace.count(f"backend.{name}.unavailable")
+                        backend = None
+                self._loaded[name] = backend
+            return self._loaded[name]
+
+    def translate_batch(self, texts, src="en", dest="es"):
+        """
+        Traduce una lista de textos de una vez y devuelve otra lista en el
+        mismo orden. Argos/CTranslate2 y la pipeline de HF rinden mucho más
+        con lotes que frase a frase. Lo que ningún backend traduce se
+        devuelve tal cual.
+
+        Cada texto se parte antes en frases (mantr_segment.pieces): al
+        modelo le cuesta más un párrafo largo que sus frases por separado
+        y a veces lo devuelve cortado. Las frases traducidas se vuelven a
+        juntar con un espacio; un texto del que no se ha traducido ninguna
+        frase se devuelve tal cual, como antes.
+        """
+        texts = [(t or "").strip() for t in texts]
+        if not SEGMENT_CHARS:
+            return self._translate_lot(texts, src, dest)
+        with trace.span("segment"):
+            split = [mantr_segment.pieces(t, SEGMENT_CHARS) if t else [] for t in texts]
+        unique = list(dict.fromkeys(p for ps in split for p in ps))
+        trace.count("segment.sentences", len(unique))
+        done = dict(zip(unique, self._translate_lot(unique, src, dest)))
+        out = []
+        for t, ps in zip(texts, split):
+            res = [done[p] for p in ps]
+            out.append(t if res == ps else " ".join(res))
+        return out
+
+    def _translate_lot(self, texts, src, dest):
+        """Los textos, tal cual, por la cadena de backends (con su cortacircuitos)."""
+        out = [None if t else t for t in texts]
+
+        for name in self._chain:
+            pending = [i for i, o in enumerate(out) if o is None]
+            if not pending:
+                break
+            if self.health.is_open(name, src, dest):
+                trace.count(f"backend.{name}.breaker_open")
+                continue
+            backend = self._get(name)
+            if backend is None:
+                self.health.unavailable(name, src, dest)
+                continue
+            lot = [texts[i] for i in pending]
+            t0 = time.perf_counter()
+            try:
+                res = backend.translate_batch(lot, src, dest)
+            except Unsupported:
+                self.health.unavailable(name, src, dest)
+                continue
+            except Exception:
+                trace.count(f"backend.{name}.error")
+                res = [None] * len(pending)
+            if trace.ENABLED:
+                elapsed = time.perf_counter() - t0
+                trace.observe(f"backend.{name}", elapsed)
+                trace.add_span(f"backend.{name}", elapsed)
+                trace.count(f"backend.{name}.segments", len(lot))
+                if not backend.traces_segments:
+                    # en lote no se sabe qué segmento tardó más: se reparte
+                    for text in lot:
+                        trace.segment(text, elapsed / len(lot), backend=name, batch=len(lot))
+            got = 0
+            for i, r in zip(pending, res):
+                if r:
+                    out[i] = r
+                    got += 1
+            if got:
+                self.health.ok(name, src, dest)
+            else:
+                trace.count(f"backend.{name}.failed_batches")
+                self.health.fail(name, src, dest)
+
+        return [o or t for o, t in zip(out, texts)]
+
+    def translate(self, text, src="en", dest="es"):
+        return self.translate_batch([text], src=src, dest=dest)[0]
+
+
+# ==================== VARIOS PROCESOS (MANTR_JOBS) ====================
+_worker_tr = None
+
+def _worker_init(backend, threads):
+    """
+    Arranque de cada proceso del pool: limita los hilos de CTranslate2/OpenMP
+    antes de importar nada para no sobresuscribir los núcleos y carga su
+    propio Translator.
+    """
+    global _worker_tr
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "ARGOS_INTRA_THREADS"):
+        os.environ[var] = str(threads)
+    os.environ["ARGOS_INTER_THREADS"] = "1"
+    _worker_tr = Translator(backend)
+
+def _worker_translate(texts, src, dest):
+    return _worker_tr.translate_batch(texts, src=src, dest=dest)
+
+
+class TranslatorPool:
+    """
+    Misma interfaz que Translator, pero cada lote se parte en trozos
+    contiguos que se traducen en paralelo en procesos distintos. El
+    resultado se recompone en el orden original, así que la salida es la
+    misma que con un único proceso.
+    """
+    def __init__(self, backend="auto", jobs=2):
+        self.backend = backend
+        self.jobs = jobs
+        self._pool = None
+
+    def _ensure_pool(self):
+        if self._pool is None:
+            threads = max(1, (os.cpu_count() or 1) // self.jobs)
+            # spawn: los runtimes de los modelos no se llevan bien con fork
+            ctx = multiprocessing.get_context("spawn")
+            self._pool = ctx.Pool(
+                self.jobs,
+                initializer=_worker_init,
+                initargs=(self.backend, threads),
+            )
+            atexit.register(self.close)
+        return self._pool
+
+    def translate_batch(self, texts, src="en", dest="es"):
+        texts = list(texts)
+        if not texts:
+            return []
+        size = -(-len(texts) // self.jobs)  # reparto equilibrado, redondeando hacia arriba
+        shards = [texts[i:i + size] for i in range(0, len(texts), size)]
+        res = self._ensure_pool().starmap(
+            _worker_translate, [(shard, src, dest) for shard in shards]
+        )
+        return [t for shard in res for t in shard]
+
+    def translate(self, text, src="en", dest="es"):
+        return self.translate_batch([text], src=src, dest=dest)[0]
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+
+# ==================== DEMONIO (mantrd) ====================
+def socket_path() -> Path:
+    """Socket Unix del demonio, uno por usuario."""
+    if os.environ.get("MANTR_SOCKET"):
+        return Path(os.environ["MANTR_SOCKET"])
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    base = Path(runtime) if runtime else Path("/tmp") / f"mantr-{os.getuid()}"
+    return base / "mantrd.sock"
+
+
+def private_dir(path) -> bool:
+    """
+    ¿Es `path` una carpeta de este usuario con permisos 0700 (y no un
+    enlace)? En /tmp otro usuario puede crear antes mantr-<uid> o el socket
+    y hacerse pasar por mantrd: lo que devolviera acabaría en la caché y en
+    la memoria de traducción.
+    """
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return (stat.S_ISDIR(st.st_mode) and st.st_uid == os.getuid()
+            and stat.S_IMODE(st.st_mode) == 0o700)
+
+
+def own_socket(path) -> bool:
+    """¿Es `path` un socket de este usuario dentro de una carpeta privada (private_dir)?"""
+    try:
+        st = os.lstat(path)
+    except OSError:
+        return False
+    return (stat.S_ISSOCK(st.st_mode) and st.st_uid == os.getuid()
+            and private_dir(Path(path).parent))
+
+
+class DaemonClient:
+    """Conexión a mantrd: una petición JSON por línea, una respuesta por línea."""
+    def __init__(self, sock):
+        self._sock = sock
+        self._file = sock.makefile("rwb")
+
+    @classmethod
+    def connect(cls, path=None, timeout=0.5):
+        path = path or socket_path()
+        if not own_socket(path):
+            # no hay demonio, o el socket no es de fiar: se traduce en proceso
+            return None
+        try:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(timeout)
+            sock.connect(str(path))
+            sock.settimeout(None)  # una traducción larga puede tardar lo que tarde
+            return cls(sock)
+        except OSError:
+            return None
+
+    def request(self, **msg):
+        self._file.write(json.dumps(msg).encode("utf-8") + b"\n")
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("mantrd ha cerrado la conexión")
+        res = json.loads(line)
+        if not res.get("ok"):
+            raise RuntimeError(res.get("error") or "error en mantrd")
+        return res
+
+    def close(self):
+        try:
+            self._file.close()
+            self._sock.close()
+        except OSError:
+            pass
+
+
+class DaemonTranslator:
+    """
+    Misma interfaz que Translator, pero la traducción la hace mantrd con
+    los modelos ya cargados. El demonio consulta también su propia memoria
+    de traducción (memoizes = True), así que el consumidor no necesita
+    abrirla. Si el demonio desaparece a mitad, se sigue en proceso.
+
+    Cada petición usa una conexión libre (o abre otra): con varios idiomas
+    a la vez, cada hilo tiene la suya y mantrd los atiende en paralelo.
+    """
+    memoizes = True
+
+    def __init__(self, backend, client):
+        self.backend = backend
+        self._idle = [client]
+        self._down = False
+        self._lock = threading.Lock()
+        self._local = None
+
+    def _acquire(self):
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return DaemonClient.connect()
+
+    def translate_batch(self, texts, src="en", dest="es"):
+        texts = list(texts)
+        client = None if self._down else self._acquire()
+        if client is not None:
+            try:
+                out = client.request(
+                    op="translate", backend=self.backend,
+                    src=src, dest=dest, texts=texts,
+                )["out"]
+                with self._lock:
+                    self._idle.append(client)
+                return out
+            except (OSError, ValueError, ConnectionError, RuntimeError):
+                client.close()
+        with self._lock:
+            self._down = True
+            if self._local is None:
+                self._local = make_local_translator(self.backend)
+        self.memoizes = False
+        return self._local.translate_batch(texts, src=src, dest=dest)
+
+    def translate(self, text, src="en", dest="es"):
+        return self.translate_batch([text], src=src, dest=dest)[0]
+
+
+def make_local_translator(backend="auto"):
+    """Translator normal o, si MANTR_JOBS > 1, un pool de procesos."""
+    try:
+        jobs = int(os.environ.get("MANTR_JOBS", "1") or 1)
+    except ValueError:
+        jobs = 1
+    if jobs > 1:
+        return TranslatorPool(backend, jobs)
+    return Translator(backend)
+
+
+def make_translator(backend="auto"):
+    """
+    Usa mantrd si hay uno escuchando (salvo MANTR_DAEMON=0); si no,
+    traduce en este mismo proceso.
+    """
+    if os.environ.get("MANTR_DAEMON", "1") != "0":
+        client = DaemonClient.connect()
+        if client is not None:
+            return DaemonTranslator(backend, client)
+    return make_local_translator(backend)
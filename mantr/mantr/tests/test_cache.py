@@ -0,0 +1,107 @@
+"""
+Pruebas de la caché de páginas (mantr_cache): el orden de las capas, en
+cuál se escribe y los cerrojos (PageCache.lock), sobre todo en la capa
+compartida entre usuarios.
+
+Uso:
+  python3 -m unittest discover -s tests
+"""
+import os, stat, sys, tempfile, unittest
+from pathlib import Path
+from unittest import mock
+
+BIN = Path(__file__).resolve().parent.parent / "mantr_1.0-1" / "usr" / "bin"
+sys.path.insert(0, str(BIN))
+import mantr_cache  # noqa: E402
+
+
+class LayeredCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        root = Path(tmp.name)
+        self.user = mantr_cache.PageCache(root / "user")
+        self.shared = mantr_cache.PageCache(root / "shared", shared=True)
+        seed = mantr_cache.PageCache(root / "ro")
+        seed.put("ls_es_argos_x", "ls (solo lectura)", "ls", "es", "argos")
+        seed.put("cat_es_argos_x", "cat (solo lectura)", "cat", "es", "argos")
+        seed.close()
+        self.readonly = mantr_cache.PageCache(root / "ro", readonly=True)
+        for layer in (self.user, self.shared, self.readonly):
+            self.addCleanup(layer.close)
+
+    def test_writes_to_shared_layer(self):
+        cache = mantr_cache.LayeredCache([self.user, self.shared, self.readonly])
+        self.assertIs(cache.writer, self.shared)
+        self.assertIs(cache.user, self.user)
+        self.assertTrue(cache.put("grep_es_argos_x", "grep", "grep", "es", "argos"))
+        self.assertEqual(self.shared.get("grep_es_argos_x"), "grep")
+        self.assertIsNone(self.user.get("grep_es_argos_x"))
+
+    def test_without_shared_layer(self):
+        cache = mantr_cache.LayeredCache([self.user, self.readonly])
+        self.assertIs(cache.writer, self.user)
+        self.assertFalse(mantr_cache.LayeredCache([self.readonly]).put("x_es_argos_x", "x"))
+
+    def test_first_layer_wins(self):
+        cache = mantr_cache.LayeredCache([self.user, self.shared, self.readonly])
+        self.assertEqual(cache.get("ls_es_argos_x"), "ls (solo lectura)")
+        self.user.put("ls_es_argos_x", "ls (usuario)", "ls", "es", "argos")
+        self.assertEqual(cache.get("ls_es_argos_x"), "ls (usuario)")
+        self.assertIsNone(cache.get("find_es_argos_x"))
+
+    def test_discard_skips_readonly(self):
+        cache = mantr_cache.LayeredCache([self.user, self.shared, self.readonly])
+        self.user.put("cat_es_argos_x", "cat (usuario)", "cat", "es", "argos")
+        cache.discard(["cat_es_argos_x"])
+        self.assertIsNone(self.user.get("cat_es_argos_x"))
+        self.assertEqual(cache.get("cat_es_argos_x"), "cat (solo lectura)")
+
+
+class LockTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.umask = os.umask(0o022)
+        self.addCleanup(os.umask, self.umask)
+
+    def waits(self, cache, key):
+        """¿Tiene que esperar otro cerrojo sobre `key` mientras está tomado?"""
+        waited = []
+        with cache.lock(key, on_wait=lambda: waited.append(1), timeout=0.3):
+            pass
+        return bool(waited)
+
+    def test_shared_lock_is_group_writable(self):
+        cache = mantr_cache.PageCache(self.tmp.name, shared=True)
+        with cache.lock("ls_es_argos_x"):
+            mode = os.stat(Path(self.tmp.name) / "locks" / "ls_es_argos_x.lock").st_mode
+        # con umask 022 quedaría 0644 y otro usuario del grupo no podría abrirlo
+        self.assertEqual(stat.S_IMODE(mode), 0o664)
+
+    def test_lock_serializes(self):
+        cache = mantr_cache.PageCache(self.tmp.name)
+        with cache.lock("ls_es_argos_x"):
+            self.assertTrue(self.waits(cache, "ls_es_argos_x"))
+        self.assertFalse(self.waits(cache, "ls_es_argos_x"))
+
+    def test_lock_without_write_permission(self):
+        # el cerrojo de otro usuario, sin permiso de escritura: se abre para
+        # leer y el flock sigue valiendo
+        cache = mantr_cache.PageCache(self.tmp.name, shared=True)
+        with cache.lock("ls_es_argos_x"):
+            pass
+        real_open = os.open
+
+        def no_write(path, flags, *args):
+            if flags & os.O_RDWR:
+                raise PermissionError(13, "Permission denied", str(path))
+            return real_open(path, flags, *args)
+
+        with cache.lock("ls_es_argos_x"):
+            with mock.patch.object(mantr_cache.os, "open", no_write):
+                self.assertTrue(self.waits(cache, "ls_es_argos_x"))
+
+
+if __name__ == "__main__":
+    unittest.main()
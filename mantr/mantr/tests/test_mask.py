@@ -0,0 +1,51 @@
+"""
+Pruebas del enmascarado de flags, rutas y variables antes de traducir
+(mantr_consume.mask_segment / unmask_segment / has_words).
+
+Uso:
+  python3 -m unittest discover -s tests
+"""
+import sys, unittest
+from pathlib import Path
+
+BIN = Path(__file__).resolve().parent.parent / "mantr_1.0-1" / "usr" / "bin"
+sys.path.insert(0, str(BIN))
+import mantr_consume  # noqa: E402
+
+
+class MaskTest(unittest.TestCase):
+    def test_mask(self):
+        masked, tokens = mantr_consume.mask_segment(
+            "Use --color=auto with ls -l in /etc/passwd or $HOME.")
+        self.assertEqual(masked, "Use {0} with ls {1} in {2} or {3}.")
+        self.assertEqual(tokens, ["--color=auto", "-l", "/etc/passwd", "$HOME"])
+
+    def test_plain_text(self):
+        self.assertEqual(mantr_consume.mask_segment("print a well-known message"),
+                         ("print a well-known message", []))
+
+    def test_round_trip(self):
+        text = "Use --color=auto with ls -l in /etc/passwd or $HOME."
+        masked, tokens = mantr_consume.mask_segment(text)
+        self.assertEqual(mantr_consume.unmask_segment(masked, tokens), text)
+        # el modelo puede mover los {n} y meter espacios dentro
+        self.assertEqual(mantr_consume.unmask_segment("Usa { 0 } en {2}, {1} y {3}", tokens),
+                         "Usa --color=auto en /etc/passwd, -l y $HOME")
+
+    def test_lost_token(self):
+        masked, tokens = mantr_consume.mask_segment("Use -l in /etc/passwd.")
+        self.assertIsNone(mantr_consume.unmask_segment("Usa {0} aquí.", tokens))
+
+    def test_invented_token(self):
+        # un {n} que no existe se deja tal cual; faltan los de verdad
+        self.assertIsNone(mantr_consume.unmask_segment("Usa {7}.", ["-l"]))
+        self.assertEqual(mantr_consume.unmask_segment("Usa {0} {7}.", ["-l"]), "Usa -l {7}.")
+
+    def test_has_words(self):
+        self.assertFalse(mantr_consume.has_words("{0} {1}, {2}."))
+        self.assertFalse(mantr_consume.has_words("{0} = 1"))
+        self.assertTrue(mantr_consume.has_words("Use {0}"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+"""
+Pruebas del formato de los paquetes de traducciones (mantr_pack): lo que
+escribe write_pack se lee igual con Pack, y un fichero que no es un
+paquete se rechaza.
+
+Uso:
+  python3 -m unittest discover -s tests
+"""
+import gzip, sys, tempfile, unittest
+from pathlib import Path
+
+BIN = Path(__file__).resolve().parent.parent / "mantr_1.0-1" / "usr" / "bin"
+sys.path.insert(0, str(BIN))
+import mantr_pack  # noqa: E402
+from mantr_tm import segment_key  # noqa: E402
+
+PAGES = {
+    "ls_es_argos_x": "LS(1)\n\nNOMBRE\n       ls - lista el contenido de directorios\n",
+    "grep_es_argos_x": "GREP(1)\n\nNOMBRE\n       grep - imprime líneas que coinciden\n",
+}
+SEGMENTS = {
+    "Print a message.": "Imprime un mensaje.",
+    "Exit.": "Salir.",
+}
+
+
+class PackTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / f"es{mantr_pack.SUFFIX}"
+        pages = [(["ls_es_argos_x", "dir_es_argos_x"], gzip.compress(PAGES["ls_es_argos_x"].encode())),
+                 (["grep_es_argos_x"], gzip.compress(PAGES["grep_es_argos_x"].encode()))]
+        segments = [(segment_key(src, "es", "argos"), dst) for src, dst in SEGMENTS.items()]
+        self.counts = mantr_pack.write_pack(self.path, pages, segments,
+                                            {"lang": "es", "entries": []})
+
+    def open(self):
+        pack = mantr_pack.Pack(self.path)
+        self.addCleanup(pack.close)
+        return pack
+
+    def test_round_trip(self):
+        pack = self.open()
+        self.assertEqual(self.counts, (3, 2))
+        self.assertEqual((pack.n_pages, pack.n_segments), (3, 2))
+        for key, text in PAGES.items():
+            self.assertEqual(pack.page(key), text)
+        for src, dst in SEGMENTS.items():
+            self.assertEqual(pack.segment(segment_key(src, "es", "argos")), dst)
+        self.assertEqual(pack.meta, {"lang": "es", "entries": []})
+
+    def test_aliases_share_the_page(self):
+        pack = self.open()
+        self.assertEqual(pack.page("dir_es_argos_x"), PAGES["ls_es_argos_x"])
+
+    def test_missing(self):
+        pack = self.open()
+        self.assertIsNone(pack.page("cat_es_argos_x"))
+        self.assertIsNone(pack.segment(segment_key("Print a message.", "fr", "argos")))
+
+    def test_not_a_pack(self):
+        bad = self.path.with_name("bad" + mantr_pack.SUFFIX)
+        for data in (b"", b"hola", b"X" * 200):
+            bad.write_bytes(data)
+            with self.assertRaises(mantr_pack.PackError):
+                mantr_pack.Pack(bad)
+
+    def test_other_version(self):
+        data = bytearray(self.path.read_bytes())
+        data[len(mantr_pack.MAGIC)] ^= 0xFF
+        self.path.write_bytes(bytes(data))
+        with self.assertRaises(mantr_pack.PackError):
+            mantr_pack.Pack(self.path)
+
+    def test_as_cache_layer(self):
+        layer = mantr_pack.PackCache(self.open())
+        self.assertTrue(layer.readonly)
+        self.assertEqual(layer.get("grep_es_argos_x"), PAGES["grep_es_argos_x"])
+        self.assertEqual(layer.quality("grep_es_argos_x"), "final")
+        self.assertIsNone(layer.quality("cat_es_argos_x"))
+
+
+if __name__ == "__main__":
+    unittest.main()
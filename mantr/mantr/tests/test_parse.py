@@ -0,0 +1,137 @@
+"""
+Pruebas del troceado de páginas (mantr_parse) y de la lectura de bloques de
+opciones (mantr_consume.parse_options_block), con trozos en la forma que
+tiene la salida real de man: flags a 7 columnas, descripciones a 14.
+
+Uso:
+  python3 -m unittest discover -s tests
+"""
+import sys, unittest
+from pathlib import Path
+
+BIN = Path(__file__).resolve().parent.parent / "mantr_1.0-1" / "usr" / "bin"
+sys.path.insert(0, str(BIN))
+import mantr_parse  # noqa: E402
+import mantr_consume  # noqa: E402
+
+# Trozo de `man grep` (MANWIDTH=80, col -bx)
+RENDERED = """\
+GREP(1)                     General Commands Manual                    GREP(1)
+
+NAME
+       grep, egrep, fgrep - print lines that match patterns
+
+SYNOPSIS
+       grep [OPTION...] PATTERNS [FILE...]
+
+DESCRIPTION
+       grep searches for PATTERNS in each FILE.  PATTERNS is one or more
+       patterns separated by newline characters, and grep prints each line
+       that matches a pattern.
+
+OPTIONS
+       -c, --count
+              Suppress normal output; instead print a count of matching lines
+              for each input file.  With the -v, --invert-match option (see
+              below), count non-matching lines.
+
+       -z, --null-data
+              Treat input and output data as sequences of lines, each
+              terminated by a zero byte instead of a newline.  Like the -Z or
+              --null option, this option can be used with commands like sort
+              -z to process arbitrary file names.
+
+GNU grep 3.11                     2023-04-10                           GREP(1)
+"""
+
+# Lo mismo en el fuente man(7), con la flag en línea (.B -z) dentro de la
+# descripción, como en grep.1
+ROFF = r""".TH GREP 1
+.SH NAME
+grep \- print lines that match patterns
+.SH OPTIONS
+.TP
+.BR \-c ", " \-\^\-count
+Suppress normal output; instead print a count of matching lines
+for each input file.
+With the
+.BR \-v ", " \-\^\-invert\-match
+option (see below), count non-matching lines.
+.TP
+.BR \-z ", " \-\^\-null\-data
+Treat input and output data as sequences of lines, each
+terminated by a zero byte instead of a newline.
+Like the
+.B \-Z
+or
+.B \-\^\-null
+option, this option can be used with commands like
+.B sort
+.B \-z
+to process arbitrary file names.
+"""
+
+
+def options(blocks):
+    """Las opciones que mantr_consume sacaría de los bloques "options"."""
+    return [it[1] for b in blocks if b.kind == "options"
+            for it in mantr_consume.parse_options_block(b.text) if it[0] == "option"]
+
+
+class RenderedTest(unittest.TestCase):
+    def setUp(self):
+        self.blocks = mantr_parse.parse_rendered(RENDERED)
+
+    def kinds(self, section):
+        return [b.kind for b in self.blocks if b.section == section and b.kind != "section"]
+
+    def test_sections(self):
+        titles = [b.text.strip() for b in self.blocks if b.kind == "section"]
+        self.assertEqual(titles, ["NAME", "SYNOPSIS", "DESCRIPTION", "OPTIONS"])
+
+    def test_classify(self):
+        self.assertEqual(self.kinds("NAME"), ["text"])
+        self.assertEqual(self.kinds("DESCRIPTION"), ["text"])
+        # el pie de página se queda con la última sección, como en el awk
+        self.assertEqual(self.kinds("OPTIONS"), ["options", "options", "text"])
+
+    def test_no_fake_options(self):
+        # "-v, --invert-match" y "--null" empiezan línea, pero a la sangría
+        # de la descripción: no son opciones
+        self.assertEqual(options(self.blocks), ["-c, --count", "-z, --null-data"])
+
+    def test_description(self):
+        items = mantr_consume.parse_options_block(
+            next(b.text for b in self.blocks if b.kind == "options"))
+        desc = next(it[2] for it in items if it[0] == "option")
+        self.assertTrue(desc.startswith("Suppress normal output;"))
+        self.assertTrue(desc.endswith("count non-matching lines."))
+
+
+class RoffTest(unittest.TestCase):
+    def setUp(self):
+        self.blocks = mantr_parse.parse_roff(ROFF)
+
+    def test_fill(self):
+        # cada párrafo rellenado y cortado a 80 columnas, como lo deja man
+        for b in self.blocks:
+            for ln in b.text.splitlines():
+                self.assertLessEqual(len(ln), mantr_parse.WIDTH)
+        first = next(b for b in self.blocks if b.kind == "options").text.splitlines()
+        self.assertEqual(first[0], mantr_parse.INDENT + "-c, --count")
+        self.assertTrue(all(ln.startswith(mantr_parse.DESC_INDENT) for ln in first[1:]))
+        self.assertEqual(len(first), 4)
+
+    def test_inline_flags(self):
+        self.assertEqual(options(self.blocks), ["-c, --count", "-z, --null-data"])
+
+    def test_same_as_rendered(self):
+        # el fuente y la página renderizada dan las mismas opciones y textos
+        def opts(blocks):
+            return [(it[1], " ".join(it[2].split())) for b in blocks if b.kind == "options"
+                    for it in mantr_consume.parse_options_block(b.text) if it[0] == "option"]
+        self.assertEqual(opts(self.blocks), opts(mantr_parse.parse_rendered(RENDERED)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+"""
+Pruebas de la maquetación (mantr_render): el documento en caché se guarda y
+se recupera igual, y se compone al ancho y en el formato pedidos.
+
+Uso:
+  python3 -m unittest discover -s tests
+"""
+import sys, unittest
+from pathlib import Path
+from unittest import mock
+
+BIN = Path(__file__).resolve().parent.parent / "mantr_1.0-1" / "usr" / "bin"
+sys.path.insert(0, str(BIN))
+import mantr_render  # noqa: E402
+
+DOC = [
+    ["section", "NOMBRE"],
+    ["text", "ls - lista el contenido de directorios"],
+    ["options", [["-a, --all", "no oculta las entradas que empiezan por ."],
+                 "línea tal cual"]],
+    ["code", "  ls -l | less"],
+]
+
+
+class DocumentTest(unittest.TestCase):
+    def test_round_trip(self):
+        self.assertEqual(mantr_render.loads(mantr_render.dumps(DOC, "es")), DOC)
+
+    def test_not_a_document(self):
+        # las entradas antiguas de la caché son la página ya maquetada
+        for text in ("", None, "NOMBRE\n\nls - lista...\n", '{"mantr": x'):
+            self.assertIsNone(mantr_render.loads(text))
+
+    def test_other_version(self):
+        text = mantr_render.dumps(DOC).replace(f'"mantr":{mantr_render.DOC_VERSION}',
+                                               '"mantr":999', 1)
+        self.assertIsNone(mantr_render.loads(text))
+
+
+class RenderTest(unittest.TestCase):
+    def test_options_text(self):
+        self.assertEqual(mantr_render.render_segment(DOC[2], 40, "text"),
+                         "       -a, --all\n"
+                         "              no oculta las entradas que\n"
+                         "              empiezan por .\n"
+                         "línea tal cual\n")
+
+    def test_width(self):
+        text = " ".join(["palabra"] * 40)
+        for width in (40, 80):
+            out = mantr_render.render_segment(["text", text], width, "text")
+            self.assertTrue(all(len(line) <= width for line in out.splitlines()))
+
+    def test_ansi(self):
+        out = mantr_render.render_segment(DOC[0], 80, "ansi")
+        self.assertEqual(out, mantr_render.BOLD + "NOMBRE" + mantr_render.RESET + "\n\n")
+        self.assertNotIn("\033", mantr_render.render_segment(DOC[0], 80, "text"))
+
+    def test_html_escapes(self):
+        out = mantr_render.render_segment(DOC[3], 80, "html")
+        self.assertIn("ls -l | less", out)
+        out = mantr_render.render_segment(["text", "a <b> & c"], 80, "html")
+        self.assertIn("a &lt;b&gt; &amp; c", out)
+
+    def test_page_width(self):
+        with mock.patch.dict("os.environ", {"MANWIDTH": "100"}):
+            self.assertEqual(mantr_render.page_width(), 100)
+        with mock.patch.dict("os.environ", {"MANWIDTH": "10"}):
+            self.assertEqual(mantr_render.page_width(), mantr_render.MIN_WIDTH)
+        with mock.patch.dict("os.environ", {"MANWIDTH": "x"}):
+            self.assertEqual(mantr_render.page_width(terminal=False),
+                             mantr_render.DEFAULT_WIDTH)
+
+
+if __name__ == "__main__":
+    unittest.main()
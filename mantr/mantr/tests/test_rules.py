@@ -0,0 +1,49 @@
+"""
+Pruebas de las reglas posteriores a la traducción (mantr_rules): la versión
+compilada en una sola pasada tiene que dar lo mismo que la anterior, que
+se conserva en bench/bench_rules.py.
+
+Uso:
+  python3 -m unittest discover -s tests
+"""
+import sys, unittest
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT / "mantr_1.0-1" / "usr" / "bin"))
+sys.path.insert(0, str(ROOT / "bench"))
+import mantr_rules  # noqa: E402
+import bench_rules  # noqa: E402
+
+
+class PunctuationTest(unittest.TestCase):
+    def test_ellipsis(self):
+        # "[FILE...]" salía "[FILE. . . ]"
+        for lang in ("es", "fr", "de", "pt"):
+            rules = mantr_rules.rules_for(lang)
+            self.assertEqual(rules.apply("grep [OPTION...] PATTERNS [FILE...]"),
+                             "grep [OPTION...] PATTERNS [FILE...]", lang)
+
+    def test_spacing(self):
+        rules = mantr_rules.rules_for("es")
+        self.assertEqual(rules.apply("datos,de modo que.Fin"), "datos, de modo que. Fin")
+        # un signo detrás de otro se lleva consigo, como antes
+        self.assertEqual(rules.apply("usar ;;& en lugar de ;;"), "usar ; ;& en lugar de ; ;")
+        # y lo que sigue puede empezar otra regla
+        self.assertEqual(rules.apply("ficheros,do not print"), "ficheros, no imprimir")
+
+
+class EquivalenceTest(unittest.TestCase):
+    def test_samples(self):
+        self.assertEqual(bench_rules.differences(mantr_rules.rules_for("es"),
+                                                 bench_rules.SAMPLES), [])
+
+    def test_corpus(self):
+        paras = bench_rules.corpus_paragraphs()
+        self.assertGreater(len(paras), 1000)
+        diffs = bench_rules.differences(mantr_rules.rules_for("es"), paras)
+        self.assertEqual(diffs[:3], [], f"{len(diffs)} párrafos distintos")
+
+
+if __name__ == "__main__":
+    unittest.main()
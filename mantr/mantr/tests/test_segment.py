@@ -0,0 +1,73 @@
+"""
+Pruebas de la segmentación en frases (mantr_segment): dónde se corta un
+párrafo y cómo se acotan las frases largas.
+
+Uso:
+  python3 -m unittest discover -s tests
+"""
+import sys, unittest
+from pathlib import Path
+
+BIN = Path(__file__).resolve().parent.parent / "mantr_1.0-1" / "usr" / "bin"
+sys.path.insert(0, str(BIN))
+import mantr_segment  # noqa: E402
+
+
+class SplitTest(unittest.TestCase):
+    def test_sentences(self):
+        self.assertEqual(mantr_segment.split("Print lines. Exit now! Why? Because."),
+                         ["Print lines.", "Exit now!", "Why?", "Because."])
+
+    def test_empty(self):
+        self.assertEqual(mantr_segment.split(""), [])
+        self.assertEqual(mantr_segment.split(None), [])
+        self.assertEqual(mantr_segment.split("   "), [])
+
+    def test_abbreviations_and_initials(self):
+        for text in ("See e.g. The manual.", "Written by J. Smith and others.",
+                     "Use i.e. The default.", "Section No. 3 applies."):
+            self.assertEqual(mantr_segment.split(text), [text])
+
+    def test_flags_and_paths(self):
+        text = "Run ./configure and make -e.then install 1.2.3 or later."
+        self.assertEqual(mantr_segment.split(text), [text])
+
+    def test_parentheses(self):
+        self.assertEqual(mantr_segment.split("Exit (e.g. ls -l. Note that x) now. Done."),
+                         ["Exit (e.g. ls -l. Note that x) now.", "Done."])
+
+    def test_list_ordinals(self):
+        self.assertEqual(mantr_segment.split("1. First item. Done."),
+                         ["1. First item.", "Done."])
+
+    def test_placeholders(self):
+        # después de mask_segment una frase puede empezar por {n}
+        self.assertEqual(mantr_segment.split("Use it. {0} is the default."),
+                         ["Use it.", "{0} is the default."])
+
+
+class PiecesTest(unittest.TestCase):
+    def test_short_sentences_untouched(self):
+        text = "Print lines. Exit now."
+        self.assertEqual(mantr_segment.pieces(text), mantr_segment.split(text))
+
+    def test_clauses(self):
+        self.assertEqual(mantr_segment.pieces("alpha beta, gamma delta; epsilon zeta", 12),
+                         ["alpha beta,", "gamma delta;", "epsilon zeta"])
+
+    def test_bounded_and_lossless(self):
+        text = ("When this option is given, every line is printed, including the empty "
+                "ones; otherwise only the matching lines are shown: see also the "
+                "description of the context options below for more details.")
+        for limit in (20, 40, 80):
+            out = mantr_segment.pieces(text, limit)
+            self.assertTrue(all(len(p) <= limit for p in out), (limit, out))
+            self.assertEqual(" ".join(out), text)
+
+    def test_long_word(self):
+        word = "x" * 50
+        self.assertEqual(mantr_segment.pieces(f"a {word} b", 10), ["a", word, "b"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""
+Pruebas de la memoria de traducción (mantr_tm): los aciertos se cuentan,
+pero leer no escribe en la base de datos hasta flush().
+
+Uso:
+  python3 -m unittest discover -s tests
+"""
+import sqlite3, sys, tempfile, unittest
+from pathlib import Path
+
+BIN = Path(__file__).resolve().parent.parent / "mantr_1.0-1" / "usr" / "bin"
+sys.path.insert(0, str(BIN))
+import mantr_tm  # noqa: E402
+
+
+class HitsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = Path(tmp.name) / "tm.sqlite3"
+        self.tm = mantr_tm.TranslationMemory(self.path)
+        self.addCleanup(self.tm.close)
+        self.tm.put("Print a message.", "es", "argos", "Imprime un mensaje.")
+        self.tm.put("Exit.", "es", "argos", "Salir.")
+
+    def hits(self):
+        db = sqlite3.connect(str(self.path))
+        try:
+            return dict(db.execute("SELECT source, hits FROM segments"))
+        finally:
+            db.close()
+
+    def test_get(self):
+        self.assertEqual(self.tm.get("Print  a\nmessage.", "es", "argos"), "Imprime un mensaje.")
+        self.assertIsNone(self.tm.get("Print a message.", "fr", "argos"))
+
+    def test_reads_do_not_write(self):
+        statements = []
+        self.tm._db.set_trace_callback(statements.append)
+        for _ in range(50):
+            self.tm.get("Print a message.", "es", "argos")
+        self.assertFalse([s for s in statements if not s.lstrip().upper().startswith("SELECT")])
+        self.assertEqual(self.hits()["Print a message."], 0)
+
+    def test_flush_counts_hits(self):
+        for _ in range(3):
+            self.tm.get("Print a message.", "es", "argos")
+        self.tm.get("Exit.", "es", "argos")
+        statements = []
+        self.tm._db.set_trace_callback(statements.append)
+        self.tm.flush()
+        # una sola transacción para todos los aciertos
+        self.assertEqual(sum(s.strip().upper() == "COMMIT" for s in statements), 1)
+        self.assertEqual(self.hits(), {"Print a message.": 3, "Exit.": 1})
+        self.tm.flush()
+        self.assertEqual(self.hits(), {"Print a message.": 3, "Exit.": 1})
+
+    def test_close_flushes(self):
+        self.tm.get("Exit.", "es", "argos")
+        self.tm.close()
+        self.assertEqual(self.hits()["Exit."], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()